@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class BusquedaConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'busqueda'
+    verbose_name = 'Búsqueda'
@@ -0,0 +1,182 @@
+"""Búsqueda de texto completo sobre descripcion y ubicacion de las incidencias.
+
+En PostgreSQL se consulta el tsvector de IncidenciaBusqueda (configuración
+'spanish', índice GIN) con la sintaxis de websearch_to_tsquery: palabras
+sueltas, "frases entre comillas", `or` y `-excluir`. En el resto de motores
+(SQLite en desarrollo y pruebas) se usa un índice invertido en memoria del
+proceso que se reconstruye cuando cambian las incidencias; no está pensado para
+tablas grandes.
+
+Los usuarios se buscan por subcadena en nombre, email y username; en PostgreSQL
+sin distinguir mayúsculas ni tildes y con índices trigram (ver
+`busqueda.expresiones`). El autocompletado busca los textos cortos por prefijo.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, Count, F, FloatField, Max, Q, Value, When
+
+from incidencias.models import Incidencia
+
+from .expresiones import texto_normalizado
+
+CONFIGURACION = 'spanish'
+
+# Peso de cada campo, equivalente a setweight 'A' y 'B' del trigger
+PESOS = {'descripcion': 1.0, 'ubicacion': 0.4}
+
+# Máximo de resultados que devuelve el índice en memoria (acota el IN y el CASE)
+MAX_RESULTADOS_MEMORIA = 5000
+
+CAMPOS_USUARIO = ('nombre_completo', 'email', 'username')
+
+# Por debajo de esta longitud un trigram no acota nada: el autocompletado busca por prefijo
+MIN_SUBCADENA = 3
+
+PALABRAS_VACIAS = frozenset((
+    'a al algo como con de del el en entre es esta este esto ha hay la las le les lo los mas me mi muy '
+    'no o para pero por que se ser si sin sobre su sus te tu un una uno unos unas y ya'
+).split())
+
+
+def buscar_incidencias(queryset, texto, ordenar=True):
+    """Filtra `queryset` por `texto` y, si `ordenar`, lo ordena por relevancia.
+
+    Con `ordenar` se anota `rango` y el orden es (-rango, -fecha_creacion).
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        consulta = SearchQuery(texto, config=CONFIGURACION, search_type='websearch')
+        queryset = queryset.filter(busqueda__vector=consulta)
+        if ordenar:
+            queryset = queryset.annotate(
+                rango=SearchRank(F('busqueda__vector'), consulta)
+            ).order_by('-rango', '-fecha_creacion')
+        return queryset
+
+    resultados = indice_memoria.buscar(texto, using=queryset.db)
+    if not resultados:
+        return queryset.none()
+    queryset = queryset.filter(id__in=[incidencia_id for incidencia_id, _ in resultados])
+    if ordenar:
+        queryset = queryset.annotate(rango=Case(
+            *[When(id=incidencia_id, then=Value(puntuacion)) for incidencia_id, puntuacion in resultados],
+            default=Value(0.0),
+            output_field=FloatField()
+        )).order_by('-rango', '-fecha_creacion')
+    return queryset
+
+
+def buscar_usuarios(queryset, texto, prefijo_si_corto=False):
+    """Filtra usuarios cuyo nombre, email o username contiene `texto`.
+
+    Con `prefijo_si_corto` los textos de menos de MIN_SUBCADENA caracteres
+    buscan solo por prefijo, que en el autocompletado basta y sí usa el índice.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+    lookup = 'startswith' if prefijo_si_corto and len(texto) < MIN_SUBCADENA else 'contains'
+
+    if connections[queryset.db].vendor == 'postgresql':
+        normalizado = sin_tildes(texto).upper()
+        queryset = queryset.alias(**{f'_{campo}': texto_normalizado(campo) for campo in CAMPOS_USUARIO})
+        condicion = Q()
+        for campo in CAMPOS_USUARIO:
+            condicion |= Q(**{f'_{campo}__{lookup}': normalizado})
+        return queryset.filter(condicion)
+
+    condicion = Q()
+    for campo in CAMPOS_USUARIO:
+        condicion |= Q(**{f'{campo}__i{lookup}': texto})
+    return queryset.filter(condicion)
+
+
+def sin_tildes(texto):
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def terminos(texto):
+    """Normaliza un texto en términos: minúsculas, sin tildes, sin palabras vacías y sin plural"""
+    texto = sin_tildes(texto.lower())
+    return [_raiz(palabra) for palabra in re.findall(r'\w+', texto) if palabra not in PALABRAS_VACIAS]
+
+
+def _raiz(palabra):
+    # Aproximación mínima al stemming español: quitar el plural
+    if len(palabra) > 4 and palabra.endswith('es'):
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith('s'):
+        return palabra[:-1]
+    return palabra
+
+
+class IndiceInvertido:
+    """Índice invertido en memoria: término -> {id de incidencia: peso}.
+
+    Antes de cada búsqueda compara una firma barata de la tabla (número de
+    filas, id máximo y última actualización) y lo reconstruye si ha cambiado.
+    Todos los términos de la consulta deben aparecer (como en websearch).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._firmas = {}
+        self._indices = {}
+
+    def buscar(self, texto, using='default'):
+        consulta = terminos(texto)
+        if not consulta:
+            return []
+        indice = self._indice(using)
+
+        puntuaciones = None
+        for termino in consulta:
+            apariciones = indice.get(termino, {})
+            if puntuaciones is None:
+                puntuaciones = dict(apariciones)
+            else:
+                puntuaciones = {
+                    incidencia_id: puntuacion + apariciones[incidencia_id]
+                    for incidencia_id, puntuacion in puntuaciones.items()
+                    if incidencia_id in apariciones
+                }
+            if not puntuaciones:
+                return []
+
+        ordenadas = sorted(puntuaciones.items(), key=lambda item: (-item[1], -item[0]))
+        return ordenadas[:MAX_RESULTADOS_MEMORIA]
+
+    def invalidar(self):
+        with self._lock:
+            self._firmas.clear()
+            self._indices.clear()
+
+    def _indice(self, using):
+        firma = Incidencia.objects.using(using).aggregate(
+            total=Count('id'), ultimo_id=Max('id'), ultima_actualizacion=Max('fecha_actualizacion')
+        )
+        with self._lock:
+            if self._firmas.get(using) != firma:
+                self._indices[using] = self._construir(using)
+                self._firmas[using] = firma
+            return self._indices[using]
+
+    def _construir(self, using):
+        indice = defaultdict(lambda: defaultdict(float))
+        filas = Incidencia.objects.using(using).values_list('id', *PESOS)
+        for incidencia_id, *valores in filas.iterator(chunk_size=2000):
+            for peso, valor in zip(PESOS.values(), valores):
+                for termino in terminos(valor or ''):
+                    indice[termino][incidencia_id] += peso
+        return {termino: dict(apariciones) for termino, apariciones in indice.items()}
+
+
+indice_memoria = IndiceInvertido()
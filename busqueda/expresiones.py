@@ -0,0 +1,21 @@
+from django.db.models import F, Func
+from django.db.models.functions import Upper
+
+# Letras con tilde (y eñe, cedilla) en minúscula y mayúscula, y su equivalente sin tilde
+CON_TILDE = 'áàäâéèëêíìïîóòöôúùüûñçÁÀÄÂÉÈËÊÍÌÏÎÓÒÖÔÚÙÜÛÑÇ'
+SIN_TILDE = 'aaaaeeeeiiiioooouuuuncAAAAEEEEIIIIOOOOUUUUNC'
+
+
+class SinTildes(Func):
+    """TRANSLATE que quita las tildes de una columna de texto (solo PostgreSQL).
+
+    Las tablas de traducción van como literales y no como parámetros para que la
+    expresión de la consulta coincida con la de los índices de expresión.
+    """
+    function = 'TRANSLATE'
+    template = f"%(function)s(%(expressions)s, '{CON_TILDE}', '{SIN_TILDE}')"
+
+
+def texto_normalizado(campo):
+    """Columna en mayúsculas y sin tildes: la expresión de los índices trigram de usuarios"""
+    return Upper(SinTildes(F(campo)))
@@ -0,0 +1,109 @@
+import os
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from busqueda.buscador import buscar_usuarios
+from incidencias.exportacion import filtrar_incidencias_reporte
+from incidencias.models import Incidencia
+from usuarios.models import Usuario
+
+
+def consultas_a_verificar():
+    """Consultas reales de listados, reportes y búsquedas que deben resolverse con un índice"""
+    trabajador = Usuario.objects.filter(tipo_usuario='trabajador').order_by('id').first()
+    ultima = Incidencia.objects.order_by('-fecha_creacion', '-id').values('id', 'fecha_creacion')[500:501].first()
+    hace_30_dias = (timezone.localdate() - timedelta(days=30)).isoformat()
+    base = Incidencia.objects.order_by('-fecha_creacion')
+
+    consultas = {
+        'lista_admin': base[:20],
+        'lista_admin_estado': base.filter(estado='pendiente')[:20],
+        'lista_admin_abiertas_prioridad': base.filter(estado='en_proceso', prioridad='alta')[:20],
+        'reporte_30_dias': filtrar_incidencias_reporte({'fecha_desde': hace_30_dias})[0].order_by('-fecha_creacion'),
+        'reporte_estado_rango': filtrar_incidencias_reporte({
+            'fecha_desde': hace_30_dias, 'estado': 'pendiente'
+        })[0].order_by('-fecha_creacion'),
+    }
+    if trabajador is not None:
+        consultas['lista_trabajador'] = base.filter(usuario_creador=trabajador)[:20]
+        consultas['lista_trabajador_estado'] = base.filter(usuario_creador=trabajador, estado='resuelto')[:20]
+    if ultima is not None:
+        consultas['lista_cursor'] = Incidencia.objects.filter(fecha_creacion__lte=ultima['fecha_creacion']).filter(
+            Q(fecha_creacion__lt=ultima['fecha_creacion']) | Q(fecha_creacion=ultima['fecha_creacion'], id__lt=ultima['id'])
+        ).order_by('-fecha_creacion', '-id')[:21]
+    if connection.vendor == 'postgresql':
+        # Los índices trigram de usuarios solo existen en PostgreSQL
+        usuarios = Usuario.objects.all()
+        consultas['usuarios_busqueda'] = buscar_usuarios(usuarios, 'trabajador0001').order_by('-fecha_creacion')[:20]
+        consultas['usuarios_autocompletar'] = buscar_usuarios(usuarios, 'dor00012').order_by('nombre_completo', 'id')[:10]
+    return consultas
+
+
+def recorre_tabla_completa(plan, tabla):
+    """Indica si el plan recorre `tabla` entera en lugar de usar un índice"""
+    for linea in plan.splitlines():
+        if connection.vendor == 'postgresql':
+            if f'Seq Scan on {tabla}' in linea:
+                return True
+        elif connection.vendor == 'sqlite':
+            texto = linea.split('SCAN ', 1)[-1] if 'SCAN ' in linea else ''
+            if texto.split(' ')[0] == tabla and 'INDEX' not in texto:
+                return True
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre las consultas de listados y reportes y comprueba que usan índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incidencias', type=int,
+            help='Crear una base de datos de prueba con este número de incidencias en lugar de usar la actual'
+        )
+        parser.add_argument('--mostrar-planes', action='store_true', help='Mostrar el plan completo de cada consulta')
+
+    def handle(self, *args, **options):
+        if options['incidencias'] is None:
+            self.verificar(options)
+            return
+
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f'🔄 Generando {options["incidencias"]} incidencias...')
+            call_command(
+                'generar_datos_prueba', incidencias=options['incidencias'],
+                usuarios=max(50, options['incidencias'] // 200), stdout=open(os.devnull, 'w')
+            )
+            self.verificar(options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+    def verificar(self, options):
+        # Estadísticas actualizadas para que el planificador conozca el tamaño real de las tablas
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        fallos = []
+        for nombre, queryset in consultas_a_verificar().items():
+            tabla = queryset.model._meta.db_table
+            plan = queryset.explain()
+            if recorre_tabla_completa(plan, tabla):
+                fallos.append(nombre)
+                self.stdout.write(self.style.ERROR(f'❌ {nombre}: recorrido completo de {tabla}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✅ {nombre}'))
+            if options['mostrar_planes'] or nombre in fallos:
+                for linea in plan.splitlines():
+                    self.stdout.write(f'      {linea}')
+
+        if fallos:
+            raise CommandError(f'{len(fallos)} consultas no usan índices: {", ".join(fallos)}')
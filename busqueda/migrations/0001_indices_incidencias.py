@@ -0,0 +1,65 @@
+"""Índices compuestos y parciales para los filtros y ordenaciones reales de incidencias.
+
+Las tablas pertenecen a la app incidencias, así que los índices se crean con
+RunPython sobre los modelos históricos. En PostgreSQL se crean con CONCURRENTLY
+para no bloquear las escrituras en tablas grandes (por eso la migración no es
+atómica).
+"""
+from django.db import migrations, models
+from django.db.models import Q
+
+ESTADOS_ABIERTOS = ['pendiente', 'en_proceso']
+
+
+def _indices(apps):
+    Incidencia = apps.get_model('incidencias', 'Incidencia')
+    CambioEstado = apps.get_model('incidencias', 'CambioEstado')
+    ComentarioAdmin = apps.get_model('incidencias', 'ComentarioAdmin')
+    return [
+        # Listado de administradores, paginación por cursor y reportes por rango de fechas
+        (Incidencia, models.Index(fields=['-fecha_creacion', '-id'], name='incidencia_fecha_idx')),
+        # Listado de un trabajador (solo ve sus incidencias)
+        (Incidencia, models.Index(fields=['usuario_creador', '-fecha_creacion', '-id'], name='incidencia_creador_fecha_idx')),
+        # Filtro por estado en listados y reportes
+        (Incidencia, models.Index(fields=['estado', '-fecha_creacion', '-id'], name='incidencia_estado_fecha_idx')),
+        # Trabajador filtrando por estado
+        (Incidencia, models.Index(fields=['usuario_creador', 'estado', '-fecha_creacion'], name='incidencia_creador_estado_idx')),
+        # Incidencias abiertas por prioridad: una fracción pequeña de la tabla
+        (Incidencia, models.Index(
+            fields=['prioridad', '-fecha_creacion', '-id'],
+            name='incidencia_abiertas_prio_idx',
+            condition=Q(estado__in=ESTADOS_ABIERTOS)
+        )),
+        # Historial y comentarios precargados por incidencia en su orden de presentación
+        (CambioEstado, models.Index(fields=['incidencia', 'fecha'], name='cambio_incidencia_fecha_idx')),
+        (ComentarioAdmin, models.Index(fields=['incidencia', '-fecha'], name='comentario_incid_fecha_idx')),
+    ]
+
+
+def crear_indices(apps, schema_editor):
+    for modelo, indice in _indices(apps):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(indice.create_sql(modelo, schema_editor, concurrently=True))
+        else:
+            schema_editor.add_index(modelo, indice)
+
+
+def eliminar_indices(apps, schema_editor):
+    for modelo, indice in _indices(apps):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(indice.remove_sql(modelo, schema_editor, concurrently=True))
+        else:
+            schema_editor.remove_index(modelo, indice)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('incidencias', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,21 @@
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('busqueda', '0001_indices_incidencias'),
+        ('incidencias', '__first__'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidenciaBusqueda',
+            fields=[
+                ('incidencia', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='busqueda', serialize=False, to='incidencias.incidencia')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,73 @@
+"""Trigger, carga inicial e índice GIN del documento de búsqueda (solo PostgreSQL).
+
+descripcion pesa más (A) que ubicacion (B) al ordenar por relevancia. El trigger
+es AFTER porque la fila de búsqueda referencia a la incidencia; así cubre
+también bulk_create, COPY y QuerySet.update(), que no emiten señales. El índice
+se crea al final, con la tabla ya cargada, y con CONCURRENTLY.
+"""
+from django.db import migrations, transaction
+
+VECTOR = (
+    "setweight(to_tsvector('spanish', coalesce({fila}.descripcion, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce({fila}.ubicacion, '')), 'B')"
+)
+
+CREAR_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION busqueda_actualizar_vector() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO busqueda_incidenciabusqueda (incidencia_id, vector)
+    VALUES (NEW.id, {VECTOR.format(fila='NEW')})
+    ON CONFLICT (incidencia_id) DO UPDATE SET vector = EXCLUDED.vector;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS busqueda_incidencia_vector ON incidencias_incidencia;
+CREATE TRIGGER busqueda_incidencia_vector
+    AFTER INSERT OR UPDATE OF descripcion, ubicacion ON incidencias_incidencia
+    FOR EACH ROW EXECUTE FUNCTION busqueda_actualizar_vector();
+"""
+
+CARGA_INICIAL = f"""
+INSERT INTO busqueda_incidenciabusqueda (incidencia_id, vector)
+SELECT i.id, {VECTOR.format(fila='i')} FROM incidencias_incidencia i
+ON CONFLICT (incidencia_id) DO NOTHING;
+"""
+
+ELIMINAR_TRIGGER = """
+DROP TRIGGER IF EXISTS busqueda_incidencia_vector ON incidencias_incidencia;
+DROP FUNCTION IF EXISTS busqueda_actualizar_vector();
+"""
+
+
+def crear_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Trigger y carga inicial en la misma transacción para no perder filas intermedias
+    with transaction.atomic(using=schema_editor.connection.alias):
+        schema_editor.execute(CREAR_TRIGGER)
+        schema_editor.execute(CARGA_INICIAL)
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS busqueda_vector_gin '
+        'ON busqueda_incidenciabusqueda USING gin (vector)'
+    )
+
+
+def eliminar_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS busqueda_vector_gin')
+    schema_editor.execute(ELIMINAR_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('busqueda', '0002_incidenciabusqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_trigger, eliminar_trigger),
+    ]
@@ -0,0 +1,54 @@
+"""Índices trigram para la búsqueda de usuarios por subcadena (solo PostgreSQL).
+
+La búsqueda compara UPPER(TRANSLATE(columna)) con LIKE '%texto%'; un GIN con
+gin_trgm_ops sobre esa misma expresión resuelve el LIKE sin recorrer la tabla
+y además ignora mayúsculas y tildes.
+"""
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import migrations
+
+from busqueda.expresiones import texto_normalizado
+
+INDICES = {
+    'nombre_completo': 'usuario_nombre_trgm',
+    'email': 'usuario_email_trgm',
+    'username': 'usuario_username_trgm',
+}
+
+
+def _indices():
+    return [
+        GinIndex(OpClass(texto_normalizado(campo), name='gin_trgm_ops'), name=nombre)
+        for campo, nombre in INDICES.items()
+    ]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for indice in _indices():
+        schema_editor.execute(indice.create_sql(Usuario, schema_editor, concurrently=True))
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    for indice in _indices():
+        schema_editor.execute(indice.remove_sql(Usuario, schema_editor, concurrently=True))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('busqueda', '0003_trigger_vector_busqueda'),
+        ('usuarios', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
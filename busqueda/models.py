@@ -0,0 +1,21 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class IncidenciaBusqueda(models.Model):
+    """Documento de búsqueda de texto completo de una incidencia.
+
+    Solo se usa en PostgreSQL: un trigger sobre incidencias_incidencia lo
+    mantiene al día en cada INSERT (también bulk_create y COPY) y en cada UPDATE
+    de descripcion o ubicacion. El GIN sobre `vector` se crea en la migración.
+    """
+    incidencia = models.OneToOneField(
+        'incidencias.Incidencia',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='busqueda'
+    )
+    vector = SearchVectorField(null=True)
+
+    def __str__(self):
+        return f'Búsqueda de la incidencia {self.incidencia_id}'
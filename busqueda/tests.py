@@ -0,0 +1,83 @@
+"""Los listados y reportes de incidencias se resuelven con los índices de 0001_indices_incidencias.
+
+Los planes se comprueban con EXPLAIN en PostgreSQL sobre un volumen de datos
+realista y estadísticas actualizadas; en otros motores el planificador no es
+comparable y esos tests se omiten (manage.py verificar_indices sirve para
+revisarlos a mano). Que los filtros de fecha comparen la columna sin
+transformarla se comprueba en cualquier motor.
+"""
+import os
+import re
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from incidencias.exportacion import filtrar_incidencias_reporte
+from incidencias.models import Incidencia
+
+from .management.commands.verificar_indices import consultas_a_verificar, recorre_tabla_completa
+
+INCIDENCIAS = 50000
+
+# Consulta de verificar_indices -> índices con los que el planificador puede resolverla
+INDICES_ESPERADOS = {
+    'lista_admin': {'incidencia_fecha_idx'},
+    'lista_admin_estado': {'incidencia_estado_fecha_idx', 'incidencia_fecha_idx'},
+    'lista_admin_abiertas_prioridad': {'incidencia_abiertas_prio_idx', 'incidencia_estado_fecha_idx'},
+    'lista_trabajador': {'incidencia_creador_fecha_idx', 'incidencia_creador_estado_idx'},
+    'lista_trabajador_estado': {'incidencia_creador_estado_idx', 'incidencia_creador_fecha_idx'},
+    'lista_cursor': {'incidencia_fecha_idx'},
+    'reporte_30_dias': {'incidencia_fecha_idx'},
+    'reporte_estado_rango': {'incidencia_estado_fecha_idx', 'incidencia_fecha_idx'},
+}
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Los planes solo se comprueban en PostgreSQL')
+class PlanesIndicesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with open(os.devnull, 'w') as salida:
+            call_command('generar_datos_prueba', incidencias=INCIDENCIAS, usuarios=INCIDENCIAS // 200, stdout=salida)
+        # Estadísticas actualizadas para que el planificador conozca el tamaño real de las tablas
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsaIndice(self, queryset, indices):
+        plan = queryset.explain()
+        self.assertFalse(recorre_tabla_completa(plan, Incidencia._meta.db_table), plan)
+        usados = {indice for indice in indices if re.search(rf'\b{re.escape(indice)}\b', plan)}
+        self.assertTrue(usados, f'Se esperaba alguno de {sorted(indices)}:\n{plan}')
+
+    def test_listados_y_reportes_usan_indices(self):
+        consultas = consultas_a_verificar()
+        self.assertLessEqual(set(INDICES_ESPERADOS), set(consultas))
+        for nombre, indices in INDICES_ESPERADOS.items():
+            with self.subTest(consulta=nombre):
+                self.assertUsaIndice(consultas[nombre], indices)
+
+    def test_reporte_rango_cerrado(self):
+        hoy = timezone.localdate()
+        queryset, _ = filtrar_incidencias_reporte({
+            'fecha_desde': (hoy - timedelta(days=14)).isoformat(),
+            'fecha_hasta': (hoy - timedelta(days=7)).isoformat(),
+        })
+        self.assertUsaIndice(queryset.order_by('-fecha_creacion'), {'incidencia_fecha_idx'})
+
+
+class FiltrosFechaSargablesTests(SimpleTestCase):
+
+    def test_rango_de_fechas_compara_la_columna(self):
+        queryset, filtros = filtrar_incidencias_reporte({'fecha_desde': '2024-03-01', 'fecha_hasta': '2024-03-31'})
+        sql = str(queryset.query)
+        columna = f'"{Incidencia._meta.db_table}"."fecha_creacion"'
+        # Sin conversión a fecha: la columna se compara directamente y el índice es utilizable
+        self.assertIn(f'{columna} >= ', sql)
+        self.assertIn(f'{columna} < ', sql)
+        self.assertNotIn('__date', sql)
+        self.assertNotRegex(sql, r'(?i)(::date|django_datetime_cast_date|DATE\()')
+        self.assertEqual(str(filtros['fecha_hasta']), '2024-03-31')
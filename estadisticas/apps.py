@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class EstadisticasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'estadisticas'
+    verbose_name = 'Estadísticas'
@@ -0,0 +1,189 @@
+"""Contadores de incidencias por estado mantenidos de forma incremental.
+
+Las funciones `registrar_*` deben llamarse dentro de la misma transacción que
+modifica las incidencias, de modo que los contadores nunca queden a medias.
+`reconciliar` recalcula los contadores desde la tabla de incidencias para
+detectar y corregir desviaciones. Las mismas funciones mantienen el cubo
+diario de estadisticas.resumen.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from incidencias.models import Incidencia
+from . import resumen
+from .models import ContadorEstado, ContadorEstadoUsuario
+
+ESTADOS = [estado for estado, _ in Incidencia.ESTADOS_CHOICES]
+
+
+def aplicar_deltas(deltas):
+    """Suma a los contadores los deltas {(usuario_id, estado): delta}.
+
+    Las filas se actualizan siempre en el mismo orden para evitar interbloqueos
+    entre transacciones concurrentes.
+    """
+    globales = defaultdict(int)
+    for (usuario_id, estado), delta in sorted(deltas.items(), key=lambda item: (item[0][0] or 0, item[0][1])):
+        if not delta:
+            continue
+        globales[estado] += delta
+        if usuario_id is None:
+            continue
+        _sumar(
+            ContadorEstadoUsuario.objects.filter(usuario_id=usuario_id, estado=estado),
+            delta,
+            lambda: ContadorEstadoUsuario(usuario_id=usuario_id, estado=estado, total=delta)
+        )
+
+    for estado, delta in sorted(globales.items()):
+        if not delta:
+            continue
+        _sumar(
+            ContadorEstado.objects.filter(estado=estado),
+            delta,
+            lambda: ContadorEstado(estado=estado, total=delta)
+        )
+
+
+def _sumar(queryset, delta, crear):
+    if queryset.update(total=F('total') + delta):
+        return
+    try:
+        with transaction.atomic():
+            crear().save(force_insert=True)
+    except IntegrityError:
+        # Otra transacción creó la fila a la vez
+        queryset.update(total=F('total') + delta)
+
+
+def registrar_creacion(incidencia):
+    aplicar_deltas({(incidencia.usuario_creador_id, incidencia.estado): 1})
+    resumen.registrar_creaciones([resumen.fila(incidencia)])
+
+
+def registrar_creaciones(incidencias):
+    deltas = defaultdict(int)
+    for incidencia in incidencias:
+        deltas[(incidencia.usuario_creador_id, incidencia.estado)] += 1
+    aplicar_deltas(deltas)
+    resumen.registrar_creaciones([resumen.fila(incidencia) for incidencia in incidencias])
+
+
+def registrar_cambio_estado(incidencia, estado_anterior):
+    """Registra el paso de `estado_anterior` al estado actual de la incidencia (con su CambioEstado)"""
+    if estado_anterior == incidencia.estado:
+        return
+    aplicar_deltas({
+        (incidencia.usuario_creador_id, estado_anterior): -1,
+        (incidencia.usuario_creador_id, incidencia.estado): 1,
+    })
+    resumen.registrar_cambios_estado([{**resumen.fila(incidencia), 'estado': estado_anterior}], incidencia.estado)
+
+
+def registrar_cambios_estado(filas, estado_nuevo):
+    """Registra un cambio masivo; `filas` son dicts con 'usuario_creador_id', resumen.CAMPOS y el 'estado' anterior"""
+    deltas = defaultdict(int)
+    for fila in filas:
+        if fila['estado'] == estado_nuevo:
+            continue
+        deltas[(fila['usuario_creador_id'], fila['estado'])] -= 1
+        deltas[(fila['usuario_creador_id'], estado_nuevo)] += 1
+    aplicar_deltas(deltas)
+    resumen.registrar_cambios_estado(filas, estado_nuevo)
+
+
+def registrar_actualizacion(incidencia, anterior):
+    """Registra una edición de la incidencia; `anterior` es resumen.fila() antes de guardarla"""
+    if anterior['estado'] != incidencia.estado:
+        aplicar_deltas({
+            (incidencia.usuario_creador_id, anterior['estado']): -1,
+            (incidencia.usuario_creador_id, incidencia.estado): 1,
+        })
+    resumen.registrar_actualizacion(anterior, resumen.fila(incidencia))
+
+
+def registrar_eliminacion(incidencia):
+    """Debe llamarse antes de borrar la incidencia"""
+    aplicar_deltas({(incidencia.usuario_creador_id, incidencia.estado): -1})
+    resumen.registrar_eliminaciones([resumen.fila(incidencia)])
+
+
+def registrar_eliminaciones(filas):
+    """Borrado en bloque (antes de ejecutarlo); `filas` son dicts con 'usuario_creador_id' y resumen.CAMPOS"""
+    deltas = defaultdict(int)
+    for fila in filas:
+        deltas[(fila['usuario_creador_id'], fila['estado'])] -= 1
+    aplicar_deltas(deltas)
+    resumen.registrar_eliminaciones(filas)
+
+
+def obtener_estadisticas(usuario=None):
+    """Estadísticas por estado leídas de los contadores (global o de un usuario)"""
+    return _estadisticas(_filas_contadores(usuario))
+
+
+async def aobtener_estadisticas(usuario=None):
+    """Versión asíncrona de obtener_estadisticas"""
+    return _estadisticas([fila async for fila in _filas_contadores(usuario)])
+
+
+def _filas_contadores(usuario):
+    if usuario is None:
+        return ContadorEstado.objects.values_list('estado', 'total')
+    return ContadorEstadoUsuario.objects.filter(usuario=usuario).values_list('estado', 'total')
+
+
+def _estadisticas(filas):
+    stats = dict.fromkeys(ESTADOS, 0)
+    stats.update(filas)
+    stats['total'] = sum(stats.values())
+    return stats
+
+
+def reconciliar(reparar=True):
+    """Compara los contadores con un recuento real y, si `reparar`, corrige las diferencias.
+
+    Devuelve la lista de diferencias encontradas como tuplas
+    (usuario_id o None, estado, valor_contador, valor_real).
+    """
+    with transaction.atomic():
+        # Bloquear los contadores globales serializa la reconciliación con
+        # cualquier escritura, ya que todas actualizan al menos uno de ellos
+        list(ContadorEstado.objects.select_for_update().order_by('estado'))
+
+        reales = defaultdict(int)
+        for fila in Incidencia.objects.values('usuario_creador_id', 'estado').annotate(total=Count('id')).order_by():
+            reales[(fila['usuario_creador_id'], fila['estado'])] = fila['total']
+
+        reales_globales = defaultdict(int)
+        for (usuario_id, estado), total in list(reales.items()):
+            reales_globales[estado] += total
+            if usuario_id is None:
+                del reales[(usuario_id, estado)]
+
+        actuales = {
+            (usuario_id, estado): total
+            for usuario_id, estado, total in ContadorEstadoUsuario.objects.values_list('usuario_id', 'estado', 'total')
+        }
+        actuales_globales = dict(ContadorEstado.objects.values_list('estado', 'total'))
+
+        diferencias = []
+        for clave in sorted(set(reales) | set(actuales)):
+            if reales.get(clave, 0) != actuales.get(clave, 0):
+                diferencias.append((clave[0], clave[1], actuales.get(clave, 0), reales.get(clave, 0)))
+        for estado in sorted(set(reales_globales) | set(actuales_globales)):
+            if reales_globales.get(estado, 0) != actuales_globales.get(estado, 0):
+                diferencias.append((None, estado, actuales_globales.get(estado, 0), reales_globales.get(estado, 0)))
+
+        if reparar and diferencias:
+            for usuario_id, estado, _, real in diferencias:
+                if usuario_id is None:
+                    ContadorEstado.objects.update_or_create(estado=estado, defaults={'total': real})
+                else:
+                    ContadorEstadoUsuario.objects.update_or_create(
+                        usuario_id=usuario_id, estado=estado, defaults={'total': real}
+                    )
+
+    return diferencias
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from estadisticas.contadores import reconciliar
+
+
+class Command(BaseCommand):
+    help = 'Compara los contadores de estado con un recuento real de incidencias y corrige las desviaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar', action='store_true',
+            help='Informar de las desviaciones sin corregirlas'
+        )
+
+    def handle(self, *args, **options):
+        reparar = not options['solo_verificar']
+        diferencias = reconciliar(reparar=reparar)
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('✅ Los contadores coinciden con las incidencias'))
+            return
+
+        for usuario_id, estado, contador, real in diferencias:
+            ambito = 'global' if usuario_id is None else f'usuario {usuario_id}'
+            self.stdout.write(f'⚠️  {ambito} / {estado}: contador={contador} real={real}')
+
+        if reparar:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(diferencias)} contadores corregidos'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(diferencias)} contadores desviados'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from estadisticas.resumen import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el resumen diario de incidencias (fecha × estado × tipo × prioridad) y corrige las desviaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar', action='store_true',
+            help='Informar de las celdas desviadas sin corregirlas'
+        )
+
+    def handle(self, *args, **options):
+        reparar = not options['solo_verificar']
+        diferencias = reconstruir(reparar=reparar)
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('✅ El resumen diario coincide con las incidencias'))
+            return
+
+        for (fecha, estado, tipo, prioridad), guardado, real in diferencias[:50]:
+            self.stdout.write(
+                f'⚠️  {fecha} {estado}/{tipo}/{prioridad}: '
+                f'incidencias={guardado[0]}→{real[0]} entradas={guardado[1]}→{real[1]}'
+            )
+        if len(diferencias) > 50:
+            self.stdout.write(f'... y {len(diferencias) - 50} celdas más')
+
+        if reparar:
+            self.stdout.write(self.style.SUCCESS(f'✅ {len(diferencias)} celdas corregidas'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{len(diferencias)} celdas desviadas'))
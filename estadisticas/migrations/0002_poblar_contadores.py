@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    """Inicializa los contadores a partir de las incidencias existentes"""
+    Incidencia = apps.get_model('incidencias', 'Incidencia')
+    ContadorEstado = apps.get_model('estadisticas', 'ContadorEstado')
+    ContadorEstadoUsuario = apps.get_model('estadisticas', 'ContadorEstadoUsuario')
+
+    globales = defaultdict(int)
+    por_usuario = []
+    filas = Incidencia.objects.values('usuario_creador_id', 'estado').annotate(total=Count('id')).order_by()
+    for fila in filas:
+        globales[fila['estado']] += fila['total']
+        if fila['usuario_creador_id'] is not None:
+            por_usuario.append(ContadorEstadoUsuario(
+                usuario_id=fila['usuario_creador_id'], estado=fila['estado'], total=fila['total']
+            ))
+
+    for estado in ('pendiente', 'en_proceso', 'resuelto'):
+        globales.setdefault(estado, 0)
+
+    ContadorEstado.objects.bulk_create(
+        [ContadorEstado(estado=estado, total=total) for estado, total in globales.items()]
+    )
+    ContadorEstadoUsuario.objects.bulk_create(por_usuario, batch_size=1000)
+
+
+def vaciar_contadores(apps, schema_editor):
+    apps.get_model('estadisticas', 'ContadorEstadoUsuario').objects.all().delete()
+    apps.get_model('estadisticas', 'ContadorEstado').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estadisticas', '0001_initial'),
+        ('incidencias', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_contadores, vaciar_contadores),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estadisticas', '0002_poblar_contadores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(max_length=20)),
+                ('tipo_incidencia', models.CharField(max_length=20)),
+                ('prioridad', models.CharField(max_length=10)),
+                ('incidencias', models.BigIntegerField(default=0)),
+                ('entradas', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'estado', 'tipo_incidencia', 'prioridad'), name='resumen_diario_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def poblar_resumen(apps, schema_editor):
+    """Construye el cubo diario a partir de las incidencias y cambios de estado existentes"""
+    Incidencia = apps.get_model('incidencias', 'Incidencia')
+    CambioEstado = apps.get_model('incidencias', 'CambioEstado')
+    ResumenDiario = apps.get_model('estadisticas', 'ResumenDiario')
+
+    celdas = defaultdict(lambda: [0, 0])
+    filas = Incidencia.objects.annotate(dia=TruncDate('fecha_creacion')).values(
+        'dia', 'estado', 'tipo_incidencia', 'prioridad'
+    ).annotate(total=Count('id')).order_by()
+    for fila in filas:
+        celdas[(fila['dia'], fila['estado'], fila['tipo_incidencia'], fila['prioridad'])][0] = fila['total']
+    filas = CambioEstado.objects.annotate(dia=TruncDate('fecha')).values(
+        'dia', 'estado_nuevo', 'incidencia__tipo_incidencia', 'incidencia__prioridad'
+    ).annotate(total=Count('id')).order_by()
+    for fila in filas:
+        clave = (fila['dia'], fila['estado_nuevo'], fila['incidencia__tipo_incidencia'], fila['incidencia__prioridad'])
+        celdas[clave][1] = fila['total']
+
+    ResumenDiario.objects.bulk_create([
+        ResumenDiario(
+            fecha=fecha, estado=estado, tipo_incidencia=tipo, prioridad=prioridad,
+            incidencias=incidencias, entradas=entradas
+        )
+        for (fecha, estado, tipo, prioridad), (incidencias, entradas) in celdas.items()
+    ], batch_size=1000)
+
+
+def vaciar_resumen(apps, schema_editor):
+    apps.get_model('estadisticas', 'ResumenDiario').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estadisticas', '0003_resumendiario'),
+        ('incidencias', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_resumen, vaciar_resumen),
+    ]
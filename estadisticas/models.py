@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import models
+
+
+class ContadorEstado(models.Model):
+    """Número de incidencias en cada estado en todo el sistema"""
+    estado = models.CharField(max_length=20, unique=True)
+    total = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.estado}: {self.total}'
+
+
+class ContadorEstadoUsuario(models.Model):
+    """Número de incidencias en cada estado creadas por un usuario"""
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='contadores_estado'
+    )
+    estado = models.CharField(max_length=20)
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'estado'], name='contador_usuario_estado_unico'),
+        ]
+
+    def __str__(self):
+        return f'{self.usuario} - {self.estado}: {self.total}'
+
+
+class ResumenDiario(models.Model):
+    """Celda del cubo diario de incidencias (ver estadisticas.resumen)"""
+    fecha = models.DateField()
+    estado = models.CharField(max_length=20)
+    tipo_incidencia = models.CharField(max_length=20)
+    prioridad = models.CharField(max_length=10)
+    # Incidencias creadas ese día que están ahora en `estado`
+    incidencias = models.BigIntegerField(default=0)
+    # Cambios a `estado` registrados ese día (la creación incluida)
+    entradas = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Su índice, que empieza por fecha, resuelve las consultas por rango
+            models.UniqueConstraint(
+                fields=['fecha', 'estado', 'tipo_incidencia', 'prioridad'], name='resumen_diario_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.fecha} {self.estado}/{self.tipo_incidencia}/{self.prioridad}: {self.incidencias}'
@@ -0,0 +1,285 @@
+"""Cubo diario de incidencias: fecha × estado × tipo_incidencia × prioridad.
+
+Cada celda de ResumenDiario guarda dos medidas:
+
+- incidencias: las creadas ese día que están ahora en ese estado. Sumando un
+  rango de fechas se obtienen las estadísticas del reporte filtrado por fecha
+  de creación, estado, tipo y prioridad sin recorrer Incidencia.
+- entradas: los cambios de estado (CambioEstado) a ese estado registrados ese
+  día, incluida la creación. Dan las tendencias: resueltas por día, etc.
+
+Las celdas usan el tipo y la prioridad actuales de cada incidencia y los días
+de la zona horaria del proyecto. El cubo se mantiene de forma incremental desde
+contadores.registrar_*, dentro de la transacción que modifica las incidencias,
+y `reconstruir` lo recalcula desde cero (manage.py reconstruir_resumen).
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from incidencias.models import CambioEstado, Incidencia
+
+from .models import ContadorEstado, ResumenDiario
+
+ESTADOS = [estado for estado, _ in Incidencia.ESTADOS_CHOICES]
+
+# Campos de la incidencia que determinan su celda
+CAMPOS = ('id', 'estado', 'tipo_incidencia', 'prioridad', 'fecha_creacion')
+
+AGRUPACIONES = {'dia': None, 'semana': TruncWeek, 'mes': TruncMonth}
+
+# Puntos máximos de una tendencia
+MAX_PERIODOS = 1000
+
+
+def fila(incidencia):
+    """Los CAMPOS de una instancia de Incidencia, como los devuelve values()"""
+    return {campo: getattr(incidencia, campo) for campo in CAMPOS}
+
+
+def _dia(valor):
+    return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+
+
+def _celda(fecha, estado, fila):
+    return fecha, estado, fila['tipo_incidencia'], fila['prioridad']
+
+
+# ==================== Mantenimiento incremental ====================
+
+def aplicar_deltas(deltas):
+    """Suma a las celdas los deltas {(fecha, estado, tipo, prioridad): [incidencias, entradas]}.
+
+    Las celdas se actualizan siempre en el mismo orden para evitar interbloqueos.
+    """
+    for (fecha, estado, tipo, prioridad), (incidencias, entradas) in sorted(deltas.items()):
+        if not incidencias and not entradas:
+            continue
+        celda = ResumenDiario.objects.filter(fecha=fecha, estado=estado, tipo_incidencia=tipo, prioridad=prioridad)
+        if celda.update(incidencias=F('incidencias') + incidencias, entradas=F('entradas') + entradas):
+            continue
+        try:
+            with transaction.atomic():
+                ResumenDiario.objects.create(
+                    fecha=fecha, estado=estado, tipo_incidencia=tipo, prioridad=prioridad,
+                    incidencias=incidencias, entradas=entradas
+                )
+        except IntegrityError:
+            # Otra transacción creó la celda a la vez
+            celda.update(incidencias=F('incidencias') + incidencias, entradas=F('entradas') + entradas)
+
+
+def registrar_creaciones(filas):
+    deltas = defaultdict(lambda: [0, 0])
+    for fila in filas:
+        celda = _celda(_dia(fila['fecha_creacion']), fila['estado'], fila)
+        deltas[celda][0] += 1
+        deltas[celda][1] += 1
+    aplicar_deltas(deltas)
+
+
+def registrar_cambios_estado(filas, estado_nuevo):
+    """Cambios de estado con su CambioEstado de hoy; `filas` con los CAMPOS y el estado anterior"""
+    hoy = timezone.localdate()
+    deltas = defaultdict(lambda: [0, 0])
+    for fila in filas:
+        if fila['estado'] == estado_nuevo:
+            continue
+        creacion = _dia(fila['fecha_creacion'])
+        deltas[_celda(creacion, fila['estado'], fila)][0] -= 1
+        deltas[_celda(creacion, estado_nuevo, fila)][0] += 1
+        deltas[_celda(hoy, estado_nuevo, fila)][1] += 1
+    aplicar_deltas(deltas)
+
+
+def registrar_actualizacion(anterior, actual):
+    """Edición directa de la incidencia (sin CambioEstado): la mueve de celda si cambia alguna dimensión"""
+    if all(anterior[campo] == actual[campo] for campo in ('estado', 'tipo_incidencia', 'prioridad')):
+        return
+    deltas = defaultdict(lambda: [0, 0])
+    creacion = _dia(actual['fecha_creacion'])
+    deltas[_celda(creacion, anterior['estado'], anterior)][0] -= 1
+    deltas[_celda(creacion, actual['estado'], actual)][0] += 1
+    if (anterior['tipo_incidencia'], anterior['prioridad']) != (actual['tipo_incidencia'], actual['prioridad']):
+        # Su historial de cambios de estado pasa a contar con el nuevo tipo y prioridad
+        cambios = CambioEstado.objects.filter(incidencia_id=actual['id']).values_list('fecha', 'estado_nuevo')
+        for fecha, estado in cambios:
+            deltas[_celda(_dia(fecha), estado, anterior)][1] -= 1
+            deltas[_celda(_dia(fecha), estado, actual)][1] += 1
+    aplicar_deltas(deltas)
+
+
+def registrar_eliminaciones(filas):
+    """Incidencias que se van a borrar, con su historial de cambios de estado (antes del borrado)"""
+    filas = {fila['id']: fila for fila in filas}
+    deltas = defaultdict(lambda: [0, 0])
+    for fila in filas.values():
+        deltas[_celda(_dia(fila['fecha_creacion']), fila['estado'], fila)][0] -= 1
+    cambios = CambioEstado.objects.filter(incidencia_id__in=list(filas)).values_list('incidencia_id', 'fecha', 'estado_nuevo')
+    for incidencia_id, fecha, estado in cambios:
+        deltas[_celda(_dia(fecha), estado, filas[incidencia_id])][1] -= 1
+    aplicar_deltas(deltas)
+
+
+def reconstruir(reparar=True):
+    """Recalcula el cubo desde Incidencia y CambioEstado y, si `reparar`, lo sustituye.
+
+    Devuelve las celdas que no coincidían como tuplas
+    (celda, (incidencias, entradas) guardadas, (incidencias, entradas) reales).
+    """
+    with transaction.atomic():
+        # Como en contadores.reconciliar: casi toda escritura de incidencias bloquea un contador global
+        list(ContadorEstado.objects.select_for_update().order_by('estado'))
+
+        reales = defaultdict(lambda: (0, 0))
+        filas = Incidencia.objects.annotate(dia=TruncDate('fecha_creacion')).values(
+            'dia', 'estado', 'tipo_incidencia', 'prioridad'
+        ).annotate(total=Count('id')).order_by()
+        for fila in filas:
+            reales[(fila['dia'], fila['estado'], fila['tipo_incidencia'], fila['prioridad'])] = (fila['total'], 0)
+        filas = CambioEstado.objects.annotate(dia=TruncDate('fecha')).values(
+            'dia', 'estado_nuevo', 'incidencia__tipo_incidencia', 'incidencia__prioridad'
+        ).annotate(total=Count('id')).order_by()
+        for fila in filas:
+            clave = (fila['dia'], fila['estado_nuevo'], fila['incidencia__tipo_incidencia'], fila['incidencia__prioridad'])
+            reales[clave] = (reales[clave][0], fila['total'])
+
+        actuales = {
+            (fecha, estado, tipo, prioridad): (incidencias, entradas)
+            for fecha, estado, tipo, prioridad, incidencias, entradas in ResumenDiario.objects.values_list(
+                'fecha', 'estado', 'tipo_incidencia', 'prioridad', 'incidencias', 'entradas'
+            )
+        }
+        diferencias = [
+            (celda, actuales.get(celda, (0, 0)), reales.get(celda, (0, 0)))
+            for celda in sorted(set(reales) | set(actuales))
+            if actuales.get(celda, (0, 0)) != reales.get(celda, (0, 0))
+        ]
+
+        if reparar and diferencias:
+            ResumenDiario.objects.all().delete()
+            ResumenDiario.objects.bulk_create([
+                ResumenDiario(
+                    fecha=fecha, estado=estado, tipo_incidencia=tipo, prioridad=prioridad,
+                    incidencias=incidencias, entradas=entradas
+                )
+                for (fecha, estado, tipo, prioridad), (incidencias, entradas) in reales.items()
+            ], batch_size=1000)
+
+    return diferencias
+
+
+# ==================== Consultas ====================
+
+def leer_filtros(params):
+    """Filtros de la petición con la misma sintaxis que el reporte (fechas YYYY-MM-DD, 'todos')"""
+    filtros = {}
+    for campo in ('fecha_desde', 'fecha_hasta'):
+        try:
+            filtros[campo] = datetime.strptime(params.get(campo, ''), '%Y-%m-%d').date()
+        except ValueError:
+            filtros[campo] = None
+    estado = params.get('estado')
+    tipo = params.get('tipo')
+    prioridad = params.get('prioridad')
+    filtros['estado'] = estado if estado and estado != 'todos' else None
+    filtros['tipo'] = tipo if tipo and tipo != 'todos' else None
+    filtros['prioridad'] = prioridad if prioridad and prioridad != 'todas' else None
+    return filtros
+
+
+def _celdas(filtros, con_estado=True):
+    queryset = ResumenDiario.objects.all()
+    if filtros['fecha_desde']:
+        queryset = queryset.filter(fecha__gte=filtros['fecha_desde'])
+    if filtros['fecha_hasta']:
+        queryset = queryset.filter(fecha__lte=filtros['fecha_hasta'])
+    if con_estado and filtros['estado']:
+        queryset = queryset.filter(estado=filtros['estado'])
+    if filtros['tipo']:
+        queryset = queryset.filter(tipo_incidencia=filtros['tipo'])
+    if filtros['prioridad']:
+        queryset = queryset.filter(prioridad=filtros['prioridad'])
+    return queryset
+
+
+def resumen(filtros):
+    """Estadísticas de las incidencias creadas en el rango, como las del reporte, y su desglose"""
+    celdas = _celdas(filtros)
+    estadisticas = {'total': 0, **dict.fromkeys(ESTADOS, 0)}
+    por_tipo = defaultdict(int)
+    por_prioridad = defaultdict(int)
+    filas = celdas.values('estado', 'tipo_incidencia', 'prioridad').annotate(total=Sum('incidencias')).order_by()
+    for fila in filas:
+        estadisticas['total'] += fila['total']
+        estadisticas[fila['estado']] = estadisticas.get(fila['estado'], 0) + fila['total']
+        por_tipo[fila['tipo_incidencia']] += fila['total']
+        por_prioridad[fila['prioridad']] += fila['total']
+    return {
+        'estadisticas': estadisticas,
+        'por_tipo': dict(por_tipo),
+        'por_prioridad': dict(por_prioridad),
+    }
+
+
+def tendencia(filtros, agrupar='dia'):
+    """Serie por día, semana o mes: incidencias creadas y entradas en cada estado.
+
+    Sin fecha_desde cubre los últimos 30 días. Los periodos sin actividad
+    aparecen con ceros. Lanza ValueError con una agrupación desconocida o si
+    la serie tendría más de MAX_PERIODOS puntos.
+    """
+    if agrupar not in AGRUPACIONES:
+        raise ValueError(f'Agrupación no válida: usa {", ".join(AGRUPACIONES)}')
+    hasta = filtros['fecha_hasta'] or timezone.localdate()
+    desde = filtros['fecha_desde'] or hasta - timedelta(days=29)
+    periodos = _periodos(desde, hasta, agrupar)
+    if len(periodos) > MAX_PERIODOS:
+        raise ValueError(f'El rango tiene más de {MAX_PERIODOS} periodos; usa una agrupación mayor')
+
+    # El filtro de estado no recorta la serie: elige qué estado se informa en `entradas`
+    celdas = _celdas({**filtros, 'fecha_desde': desde, 'fecha_hasta': hasta}, con_estado=False)
+    truncar = AGRUPACIONES[agrupar]
+    periodo = truncar('fecha') if truncar else F('fecha')
+    estados = [filtros['estado']] if filtros['estado'] else ESTADOS
+    filas = celdas.annotate(periodo=periodo).values('periodo').annotate(
+        creadas=Sum('incidencias'),
+        **{estado: Sum('entradas', filter=Q(estado=estado)) for estado in estados}
+    ).order_by()
+
+    serie = {
+        inicio: {'fecha': inicio, 'creadas': 0, 'entradas': dict.fromkeys(estados, 0)}
+        for inicio in periodos
+    }
+    for fila in filas:
+        punto = serie[_como_fecha(fila['periodo'])]
+        punto['creadas'] = fila['creadas'] or 0
+        punto['entradas'] = {estado: fila[estado] or 0 for estado in estados}
+    return {'desde': desde, 'hasta': hasta, 'agrupar': agrupar, 'serie': list(serie.values())}
+
+
+def _como_fecha(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _periodos(desde, hasta, agrupar):
+    if agrupar == 'semana':
+        # TruncWeek empieza las semanas en lunes
+        inicio, paso = desde - timedelta(days=desde.weekday()), timedelta(weeks=1)
+    elif agrupar == 'mes':
+        inicio, paso = desde.replace(day=1), None
+    else:
+        inicio, paso = desde, timedelta(days=1)
+
+    periodos = []
+    while inicio <= hasta and len(periodos) <= MAX_PERIODOS:
+        periodos.append(inicio)
+        if paso is None:
+            inicio = date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+        else:
+            inicio += paso
+    return periodos
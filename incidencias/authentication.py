@@ -0,0 +1,263 @@
+"""Autenticación por token con caché token -> usuario en memoria del proceso.
+
+Cada proceso mantiene su propia caché LRU con caducidad (TTL). Las vistas que
+revocan un token o modifican a un usuario lo invalidan en el proceso que
+atiende la petición y además dejan la hora de la revocación en la caché de
+Django (TOKEN_AUTH_CACHE['CACHE']). En cada acierto los demás procesos
+consultan esa marca y descartan las entradas leídas antes de ella, de modo que
+un token revocado deja de funcionar de inmediato en todos. Con varios
+procesos la caché de Django tiene que ser compartida (CACHE_REDIS_URL); con la
+caché en memoria por defecto los demás procesos solo lo notan al cumplirse el
+TTL.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+CONFIGURACION_POR_DEFECTO = {
+    'MAX_ENTRADAS': 10000,
+    'TTL': 60,
+    # Caché de Django donde se publican las revocaciones para los demás procesos
+    'CACHE': 'default',
+}
+
+
+class CacheTokens:
+    """Caché LRU con TTL de token -> (usuario, token, leido), segura entre hilos.
+
+    `leido` es la hora (time.time()) a la que se consultó la base de datos, para
+    compararla con las revocaciones publicadas por otros procesos.
+    """
+
+    def __init__(self, max_entradas, ttl, cache='default'):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.cache = cache
+        self._entradas = OrderedDict()
+        self._tokens_por_usuario = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.caducadas = 0
+        self.invalidaciones = 0
+        self.revocadas = 0
+
+    def obtener(self, key):
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(key)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            caduca, usuario, token, leido = entrada
+            if caduca <= ahora:
+                self._quitar(key)
+                self.caducadas += 1
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(key)
+            self.aciertos += 1
+        return usuario, token, leido
+
+    def guardar(self, key, usuario, token, leido):
+        with self._lock:
+            if key in self._entradas:
+                self._quitar(key)
+            self._entradas[key] = (time.monotonic() + self.ttl, usuario, token, leido)
+            self._tokens_por_usuario.setdefault(usuario.pk, set()).add(key)
+            while len(self._entradas) > self.max_entradas:
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar_token(self, key):
+        with self._lock:
+            if key in self._entradas:
+                self._quitar(key)
+                self.invalidaciones += 1
+
+    def invalidar_usuario(self, usuario_id):
+        with self._lock:
+            for key in list(self._tokens_por_usuario.get(usuario_id, ())):
+                self._quitar(key)
+                self.invalidaciones += 1
+
+    def descartar_revocada(self, key):
+        """Quita una entrada que otro proceso ha revocado; el acierto pasa a ser un fallo"""
+        with self._lock:
+            if key in self._entradas:
+                self._quitar(key)
+            self.aciertos -= 1
+            self.fallos += 1
+            self.revocadas += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._tokens_por_usuario.clear()
+
+    def metricas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'caducadas': self.caducadas,
+                'invalidaciones': self.invalidaciones,
+                'revocadas': self.revocadas,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+            }
+
+    def _quitar(self, key):
+        _, usuario, _, _ = self._entradas.pop(key)
+        keys = self._tokens_por_usuario.get(usuario.pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tokens_por_usuario[usuario.pk]
+
+
+def _crear_cache():
+    configuracion = {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+    return CacheTokens(configuracion['MAX_ENTRADAS'], configuracion['TTL'], configuracion['CACHE'])
+
+
+cache_tokens = _crear_cache()
+
+
+# ==================== Revocaciones compartidas ====================
+
+def _clave_token(key):
+    return f'auth:tokens:revocado:{hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]}'
+
+
+def _clave_usuario(usuario_id):
+    return f'auth:tokens:usuario:{usuario_id}'
+
+
+def _claves_revocacion(key, usuario):
+    return [_clave_token(key), _clave_usuario(usuario.pk)]
+
+
+def _revocada(marcas, leido):
+    """Si alguna revocación publicada es posterior a la lectura de la entrada"""
+    return any(marca >= leido for marca in marcas.values())
+
+
+def vigente(key, entrada):
+    """Comprueba en la caché compartida que la entrada no se ha revocado desde que se leyó"""
+    usuario, leido = entrada[0], entrada[2]
+    marcas = caches[cache_tokens.cache].get_many(_claves_revocacion(key, usuario))
+    if _revocada(marcas, leido):
+        cache_tokens.descartar_revocada(key)
+        return False
+    return True
+
+
+async def avigente(key, entrada):
+    """Versión asíncrona de vigente"""
+    usuario, leido = entrada[0], entrada[2]
+    marcas = await caches[cache_tokens.cache].aget_many(_claves_revocacion(key, usuario))
+    if _revocada(marcas, leido):
+        cache_tokens.descartar_revocada(key)
+        return False
+    return True
+
+
+def _publicar_revocacion(clave):
+    # Basta con que dure lo que una entrada de la caché: las anteriores ya habrán caducado
+    caches[cache_tokens.cache].set(clave, time.time(), cache_tokens.ttl)
+
+
+class CacheTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication que evita la consulta token + usuario en cada petición"""
+
+    def authenticate_credentials(self, key):
+        entrada = cache_tokens.obtener(key)
+        if entrada is not None and not vigente(key, entrada):
+            entrada = None
+        if entrada is None:
+            # La hora se toma antes de la consulta: una revocación simultánea la invalida
+            leido = time.time()
+            usuario, token = super().authenticate_credentials(key)
+            cache_tokens.guardar(key, usuario, token, leido)
+            entrada = (usuario, token, leido)
+
+        usuario, token = entrada[:2]
+        if not usuario.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        # Cada petición recibe su propia copia para no compartir cambios entre hilos
+        return copy.copy(usuario), token
+
+    async def aauthenticate(self, request):
+        """Versión asíncrona de authenticate() para las vistas ASGI (incidencias.vistas_async).
+
+        Recibe la HttpRequest de Django. Con el token en caché no consulta la base de datos.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+        entrada = cache_tokens.obtener(key)
+        if entrada is not None and not await avigente(key, entrada):
+            entrada = None
+        if entrada is None:
+            leido = time.time()
+            model = self.get_model()
+            try:
+                token = await model.objects.select_related('user').aget(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache_tokens.guardar(key, token.user, token, leido)
+            entrada = (token.user, token, leido)
+
+        usuario, token = entrada[:2]
+        if not usuario.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return copy.copy(usuario), token
+
+
+def invalidar_token(key):
+    """Elimina un token de la caché en todos los procesos (también al confirmarse la transacción en curso)"""
+    def invalidar():
+        cache_tokens.invalidar_token(key)
+        _publicar_revocacion(_clave_token(key))
+
+    invalidar()
+    transaction.on_commit(invalidar)
+
+
+def invalidar_usuario(usuario_id):
+    """Elimina de la caché todos los tokens de un usuario, en todos los procesos.
+
+    Se invalida de inmediato y de nuevo al confirmar la transacción, para que una
+    petición concurrente no vuelva a guardar el usuario con los datos anteriores.
+    """
+    def invalidar():
+        cache_tokens.invalidar_usuario(usuario_id)
+        _publicar_revocacion(_clave_usuario(usuario_id))
+
+    invalidar()
+    transaction.on_commit(invalidar)
@@ -0,0 +1,92 @@
+"""ETags fuertes y GET condicional sin serializar la respuesta.
+
+El validador se calcula con marcadores baratos (fecha_actualizacion máxima,
+última eliminación, contadores) antes de cargar y serializar los datos; si
+coincide con If-None-Match se responde 304 sin cuerpo. Además de los
+marcadores, el ETag incluye todo lo que cambia la representación: rol e id del
+usuario, ruta y parámetros de la URL, tipo de contenido negociado y host (las URLs de
+las imágenes son absolutas). Así una respuesta de administrador nunca valida
+la caché de un trabajador.
+
+Los marcadores dependen de que todo cambio visible en una incidencia actualice
+su fecha_actualizacion (también comentarios y cambios de nombre de usuario).
+"""
+import hashlib
+import json
+
+from django.db.models import Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from sincronizacion.models import IncidenciaEliminada
+
+from .models import Incidencia
+
+
+def calcular_etag(request, *marcadores):
+    usuario = request.user
+    renderer = getattr(request, 'accepted_renderer', None)
+    partes = [
+        usuario.tipo_usuario,
+        usuario.pk,
+        request.get_host(),
+        request.path,
+        getattr(request, 'accepted_media_type', None) or getattr(renderer, 'media_type', None),
+        sorted(request.query_params.lists()),
+        *marcadores,
+    ]
+    resumen = hashlib.sha256(json.dumps(partes, default=str, separators=(',', ':')).encode('utf-8'))
+    return f'"{resumen.hexdigest()[:40]}"'
+
+
+def marcadores_incidencias(usuario):
+    """Última modificación y última eliminación entre las incidencias visibles para `usuario`.
+
+    Ambas consultas se resuelven con los índices sobre fecha_actualizacion y
+    fecha_eliminacion, sin recorrer las filas.
+    """
+    incidencias, eliminadas = _visibles(usuario)
+    return (
+        incidencias.aggregate(ultima=Max('fecha_actualizacion'))['ultima'],
+        eliminadas.aggregate(ultima=Max('fecha_eliminacion'))['ultima'],
+    )
+
+
+async def amarcadores_incidencias(usuario):
+    """Versión asíncrona de marcadores_incidencias"""
+    incidencias, eliminadas = _visibles(usuario)
+    return (
+        (await incidencias.aaggregate(ultima=Max('fecha_actualizacion')))['ultima'],
+        (await eliminadas.aaggregate(ultima=Max('fecha_eliminacion')))['ultima'],
+    )
+
+
+def _visibles(usuario):
+    incidencias = Incidencia.objects.all()
+    eliminadas = IncidenciaEliminada.objects.all()
+    if usuario.tipo_usuario == 'trabajador':
+        incidencias = incidencias.filter(usuario_creador=usuario)
+        eliminadas = eliminadas.filter(usuario_creador_id=usuario.pk)
+    return incidencias, eliminadas
+
+
+def no_modificada(request, etag):
+    """Respuesta 304 si If-None-Match coincide con `etag`; None en otro caso"""
+    cabecera = request.headers.get('If-None-Match')
+    if not cabecera:
+        return None
+    # Comparación débil (RFC 9110): un proxy que comprime puede haber marcado el ETag como W/
+    etags = {valor.removeprefix('W/') for valor in parse_etags(cabecera)}
+    if '*' not in etags and etag not in etags:
+        return None
+    return con_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+
+def con_etag(response, etag):
+    response['ETag'] = etag
+    # Cada usuario tiene su propia representación: nunca en cachés compartidas
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,407 @@
+"""Cambios de incidencias en tiempo real mediante Server-Sent Events.
+
+Las vistas publican un evento al crear una incidencia, cambiar su estado o
+añadirle un comentario. El evento sale con transaction.on_commit: un cliente
+nunca recibe un cambio que luego se deshace. Cada proceso reparte los eventos
+en memoria entre sus conexiones abiertas; con varios workers se configura en
+EVENTOS['BROKER'] un broker compartido (BrokerRedis) que hace llegar a todos
+los procesos lo que publica cualquiera de ellos.
+
+Un trabajador solo recibe eventos de sus propias incidencias y nunca los
+comentarios no visibles; los administradores lo reciben todo.
+
+Bajo WSGI cada conexión abierta ocupa un hilo (flujo_eventos); bajo ASGI
+aflujo_eventos espera los eventos en el bucle de eventos sin ocupar ninguno.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_fecha = serializers.DateTimeField()
+
+CONFIGURACION_POR_DEFECTO = {
+    'BROKER': 'incidencias.eventos.BrokerMemoria',
+    'OPCIONES': {},
+    # Eventos recientes que se guardan para reenviar tras una reconexión (Last-Event-ID)
+    'HISTORIAL': 1000,
+    # Eventos pendientes por conexión antes de considerarla desbordada
+    'MAX_PENDIENTES': 200,
+    # Segundos entre comentarios de latido para mantener viva la conexión
+    'LATIDO': 15,
+    # Segundos tras los que se cierra el flujo; el cliente se reconecta solo
+    'DURACION_MAXIMA': 300,
+    # Milisegundos que el cliente espera antes de reconectar
+    'REINTENTO_MS': 5000,
+}
+
+# Evento que indica al cliente que ha podido perder cambios y debe recargar
+REINICIO = 'reinicio'
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'EVENTOS', {})}
+
+
+class Suscripcion:
+    """Conexión abierta de un usuario: una cola acotada de eventos pendientes"""
+
+    def __init__(self, usuario_id, es_administrador, max_pendientes):
+        self.usuario_id = usuario_id
+        self.es_administrador = es_administrador
+        self.cola = queue.Queue(maxsize=max_pendientes)
+        self.desbordada = False
+
+    def puede_ver(self, evento):
+        if evento['tipo'] == REINICIO or self.es_administrador:
+            return True
+        return evento['usuario_creador'] == self.usuario_id and not evento.get('solo_administradores')
+
+    def entregar(self, evento):
+        if not self.puede_ver(evento):
+            return False
+        try:
+            self.cola.put_nowait(evento)
+        except queue.Full:
+            # Cliente demasiado lento: se le pedirá recargar en lugar de crecer sin límite
+            self.desbordada = True
+            return False
+        return True
+
+    def siguiente(self, timeout):
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def vaciar(self):
+        while True:
+            try:
+                self.cola.get_nowait()
+            except queue.Empty:
+                break
+        self.desbordada = False
+
+
+class SuscripcionAsincrona(Suscripcion):
+    """Suscripción de una conexión ASGI: los eventos llegan desde otros hilos al bucle de eventos"""
+
+    def __init__(self, usuario_id, es_administrador, max_pendientes):
+        super().__init__(usuario_id, es_administrador, max_pendientes)
+        self.cola = asyncio.Queue()
+        self._bucle = asyncio.get_running_loop()
+        self._max_pendientes = max_pendientes
+        self._pendientes = 0
+        self._lock = threading.Lock()
+
+    def entregar(self, evento):
+        if not self.puede_ver(evento):
+            return False
+        with self._lock:
+            if self._pendientes >= self._max_pendientes:
+                self.desbordada = True
+                return False
+            self._pendientes += 1
+        try:
+            self._bucle.call_soon_threadsafe(self.cola.put_nowait, evento)
+        except RuntimeError:
+            # El bucle ya se ha cerrado: la conexión está terminando
+            return False
+        return True
+
+    async def siguiente(self, timeout):
+        try:
+            evento = await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        with self._lock:
+            self._pendientes -= 1
+        return evento
+
+    def vaciar(self):
+        while True:
+            try:
+                self.cola.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            with self._lock:
+                self._pendientes -= 1
+        self.desbordada = False
+
+
+class Distribuidor:
+    """Reparte los eventos entre las suscripciones de este proceso"""
+
+    def __init__(self, historial):
+        self._suscripciones = set()
+        self._historial = deque(maxlen=historial)
+        self._lock = threading.Lock()
+        self.publicados = 0
+        self.entregados = 0
+        self.desbordes = 0
+
+    def suscribir(self, suscripcion, ultimo_id=None):
+        """Registra la suscripción y devuelve los eventos posteriores a `ultimo_id`.
+
+        Devuelve None si `ultimo_id` ya no está en el historial de este proceso.
+        """
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+            if not ultimo_id:
+                return []
+            historial = list(self._historial)
+        for posicion, evento in enumerate(historial):
+            if evento['id'] == ultimo_id:
+                return [evento for evento in historial[posicion + 1:] if suscripcion.puede_ver(evento)]
+        return None
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def distribuir(self, evento):
+        with self._lock:
+            self._historial.append(evento)
+            suscripciones = list(self._suscripciones)
+            self.publicados += 1
+        entregados = desbordes = 0
+        for suscripcion in suscripciones:
+            ya_desbordada = suscripcion.desbordada
+            if suscripcion.entregar(evento):
+                entregados += 1
+            elif suscripcion.desbordada and not ya_desbordada:
+                desbordes += 1
+        with self._lock:
+            self.entregados += entregados
+            self.desbordes += desbordes
+
+    def reiniciar(self):
+        """Avisa a todas las conexiones de que han podido perder eventos"""
+        with self._lock:
+            self._historial.clear()
+        self.distribuir(_evento(REINICIO))
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'conexiones': len(self._suscripciones),
+                'publicados': self.publicados,
+                'entregados': self.entregados,
+                'desbordes': self.desbordes,
+            }
+
+
+class BrokerMemoria:
+    """Broker de un solo proceso: entrega directamente a las conexiones locales"""
+
+    def __init__(self, distribuidor):
+        self.distribuidor = distribuidor
+
+    def iniciar(self):
+        pass
+
+    def publicar(self, evento):
+        self.distribuidor.distribuir(evento)
+
+
+class BrokerRedis:
+    """Comparte los eventos entre procesos con un canal pub/sub de Redis.
+
+    Cada proceso escucha el canal en un hilo en segundo plano desde su primera
+    conexión o publicación. Si la escucha se corta, al recuperarla se envía un
+    evento de reinicio a las conexiones locales. Requiere el paquete `redis`.
+    """
+
+    def __init__(self, distribuidor, url='redis://localhost:6379/0', canal='incidencias:eventos'):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('BrokerRedis requiere el paquete redis')
+        self.distribuidor = distribuidor
+        self.canal = canal
+        self._redis = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+
+    def iniciar(self):
+        with self._lock:
+            # Tras un fork el hilo de escucha no existe en el proceso hijo
+            if self._hilo is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._escuchar, name='eventos-redis', daemon=True)
+            self._hilo.start()
+
+    def publicar(self, evento):
+        self.iniciar()
+        self._redis.publish(self.canal, json.dumps(evento))
+
+    def _escuchar(self):
+        conectado_antes = False
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.canal)
+                if conectado_antes:
+                    self.distribuidor.reiniciar()
+                conectado_antes = True
+                for mensaje in pubsub.listen():
+                    if mensaje['type'] == 'message':
+                        self.distribuidor.distribuir(json.loads(mensaje['data']))
+            except Exception:
+                logger.exception('Error escuchando eventos en Redis; reintentando')
+                time.sleep(1)
+
+
+class CanalEventos:
+    """Punto de entrada: publica eventos y abre suscripciones con el broker configurado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._broker = None
+        self._distribuidor = None
+
+    @property
+    def broker(self):
+        with self._lock:
+            if self._broker is None:
+                opciones = configuracion()
+                self._distribuidor = Distribuidor(opciones['HISTORIAL'])
+                self._broker = import_string(opciones['BROKER'])(self._distribuidor, **opciones['OPCIONES'])
+            return self._broker
+
+    @property
+    def distribuidor(self):
+        return self.broker.distribuidor
+
+    def publicar(self, evento):
+        self.broker.publicar(evento)
+
+    def suscribir(self, usuario, ultimo_id=None, asincrona=False):
+        opciones = configuracion()
+        clase = SuscripcionAsincrona if asincrona else Suscripcion
+        suscripcion = clase(usuario.pk, usuario.tipo_usuario == 'administrador', opciones['MAX_PENDIENTES'])
+        self.broker.iniciar()
+        return suscripcion, self.distribuidor.suscribir(suscripcion, ultimo_id)
+
+    def cancelar(self, suscripcion):
+        self.distribuidor.cancelar(suscripcion)
+
+    def metricas(self):
+        return self.distribuidor.metricas()
+
+    def reset(self):
+        """Olvida el broker para volver a leer la configuración (pruebas)"""
+        with self._lock:
+            self._broker = None
+            self._distribuidor = None
+
+
+canal_eventos = CanalEventos()
+
+
+def _evento(tipo, incidencia_id=None, usuario_creador_id=None, solo_administradores=False, **datos):
+    evento = {
+        # Único entre procesos y ordenable, para Last-Event-ID
+        'id': f'{time.time_ns()}-{secrets.token_hex(4)}',
+        'tipo': tipo,
+        'incidencia': incidencia_id,
+        'usuario_creador': usuario_creador_id,
+        'fecha': _fecha.to_representation(timezone.now()),
+        'datos': datos,
+    }
+    if solo_administradores:
+        evento['solo_administradores'] = True
+    return evento
+
+
+def publicar_evento(tipo, incidencia_id, usuario_creador_id, solo_administradores=False, **datos):
+    """Publica un evento de incidencia cuando se confirme la transacción en curso"""
+    evento = _evento(tipo, incidencia_id, usuario_creador_id, solo_administradores, **datos)
+    # Un fallo del broker no debe romper la petición que ya ha guardado el cambio
+    transaction.on_commit(lambda: canal_eventos.publicar(evento), robust=True)
+
+
+def formatear(evento):
+    """Representa un evento en el formato de texto de Server-Sent Events"""
+    datos = {clave: valor for clave, valor in evento.items() if clave != 'solo_administradores'}
+    return f'id: {evento["id"]}\nevent: {evento["tipo"]}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n'
+
+
+def flujo_eventos(usuario, ultimo_id=None):
+    """Generador del cuerpo de la respuesta text/event-stream de un usuario.
+
+    Reenvía lo perdido desde `ultimo_id` si sigue en el historial (o un evento
+    de reinicio si no), manda latidos mientras no hay eventos y termina tras
+    DURACION_MAXIMA para que el cliente se reconecte con su Last-Event-ID.
+    """
+    opciones = configuracion()
+    suscripcion, pendientes = canal_eventos.suscribir(usuario, ultimo_id)
+    # La conexión a la base de datos no se usa mientras el flujo está abierto
+    for conexion in connections.all(initialized_only=True):
+        if not conexion.in_atomic_block:
+            conexion.close()
+    try:
+        yield from _inicio_flujo(opciones, pendientes)
+
+        fin = time.monotonic() + opciones['DURACION_MAXIMA']
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                break
+            evento = suscripcion.siguiente(min(opciones['LATIDO'], restante))
+            yield _bloque(suscripcion, evento)
+    finally:
+        canal_eventos.cancelar(suscripcion)
+
+
+async def aflujo_eventos(usuario, ultimo_id=None):
+    """Versión asíncrona de flujo_eventos para StreamingHttpResponse bajo ASGI"""
+    opciones = configuracion()
+    suscripcion, pendientes = canal_eventos.suscribir(usuario, ultimo_id, asincrona=True)
+    try:
+        for bloque in _inicio_flujo(opciones, pendientes):
+            yield bloque
+
+        fin = time.monotonic() + opciones['DURACION_MAXIMA']
+        while True:
+            restante = fin - time.monotonic()
+            if restante <= 0:
+                break
+            evento = await suscripcion.siguiente(min(opciones['LATIDO'], restante))
+            yield _bloque(suscripcion, evento)
+    finally:
+        canal_eventos.cancelar(suscripcion)
+
+
+def _inicio_flujo(opciones, pendientes):
+    yield f'retry: {opciones["REINTENTO_MS"]}\n\n'
+    if pendientes is None:
+        yield formatear(_evento(REINICIO))
+    else:
+        for evento in pendientes:
+            yield formatear(evento)
+
+
+def _bloque(suscripcion, evento):
+    if suscripcion.desbordada:
+        suscripcion.vaciar()
+        return formatear(_evento(REINICIO))
+    if evento is None:
+        return ': latido\n\n'
+    return formatear(evento)
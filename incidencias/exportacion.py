@@ -0,0 +1,231 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q, Count
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from busqueda.buscador import buscar_incidencias
+
+from .models import Incidencia
+
+# Columnas planas de la exportación (sin historial ni comentarios anidados)
+COLUMNAS_EXPORTACION = [
+    'id', 'tipo_incidencia', 'descripcion', 'prioridad', 'ubicacion', 'estado',
+    'fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion',
+    'usuario_creador', 'usuario_creador_nombre', 'imagen',
+]
+
+_CAMPOS_VALUES = [
+    'id', 'tipo_incidencia', 'descripcion', 'prioridad', 'ubicacion', 'estado',
+    'fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion',
+    'usuario_creador', 'usuario_creador__nombre_completo', 'imagen',
+]
+
+_CAMPOS_FECHA = ('fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion')
+
+_fecha = serializers.DateTimeField()
+
+# Caracteres con los que Excel y LibreOffice interpretan una celda como fórmula
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def filtrar_incidencias_reporte(params):
+    """Aplica los filtros de reporte a las incidencias.
+
+    Devuelve el queryset filtrado y los filtros tal como se reportan en la respuesta.
+    """
+    fecha_desde = params.get('fecha_desde')
+    fecha_hasta = params.get('fecha_hasta')
+    estado = params.get('estado')
+    tipo = params.get('tipo')
+    prioridad = params.get('prioridad')
+    q = params.get('q')
+
+    queryset = Incidencia.objects.all()
+
+    # Aplicar filtros. Las fechas se convierten en un rango semiabierto
+    # [inicio del día desde, inicio del día siguiente a hasta) en la zona horaria
+    # actual, para comparar la columna directamente y poder usar los índices
+    if fecha_desde:
+        try:
+            fecha_desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
+            queryset = queryset.filter(fecha_creacion__gte=inicio_dia(fecha_desde))
+        except ValueError:
+            pass
+
+    if fecha_hasta:
+        try:
+            fecha_hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
+            queryset = queryset.filter(fecha_creacion__lt=inicio_dia(fecha_hasta + timedelta(days=1)))
+        except ValueError:
+            pass
+
+    if estado and estado != 'todos':
+        queryset = queryset.filter(estado=estado)
+
+    if tipo and tipo != 'todos':
+        queryset = queryset.filter(tipo_incidencia=tipo)
+
+    if prioridad and prioridad != 'todas':
+        queryset = queryset.filter(prioridad=prioridad)
+
+    # Los reportes mantienen su orden cronológico: la búsqueda solo filtra
+    if q:
+        queryset = buscar_incidencias(queryset, q, ordenar=False)
+
+    filtros = {
+        'fecha_desde': fecha_desde,
+        'fecha_hasta': fecha_hasta,
+        'estado': estado,
+        'tipo': tipo,
+        'prioridad': prioridad,
+        'q': q
+    }
+    return queryset, filtros
+
+
+def inicio_dia(fecha):
+    """Primer instante de `fecha` en la zona horaria actual"""
+    inicio = datetime.combine(fecha, time.min)
+    if settings.USE_TZ:
+        return timezone.make_aware(inicio)
+    return inicio
+
+
+def estadisticas_reporte(queryset):
+    """Conteo por estado de las incidencias del reporte"""
+    return queryset.aggregate(**_conteos_reporte())
+
+
+async def aestadisticas_reporte(queryset):
+    """Versión asíncrona de estadisticas_reporte"""
+    return await queryset.aaggregate(**_conteos_reporte())
+
+
+def _conteos_reporte():
+    return {
+        'total': Count('id'),
+        'pendiente': Count('id', filter=Q(estado='pendiente')),
+        'en_proceso': Count('id', filter=Q(estado='en_proceso')),
+        'resuelto': Count('id', filter=Q(estado='resuelto')),
+    }
+
+
+def filas_reporte(queryset, request=None, chunk_size=2000):
+    """Recorre el reporte con un cursor del servidor devolviendo una fila plana por incidencia.
+
+    Solo mantiene en memoria un bloque de `chunk_size` filas a la vez.
+    """
+    filas = queryset.order_by('-fecha_creacion').values_list(*_CAMPOS_VALUES)
+    for valores in filas.iterator(chunk_size=chunk_size):
+        yield _fila_reporte(valores, request)
+
+
+async def afilas_reporte(queryset, request=None, chunk_size=2000):
+    """Versión asíncrona de filas_reporte"""
+    filas = queryset.order_by('-fecha_creacion').values_list(*_CAMPOS_VALUES)
+    # QuerySet.aiterator() no sirve con values_list (ejecuta la consulta fuera
+    # del hilo): se pide cada bloque al mismo iterador síncrono en su hilo.
+    iterador = filas.iterator(chunk_size=chunk_size)
+    siguiente_bloque = sync_to_async(lambda: list(islice(iterador, chunk_size)))
+    while bloque := await siguiente_bloque():
+        for valores in bloque:
+            yield _fila_reporte(valores, request)
+
+
+def _fila_reporte(valores, request):
+    fila = dict(zip(COLUMNAS_EXPORTACION, valores))
+    for campo in _CAMPOS_FECHA:
+        if fila[campo] is not None:
+            fila[campo] = _fecha.to_representation(fila[campo])
+    fila['imagen'] = _url_imagen(fila['imagen'], request)
+    return fila
+
+
+def _url_imagen(nombre, request):
+    if not nombre:
+        return None
+    url = default_storage.url(nombre)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def es_formula(valor):
+    """Si una hoja de cálculo interpretaría el valor como fórmula"""
+    return isinstance(valor, str) and valor.startswith(_INICIO_FORMULA)
+
+
+def celda_segura(valor):
+    """Neutraliza para CSV los textos que serían fórmulas anteponiendo un apóstrofo"""
+    if es_formula(valor):
+        return "'" + valor
+    return valor
+
+
+def celdas_fila(fila):
+    """Valores de una fila del reporte en el orden de COLUMNAS_EXPORTACION, listos para CSV"""
+    return [celda_segura(fila[columna]) for columna in COLUMNAS_EXPORTACION]
+
+
+class _Eco:
+    """Pseudo-archivo para que csv.writer devuelva cada línea en lugar de almacenarla"""
+    def write(self, value):
+        return value
+
+
+def exportar_csv(queryset, filtros, request=None):
+    """Genera el reporte en CSV línea a línea, con las estadísticas y filtros al final"""
+    writer = csv.writer(_Eco())
+    yield writer.writerow(COLUMNAS_EXPORTACION)
+    for fila in filas_reporte(queryset, request):
+        yield writer.writerow(celdas_fila(fila))
+
+    yield from _pie_csv(writer, estadisticas_reporte(queryset), filtros)
+
+
+async def aexportar_csv(queryset, filtros, request=None):
+    """Versión asíncrona de exportar_csv, para StreamingHttpResponse bajo ASGI"""
+    writer = csv.writer(_Eco())
+    yield writer.writerow(COLUMNAS_EXPORTACION)
+    async for fila in afilas_reporte(queryset, request):
+        yield writer.writerow(celdas_fila(fila))
+
+    for linea in _pie_csv(writer, await aestadisticas_reporte(queryset), filtros):
+        yield linea
+
+
+def _pie_csv(writer, stats, filtros):
+    yield writer.writerow([])
+    yield writer.writerow(['seccion', 'clave', 'valor'])
+    for clave, valor in stats.items():
+        yield writer.writerow(['estadisticas', clave, valor])
+    for clave, valor in filtros.items():
+        yield writer.writerow(['filtros_aplicados', clave, '' if valor is None else celda_segura(valor)])
+
+
+def exportar_ndjson(queryset, filtros, request=None):
+    """Genera el reporte en NDJSON: un registro de filtros, una línea por incidencia y las estadísticas al final"""
+    yield _linea_json({'filtros_aplicados': filtros})
+    for fila in filas_reporte(queryset, request):
+        yield _linea_json(fila)
+    yield _linea_json({'estadisticas': estadisticas_reporte(queryset)})
+
+
+async def aexportar_ndjson(queryset, filtros, request=None):
+    """Versión asíncrona de exportar_ndjson, para StreamingHttpResponse bajo ASGI"""
+    yield _linea_json({'filtros_aplicados': filtros})
+    async for fila in afilas_reporte(queryset, request):
+        yield _linea_json(fila)
+    yield _linea_json({'estadisticas': await aestadisticas_reporte(queryset)})
+
+
+def _linea_json(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -0,0 +1,226 @@
+"""Subida, deduplicación y variantes redimensionadas de las imágenes de incidencias.
+
+- HashUploadHandler escribe cada subida en un archivo temporal por bloques y va
+  calculando su SHA-256, sin tener nunca el archivo entero en memoria. Solo lo
+  usan las vistas que reciben imágenes de incidencias (SubidaImagenesMixin);
+  las demás subidas siguen con los manejadores por defecto de Django.
+- Las imágenes se guardan con un nombre derivado de su contenido
+  (incidencias/<ab>/<sha256>.<ext>): dos subidas idénticas comparten archivo.
+- Tras confirmar la transacción, un pool de hilos genera las variantes
+  (miniatura y vista previa, JPEG sin EXIF) con nombres deterministas, de modo
+  que el serializer puede dar sus URLs sin consultar nada.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import Incidencia
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACION_POR_DEFECTO = {
+    'HILOS': 2,
+    'CALIDAD_JPEG': 80,
+    # Variante -> lado máximo en píxeles
+    'VARIANTES': {'miniatura': 240, 'vista_previa': 1280},
+}
+
+# Extensión de archivo para cada formato que Pillow reconoce
+EXTENSIONES = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp', 'HEIF': 'heic', 'BMP': 'bmp'}
+
+CARPETA = 'incidencias'
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'IMAGENES', {})}
+
+
+def almacenamiento():
+    return Incidencia._meta.get_field('imagen').storage
+
+
+class HashUploadHandler(TemporaryFileUploadHandler):
+    """Guarda la subida en disco por bloques y calcula su SHA-256 al vuelo (archivo.sha256)"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hash = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        archivo.sha256 = self._hash.hexdigest()
+        return archivo
+
+
+class SubidaImagenesMixin:
+    """Para vistas DRF que reciben la imagen de una incidencia: sus subidas pasan por HashUploadHandler"""
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Antes de que nada lea el cuerpo de la petición
+        request.upload_handlers.insert(0, HashUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
+
+
+def _sha256(archivo):
+    sha = getattr(archivo, 'sha256', None)
+    if sha is None:
+        resumen = hashlib.sha256()
+        for bloque in archivo.chunks():
+            resumen.update(bloque)
+        sha = resumen.hexdigest()
+    archivo.seek(0)
+    return sha
+
+
+def _extension(archivo):
+    # DRF ya verificó la imagen con Pillow y deja la instancia en archivo.image
+    imagen = getattr(archivo, 'image', None)
+    formato = getattr(imagen, 'format', None)
+    if formato in EXTENSIONES:
+        return EXTENSIONES[formato]
+    return os.path.splitext(archivo.name)[1].lstrip('.').lower() or 'bin'
+
+
+def guardar_imagen(archivo):
+    """Guarda `archivo` con nombre por contenido y devuelve ese nombre (sin duplicar si ya existe)"""
+    sha = _sha256(archivo)
+    nombre = f'{CARPETA}/{sha[:2]}/{sha}.{_extension(archivo)}'
+    storage = almacenamiento()
+    if not storage.exists(nombre):
+        guardado = storage.save(nombre, archivo)
+        if guardado != nombre:
+            # Otra petición lo guardó a la vez: conservar el nombre canónico
+            storage.delete(guardado)
+    return nombre
+
+
+def preparar_imagen(validated_data):
+    """Sustituye en `validated_data` el archivo subido por el nombre ya guardado por contenido"""
+    archivo = validated_data.get('imagen')
+    if isinstance(archivo, UploadedFile):
+        validated_data['imagen'] = guardar_imagen(archivo)
+
+
+def nombre_variante(nombre, variante):
+    """Nombre de la variante de una imagen; es determinista y no requiere que exista"""
+    base = posixpath.splitext(nombre)[0]
+    return f'{base}.{variante}.jpg'
+
+
+def separar_variante(nombre):
+    """Inversa de nombre_variante: (nombre de la original sin extensión, variante), o (None, None)"""
+    resto, extension = posixpath.splitext(nombre)
+    base, variante = posixpath.splitext(resto)
+    if extension != '.jpg' or variante[1:] not in configuracion()['VARIANTES']:
+        return None, None
+    return base, variante[1:]
+
+
+def generar_variantes(nombre, forzar=False):
+    """Genera las variantes que falten de la imagen `nombre`; devuelve cuántas ha creado"""
+    opciones = configuracion()
+    storage = almacenamiento()
+    pendientes = {
+        variante: lado for variante, lado in opciones['VARIANTES'].items()
+        if forzar or not storage.exists(nombre_variante(nombre, variante))
+    }
+    if not pendientes:
+        return 0
+
+    with storage.open(nombre, 'rb') as archivo:
+        with Image.open(archivo) as original:
+            # Respetar la orientación de la cámara antes de descartar el EXIF
+            imagen = ImageOps.exif_transpose(original)
+            if imagen.mode not in ('RGB', 'L'):
+                fondo = Image.new('RGB', imagen.size, 'white')
+                fondo.paste(imagen.convert('RGBA'), mask=imagen.convert('RGBA').getchannel('A'))
+                imagen = fondo
+
+            # De la mayor a la menor, reduciendo cada una a partir de la anterior
+            for variante, lado in sorted(pendientes.items(), key=lambda item: -item[1]):
+                imagen.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+                contenido = _jpeg(imagen, opciones['CALIDAD_JPEG'])
+                destino = nombre_variante(nombre, variante)
+                if forzar and storage.exists(destino):
+                    storage.delete(destino)
+                guardado = storage.save(destino, ContentFile(contenido))
+                if guardado != destino:
+                    # Otro proceso generó la misma variante a la vez
+                    storage.delete(guardado)
+    return len(pendientes)
+
+
+def _jpeg(imagen, calidad):
+    buffer = BytesIO()
+    imagen.save(buffer, 'JPEG', quality=calidad, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class PoolVariantes:
+    """Pool de hilos del proceso que genera variantes en segundo plano"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._en_curso = set()
+        self.programadas = 0
+        self.generadas = 0
+        self.errores = 0
+
+    def programar(self, nombre):
+        with self._lock:
+            # Tras un fork los hilos del pool no existen en el proceso hijo
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(configuracion()['HILOS'], thread_name_prefix='variantes')
+                self._pid = os.getpid()
+                self._en_curso.clear()
+            # Subidas idénticas comparten imagen: no generar sus variantes dos veces a la vez
+            if nombre in self._en_curso:
+                return None
+            self._en_curso.add(nombre)
+            self.programadas += 1
+            return self._pool.submit(self._generar, nombre)
+
+    def _generar(self, nombre):
+        try:
+            creadas = generar_variantes(nombre)
+        except Exception:
+            logger.exception('Error generando las variantes de %s', nombre)
+            with self._lock:
+                self.errores += 1
+            return 0
+        finally:
+            with self._lock:
+                self._en_curso.discard(nombre)
+        with self._lock:
+            self.generadas += creadas
+        return creadas
+
+    def metricas(self):
+        with self._lock:
+            return {'programadas': self.programadas, 'generadas': self.generadas, 'errores': self.errores}
+
+
+pool_variantes = PoolVariantes()
+
+
+def programar_variantes(nombre):
+    """Genera las variantes de `nombre` en segundo plano cuando se confirme la transacción"""
+    if nombre:
+        transaction.on_commit(lambda: pool_variantes.programar(nombre))
@@ -0,0 +1,278 @@
+"""Importación masiva de incidencias desde CSV o NDJSON.
+
+El archivo se lee fila a fila y cada fila se valida con las reglas de
+IncidenciaCreateSerializer (ImportarIncidenciaSerializer). Las filas válidas se
+insertan por lotes, junto con su CambioEstado inicial, con bulk_create o con
+COPY en PostgreSQL. Cada lote es una transacción propia que también actualiza
+los contadores de estado. Las filas rechazadas se escriben en un CSV de errores
+que se guarda en el almacenamiento de medios.
+"""
+import csv
+import io
+import json
+import tempfile
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connections, router, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from estadisticas import contadores
+from usuarios.models import Usuario
+from .models import Incidencia, CambioEstado
+from .serializers import ImportarIncidenciaSerializer
+
+FORMATOS_IMPORTACION = ('csv', 'ndjson')
+
+TAMANO_LOTE = 2000
+
+COMENTARIO_IMPORTACION = 'Incidencia importada'
+
+
+def detectar_formato(nombre, formato=None):
+    """Formato de importación a partir del parámetro explícito o de la extensión del archivo"""
+    if formato:
+        formato = formato.lower()
+        return 'ndjson' if formato == 'jsonl' else formato
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if extension in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    return 'csv'
+
+
+def leer_filas(archivo, formato):
+    """Recorre el archivo binario devolviendo (número de línea, fila, error de formato)"""
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='' if formato == 'csv' else None)
+    try:
+        if formato == 'csv':
+            lector = csv.DictReader(texto)
+            for fila in lector:
+                # Las celdas vacías cuentan como columnas no informadas
+                yield lector.line_num, {clave: valor for clave, valor in fila.items() if clave and valor != ''}, None
+        else:
+            for numero, linea in enumerate(texto, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    fila = json.loads(linea)
+                except ValueError as e:
+                    yield numero, linea.rstrip('\n'), f'JSON inválido: {e}'
+                    continue
+                if not isinstance(fila, dict):
+                    yield numero, linea.rstrip('\n'), 'Cada línea debe ser un objeto JSON'
+                    continue
+                yield numero, fila, None
+    finally:
+        texto.detach()
+
+
+class _ArchivoErrores:
+    """CSV de filas rechazadas escrito en un temporal y guardado al final en el almacenamiento"""
+
+    def __init__(self):
+        self._tmp = None
+        self._writer = None
+        self.total = 0
+
+    def agregar(self, linea, datos, errores):
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryFile(mode='w+b')
+            self._texto = io.TextIOWrapper(self._tmp, encoding='utf-8', newline='')
+            self._writer = csv.writer(self._texto)
+            self._writer.writerow(['linea', 'errores', 'datos'])
+        if not isinstance(datos, str):
+            datos = json.dumps(datos, ensure_ascii=False, default=str)
+        self._writer.writerow([linea, json.dumps(errores, ensure_ascii=False), datos])
+        self.total += 1
+
+    def guardar(self):
+        if self._tmp is None:
+            return None
+        self._texto.flush()
+        self._texto.detach()
+        self._tmp.seek(0)
+        nombre = default_storage.save(f'importaciones/errores-{uuid.uuid4().hex}.csv', File(self._tmp))
+        self._tmp.close()
+        return nombre
+
+
+def importar_incidencias(archivo, formato, usuario, tamano_lote=TAMANO_LOTE, usar_copy=None):
+    """Importa incidencias desde `archivo` (binario) en nombre de `usuario`.
+
+    Devuelve un dict con el número de filas procesadas, importadas y rechazadas
+    y el nombre del archivo de errores en el almacenamiento (o None).
+    """
+    alias = router.db_for_write(Incidencia)
+    if usar_copy is None:
+        usar_copy = connections[alias].vendor == 'postgresql'
+
+    validador = ImportarIncidenciaSerializer()
+    usuarios = {}
+    errores = _ArchivoErrores()
+    lote = []
+    procesadas = importadas = 0
+
+    for linea, fila, error_formato in leer_filas(archivo, formato):
+        procesadas += 1
+        if error_formato:
+            errores.agregar(linea, fila, {'non_field_errors': [error_formato]})
+            continue
+
+        try:
+            datos = validador.run_validation(fila)
+        except serializers.ValidationError as e:
+            errores.agregar(linea, fila, serializers.as_serializer_error(e))
+            continue
+
+        username = datos.pop('usuario_creador', None)
+        if username is None:
+            creador_id = usuario.id
+        else:
+            if username not in usuarios:
+                usuarios[username] = Usuario.objects.filter(username=username).values_list('id', flat=True).first()
+            creador_id = usuarios[username]
+            if creador_id is None:
+                errores.agregar(linea, fila, {'usuario_creador': [f'No existe el usuario {username}']})
+                continue
+
+        if datos['estado'] == 'resuelto' and not datos.get('fecha_resolucion'):
+            datos['fecha_resolucion'] = timezone.now()
+        lote.append(Incidencia(usuario_creador_id=creador_id, **datos))
+
+        if len(lote) >= tamano_lote:
+            importadas += _insertar_lote(lote, usuario, alias, usar_copy)
+            lote = []
+
+    if lote:
+        importadas += _insertar_lote(lote, usuario, alias, usar_copy)
+
+    return {
+        'procesadas': procesadas,
+        'importadas': importadas,
+        'errores': errores.total,
+        'archivo_errores': errores.guardar(),
+    }
+
+
+def _insertar_lote(incidencias, usuario, alias, usar_copy):
+    ahora = timezone.now()
+    # Fechas de creación originales; bulk_create las sustituiría por auto_now_add.
+    # fecha_actualizacion queda con el momento de la importación, que es cuando
+    # la fila cambia para la sincronización incremental
+    fechas = [incidencia.fecha_creacion or ahora for incidencia in incidencias]
+
+    with transaction.atomic(using=alias):
+        connection = connections[alias]
+        if usar_copy:
+            for incidencia, fecha in zip(incidencias, fechas):
+                incidencia.fecha_creacion = fecha
+                incidencia.fecha_actualizacion = ahora
+            for incidencia, pk in zip(incidencias, reservar_ids(connection, Incidencia, len(incidencias))):
+                incidencia.pk = pk
+            _copiar(connection, Incidencia, incidencias)
+        elif connection.features.can_return_rows_from_bulk_insert:
+            Incidencia.objects.using(alias).bulk_create(incidencias)
+            _restaurar_fechas(Incidencia, alias, incidencias, fechas, ahora)
+        else:
+            for incidencia in incidencias:
+                incidencia.save(using=alias)
+            _restaurar_fechas(Incidencia, alias, incidencias, fechas, ahora)
+
+        cambios = [
+            CambioEstado(
+                incidencia_id=incidencia.pk,
+                estado_anterior=None,
+                estado_nuevo=incidencia.estado,
+                comentario=COMENTARIO_IMPORTACION,
+                usuario=usuario,
+                fecha=fecha
+            )
+            for incidencia, fecha in zip(incidencias, fechas)
+        ]
+        if usar_copy:
+            _copiar(connection, CambioEstado, cambios, incluir_pk=False)
+        else:
+            CambioEstado.objects.using(alias).bulk_create(cambios)
+            if any(fecha != ahora for fecha in fechas):
+                CambioEstado.objects.using(alias).filter(
+                    incidencia_id__in=[incidencia.pk for incidencia in incidencias],
+                    comentario=COMENTARIO_IMPORTACION
+                ).update(fecha=Case(
+                    *[When(incidencia_id=incidencia.pk, then=Value(fecha)) for incidencia, fecha in zip(incidencias, fechas)],
+                    output_field=DateTimeField()
+                ))
+
+        contadores.registrar_creaciones(incidencias)
+
+    return len(incidencias)
+
+
+def _restaurar_fechas(modelo, alias, incidencias, fechas, ahora):
+    """Reescribe la fecha de creación de las filas que traían fecha propia"""
+    originales = [(incidencia, fecha) for incidencia, fecha in zip(incidencias, fechas) if fecha != ahora]
+    if not originales:
+        return
+    for incidencia, fecha in originales:
+        incidencia.fecha_creacion = fecha
+    modelo.objects.using(alias).filter(pk__in=[incidencia.pk for incidencia, _ in originales]).update(
+        fecha_creacion=Case(
+            *[When(pk=incidencia.pk, then=Value(incidencia.fecha_creacion)) for incidencia, _ in originales],
+            output_field=DateTimeField()
+        )
+    )
+
+
+def reservar_ids(connection, modelo, cantidad):
+    """Reserva `cantidad` valores de la secuencia de la clave primaria (PostgreSQL)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [modelo._meta.db_table, modelo._meta.pk.column, cantidad]
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _copiar(connection, modelo, objetos, incluir_pk=True):
+    campos = [
+        campo for campo in modelo._meta.concrete_fields
+        if incluir_pk or not campo.primary_key
+    ]
+    copiar_filas(connection, modelo, campos, (
+        [campo.get_db_prep_save(getattr(objeto, campo.attname), connection) for campo in campos]
+        for objeto in objetos
+    ))
+
+
+def copiar_filas(connection, modelo, campos, filas):
+    """Inserta filas (secuencias de valores ya preparados para `campos`) con COPY ... FROM STDIN (PostgreSQL)"""
+    buffer = io.StringIO()
+    for valores in filas:
+        buffer.write('\t'.join(_valor_copy(valor) for valor in valores))
+        buffer.write('\n')
+
+    quote = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN'.format(
+        quote(modelo._meta.db_table), ', '.join(quote(campo.column) for campo in campos)
+    )
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        crudo = cursor.cursor
+        if hasattr(crudo, 'copy_expert'):
+            # psycopg2
+            crudo.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with crudo.copy(sql) as copia:
+                copia.write(buffer.getvalue())
+
+
+def _valor_copy(valor):
+    if valor is None:
+        return '\\N'
+    if isinstance(valor, bool):
+        return 't' if valor else 'f'
+    texto = valor.isoformat() if hasattr(valor, 'isoformat') else str(valor)
+    return texto.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
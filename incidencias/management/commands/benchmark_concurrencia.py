@@ -0,0 +1,202 @@
+import asyncio
+import queue
+import statistics
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import CommandError
+from django.db import close_old_connections, connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+
+from . import benchmark_endpoints
+
+ESCENARIOS_POR_DEFECTO = 'incidencias_lista,incidencias_lista_trabajador,incidencia_detalle,estadisticas_admin'
+
+
+class Command(benchmark_endpoints.Command):
+    help = (
+        'Compara el despliegue WSGI (un número fijo de hilos) con el ASGI (vistas asíncronas en un '
+        'único bucle de eventos) atendiendo N clientes simultáneos lentos: throughput, latencia '
+        'p50/p95, memoria pico e hilos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', type=int, default=1000, help='Incidencias del conjunto de datos')
+        parser.add_argument(
+            '--concurrencias', default='1,10,50',
+            help='Clientes simultáneos separados por comas (p. ej. 1,10,50,200)'
+        )
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones por escenario y concurrencia')
+        parser.add_argument(
+            '--hilos', type=int, default=8,
+            help='Hilos del worker WSGI (gunicorn --threads): el presupuesto de memoria de ambos modos'
+        )
+        parser.add_argument(
+            '--latencia-ms', type=float, default=50,
+            help='Milisegundos que un cliente lento tarda en recibir cada respuesta'
+        )
+        parser.add_argument(
+            '--escenarios', default=ESCENARIOS_POR_DEFECTO,
+            help='Escenarios GET de benchmark_endpoints separados por comas'
+        )
+        parser.add_argument('--modos', default='wsgi,asgi', help='Modos a medir separados por comas')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla de generar_datos_prueba')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Conservar la base de datos de prueba y reutilizarla si ya tiene el tamaño pedido'
+        )
+
+    def handle(self, *args, **options):
+        concurrencias = [int(valor) for valor in options['concurrencias'].split(',')]
+        modos = options['modos'].split(',')
+        if set(modos) - {'wsgi', 'asgi'}:
+            raise CommandError('Los modos válidos son wsgi y asgi')
+        nombres = options['escenarios'].split(',')
+        disponibles = {escenario.nombre: escenario for escenario in benchmark_endpoints.ESCENARIOS}
+        # Solo las lecturas: las escrituras se delegan en las mismas vistas síncronas en ambos modos.
+        # Los escenarios con ajustes propios (el flujo de eventos) no se miden en concurrencia
+        desconocidos = [
+            nombre for nombre in nombres
+            if getattr(disponibles.get(nombre), 'metodo', None) != 'get' or disponibles[nombre].ajustes
+        ]
+        if desconocidos:
+            raise CommandError(f'Escenarios desconocidos o que no son GET: {", ".join(desconocidos)}')
+
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            with self.media_temporal():
+                contexto = self.preparar_datos(options['tamano'], options)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f'\n📊 {options["tamano"]} incidencias, {options["hilos"]} hilos WSGI, '
+                    f'clientes de {options["latencia_ms"]:g}ms'
+                ))
+                for nombre in nombres:
+                    escenario = disponibles[nombre]
+                    token, _ = Token.objects.get_or_create(user=contexto[escenario.usuario])
+                    cabeceras = {'Authorization': f'Token {token.key}'}
+                    self.stdout.write(f'\n  {nombre}')
+                    for concurrencia in concurrencias:
+                        for modo in modos:
+                            rutas = [escenario.preparar(contexto)['ruta'] for _ in range(options['peticiones'])]
+                            resultado = self.medir_modo(modo, rutas, cabeceras, concurrencia, options)
+                            self.informar(modo, concurrencia, resultado)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    # ==================== Medición ====================
+
+    def medir_modo(self, modo, rutas, cabeceras, concurrencia, options):
+        latencia = options['latencia_ms'] / 1000
+        hilos_iniciales = threading.active_count()
+        tracemalloc.start()
+        try:
+            inicio = time.perf_counter()
+            if modo == 'wsgi':
+                tiempos, hilos = self.medir_wsgi(rutas, cabeceras, concurrencia, options['hilos'], latencia)
+            else:
+                with override_settings(ROOT_URLCONF='incidencias_project.urls_asgi'):
+                    clear_url_caches()
+                    tiempos, hilos = asyncio.run(self.medir_asgi(rutas, cabeceras, concurrencia, latencia))
+                clear_url_caches()
+            duracion = time.perf_counter() - inicio
+            memoria = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        tiempos = sorted(tiempo * 1000 for tiempo in tiempos)
+        return {
+            'throughput': len(tiempos) / duracion,
+            'p50_ms': statistics.median(tiempos),
+            'p95_ms': tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))],
+            'memoria_kb': memoria / 1024,
+            'hilos': hilos - hilos_iniciales,
+        }
+
+    def medir_wsgi(self, rutas, cabeceras, concurrencia, hilos, latencia):
+        """`hilos` hilos atienden a `concurrencia` clientes; el resto espera en la cola del worker"""
+        cola = queue.Queue()
+        plazas = threading.Semaphore(concurrencia)
+        tiempos = []
+        errores = []
+
+        def trabajador():
+            cliente = Client()
+            try:
+                while (trabajo := cola.get()) is not None:
+                    ruta, encolada = trabajo
+                    try:
+                        respuesta = cliente.get(ruta, headers=cabeceras)
+                        if respuesta.streaming:
+                            b''.join(respuesta.streaming_content)
+                        # Enviar la respuesta a un cliente lento retiene el hilo
+                        time.sleep(latencia)
+                        close_old_connections()
+                        if respuesta.status_code >= 400:
+                            errores.append(respuesta.status_code)
+                        tiempos.append(time.perf_counter() - encolada)
+                    finally:
+                        plazas.release()
+            finally:
+                connections.close_all()
+
+        trabajadores = [threading.Thread(target=trabajador, daemon=True) for _ in range(hilos)]
+        for hilo in trabajadores:
+            hilo.start()
+        maximo_hilos = threading.active_count()
+        for ruta in rutas:
+            plazas.acquire()
+            cola.put((ruta, time.perf_counter()))
+        for _ in trabajadores:
+            cola.put(None)
+        for hilo in trabajadores:
+            hilo.join()
+
+        if errores:
+            raise CommandError(f'wsgi: respuestas {sorted(set(errores))}')
+        return tiempos, maximo_hilos
+
+    async def medir_asgi(self, rutas, cabeceras, concurrencia, latencia):
+        """`concurrencia` clientes atendidos por las vistas asíncronas en un único bucle de eventos"""
+        cliente = AsyncClient()
+        plazas = asyncio.Semaphore(concurrencia)
+        tiempos = []
+        errores = []
+        maximo_hilos = threading.active_count()
+
+        async def peticion(ruta):
+            nonlocal maximo_hilos
+            async with plazas:
+                inicio = time.perf_counter()
+                # Como ASGIHandler: cada petición tiene su propio hilo para el código síncrono
+                async with ThreadSensitiveContext():
+                    respuesta = await cliente.get(ruta, headers=cabeceras)
+                    if respuesta.streaming:
+                        [parte async for parte in respuesta.streaming_content]
+                    maximo_hilos = max(maximo_hilos, threading.active_count())
+                    # Ese hilo desaparece con la petición: su conexión no puede reutilizarse
+                    await sync_to_async(connections.close_all)()
+                # El envío a un cliente lento solo ocupa el bucle de eventos
+                await asyncio.sleep(latencia)
+                if respuesta.status_code >= 400:
+                    errores.append(respuesta.status_code)
+                tiempos.append(time.perf_counter() - inicio)
+
+        await asyncio.gather(*(peticion(ruta) for ruta in rutas))
+        if errores:
+            raise CommandError(f'asgi: respuestas {sorted(set(errores))}')
+        return tiempos, maximo_hilos
+
+    def informar(self, modo, concurrencia, resultado):
+        self.stdout.write(
+            f'    {modo:<4} c={concurrencia:<4} {resultado["throughput"]:>8.1f} req/s  '
+            f'p50={resultado["p50_ms"]:>8.2f}ms  p95={resultado["p95_ms"]:>8.2f}ms  '
+            f'memoria={resultado["memoria_kb"]:>9.1f}KB  hilos={resultado["hilos"]:>3}'
+        )
@@ -0,0 +1,424 @@
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+)
+from django.urls import URLResolver, get_resolver, resolve, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from incidencias.models import Incidencia
+from reportes.generadores import generar_reporte
+from reportes.models import ReporteJob
+from usuarios.models import Usuario
+
+BASELINE_POR_DEFECTO = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+# Por debajo de esta diferencia (ms) una subida de latencia se considera ruido
+MARGEN_LATENCIA_MS = 2.0
+
+# Namespaces de URL que no son de la API y no necesitan escenario
+NAMESPACES_SIN_BENCHMARK = {'admin'}
+
+
+class Escenario:
+    """Petición a medir.
+
+    `ruta` es el nombre de la URL que mide el escenario. `preparar(contexto)` se
+    ejecuta antes de cada repetición, fuera de la medición, y devuelve los
+    argumentos de la petición: ruta, datos y formato. `ajustes` son settings
+    que se sobrescriben durante la petición.
+    """
+
+    def __init__(self, nombre, metodo, ruta, preparar, usuario='admin', ajustes=None):
+        self.nombre = nombre
+        self.metodo = metodo
+        self.ruta = ruta
+        self.preparar = preparar
+        self.usuario = usuario
+        self.ajustes = ajustes or {}
+
+
+def _fecha_desde(dias):
+    return (timezone.localdate() - timedelta(days=dias)).isoformat()
+
+
+def _nueva_incidencia(contexto):
+    return Incidencia.objects.create(
+        tipo_incidencia='hardware', descripcion='Incidencia de benchmark', prioridad='media',
+        ubicacion='Laboratorio', usuario_creador_id=contexto['trabajador'].id
+    )
+
+
+def _alternar_estado(contexto):
+    contexto['estado'] = 'en_proceso' if contexto.get('estado') != 'en_proceso' else 'pendiente'
+    return contexto['estado']
+
+
+def _archivo_importacion(contexto):
+    filas = ['tipo_incidencia,descripcion,prioridad,ubicacion']
+    filas += [f'red,Importación de benchmark {n},baja,Aula {n}' for n in range(100)]
+    return SimpleUploadedFile('benchmark.csv', '\n'.join(filas).encode(), content_type='text/csv')
+
+
+def _login(contexto):
+    return {'ruta': reverse('incidencias:login'), 'datos': {'username': 'admin', 'password': 'admin123'}}
+
+
+def _logout(contexto):
+    # El escenario usa un usuario propio para no invalidar el token de los demás
+    Token.objects.get_or_create(user=contexto['saliente'])
+    return {'ruta': reverse('incidencias:logout')}
+
+
+def nombres_de_rutas(patrones=None, namespace=''):
+    """Nombres completos ('namespace:nombre') de las URL con nombre de ROOT_URLCONF"""
+    if patrones is None:
+        patrones = get_resolver().url_patterns
+    nombres = set()
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            if patron.namespace in NAMESPACES_SIN_BENCHMARK:
+                continue
+            prefijo = f'{namespace}{patron.namespace}:' if patron.namespace else namespace
+            nombres |= nombres_de_rutas(patron.url_patterns, prefijo)
+        elif patron.name:
+            nombres.add(f'{namespace}{patron.name}')
+    return nombres
+
+
+def rutas_sin_escenario():
+    """URL de la API que ningún escenario mide"""
+    return nombres_de_rutas() - {escenario.ruta for escenario in ESCENARIOS}
+
+
+ESCENARIOS = [
+    Escenario('login', 'post', 'incidencias:login', _login, usuario=None),
+    Escenario('logout', 'post', 'incidencias:logout', _logout, usuario='saliente'),
+    Escenario('incidencias_lista', 'get', 'incidencias:incidencia-list-create', lambda c: {
+        'ruta': reverse('incidencias:incidencia-list-create')
+    }),
+    Escenario('incidencias_lista_trabajador', 'get', 'incidencias:incidencia-list-create', lambda c: {
+        'ruta': reverse('incidencias:incidencia-list-create')
+    }, usuario='trabajador'),
+    Escenario('incidencias_lista_expandida', 'get', 'incidencias:incidencia-list-create', lambda c: {
+        'ruta': reverse('incidencias:incidencia-list-create') + '?expand=historial_cambios,comentarios_admin'
+    }),
+    Escenario('incidencias_lista_cursor', 'get', 'incidencias:incidencia-list-create', lambda c: {
+        'ruta': reverse('incidencias:incidencia-list-create') + '?paginacion=cursor'
+    }),
+    Escenario('incidencias_busqueda', 'get', 'incidencias:incidencia-list-create', lambda c: {
+        'ruta': reverse('incidencias:incidencia-list-create') + '?q=impresora+papel'
+    }),
+    Escenario('incidencias_crear', 'post', 'incidencias:incidencia-list-create', lambda c: {
+        'ruta': reverse('incidencias:incidencia-list-create'),
+        'datos': {'tipo_incidencia': 'red', 'descripcion': 'Sin conexión', 'prioridad': 'alta', 'ubicacion': 'Aula 1'}
+    }, usuario='trabajador'),
+    Escenario('incidencia_detalle', 'get', 'incidencias:incidencia-detail', lambda c: {
+        'ruta': reverse('incidencias:incidencia-detail', args=[c['incidencia_id']])
+    }),
+    Escenario('incidencia_actualizar', 'patch', 'incidencias:incidencia-detail', lambda c: {
+        'ruta': reverse('incidencias:incidencia-detail', args=[c['incidencia_id']]),
+        'datos': {'ubicacion': 'Oficina 205, Edificio A'}
+    }),
+    Escenario('incidencia_eliminar', 'delete', 'incidencias:incidencia-detail', lambda c: {
+        'ruta': reverse('incidencias:incidencia-detail', args=[_nueva_incidencia(c).id])
+    }),
+    Escenario('incidencia_cambiar_estado', 'post', 'incidencias:cambiar-estado', lambda c: {
+        'ruta': reverse('incidencias:cambiar-estado', args=[c['incidencia_id']]),
+        'datos': {'estado': _alternar_estado(c), 'comentario': 'Benchmark'}
+    }),
+    Escenario('incidencias_cambiar_estado_masivo', 'post', 'incidencias:cambiar-estado-masivo', lambda c: {
+        'ruta': reverse('incidencias:cambiar-estado-masivo'),
+        'datos': {'ids': c['ids_masivo'], 'estado': _alternar_estado(c), 'comentario': 'Benchmark'}
+    }),
+    Escenario('incidencia_agregar_comentario', 'post', 'incidencias:agregar-comentario', lambda c: {
+        'ruta': reverse('incidencias:agregar-comentario', args=[c['incidencia_id']]),
+        'datos': {'mensaje': 'Comentario de benchmark'}
+    }),
+    Escenario('incidencias_importar', 'post', 'incidencias:importar-incidencias', lambda c: {
+        'ruta': reverse('incidencias:importar-incidencias'),
+        'datos': {'archivo': _archivo_importacion(c)},
+        'formato': 'multipart'
+    }),
+    Escenario('estadisticas_admin', 'get', 'incidencias:estadisticas', lambda c: {
+        'ruta': reverse('incidencias:estadisticas')
+    }),
+    Escenario('estadisticas_trabajador', 'get', 'incidencias:estadisticas', lambda c: {
+        'ruta': reverse('incidencias:estadisticas')
+    }, usuario='trabajador'),
+    Escenario('estadisticas_tendencias', 'get', 'incidencias:tendencias', lambda c: {
+        'ruta': reverse('incidencias:tendencias') + f'?fecha_desde={_fecha_desde(90)}&agrupar=semana'
+    }),
+    Escenario('usuarios_lista', 'get', 'incidencias:usuario-list-create', lambda c: {
+        'ruta': reverse('incidencias:usuario-list-create')
+    }),
+    Escenario('usuarios_buscar', 'get', 'incidencias:usuario-list-create', lambda c: {
+        'ruta': reverse('incidencias:usuario-list-create') + '?search=martinez'
+    }),
+    Escenario('usuarios_autocompletar', 'get', 'incidencias:autocompletar-usuarios', lambda c: {
+        'ruta': reverse('incidencias:autocompletar-usuarios') + '?q=mar'
+    }),
+    Escenario('usuario_detalle', 'get', 'incidencias:usuario-detail', lambda c: {
+        'ruta': reverse('incidencias:usuario-detail', args=[c['trabajador'].id])
+    }),
+    Escenario('usuario_cambiar_estado', 'post', 'incidencias:cambiar-estado-usuario', lambda c: {
+        'ruta': reverse('incidencias:cambiar-estado-usuario', args=[c['trabajador'].id]),
+        'datos': {'estado': 'activo'}
+    }),
+    Escenario('usuario_restablecer_password', 'post', 'incidencias:restablecer-password', lambda c: {
+        'ruta': reverse('incidencias:restablecer-password', args=[c['saliente'].id])
+    }),
+    Escenario('reporte_json_30_dias', 'get', 'incidencias:reporte-incidencias', lambda c: {
+        'ruta': reverse('incidencias:reporte-incidencias') + f'?fecha_desde={_fecha_desde(30)}'
+    }),
+    Escenario('reporte_csv_30_dias', 'get', 'incidencias:reporte-incidencias', lambda c: {
+        'ruta': reverse('incidencias:reporte-incidencias') + f'?fecha_desde={_fecha_desde(30)}&format=csv'
+    }),
+    Escenario('reporte_resumen_30_dias', 'get', 'incidencias:resumen-reporte', lambda c: {
+        'ruta': reverse('incidencias:resumen-reporte') + f'?fecha_desde={_fecha_desde(30)}'
+    }),
+    Escenario('reporte_encolar', 'post', 'reportes:crear-reporte', lambda c: {
+        'ruta': reverse('reportes:crear-reporte'),
+        'datos': {'formato': 'csv', 'fecha_desde': _fecha_desde(30)}
+    }),
+    Escenario('reporte_estado', 'get', 'reportes:estado-reporte', lambda c: {
+        'ruta': reverse('reportes:estado-reporte', args=[c['reporte'].id])
+    }),
+    Escenario('reporte_descargar', 'get', 'reportes:descargar-reporte', lambda c: {
+        'ruta': reverse('reportes:descargar-reporte', args=[c['reporte'].id])
+    }),
+    Escenario('media_archivo', 'get', 'media', lambda c: {
+        'ruta': reverse('media', kwargs={'nombre': c['reporte'].archivo.name})
+    }),
+    # Con DURACION_MAXIMA=0 el flujo termina tras enviar el inicio: mide la apertura de la suscripción
+    Escenario('eventos_conexion', 'get', 'incidencias:eventos', lambda c: {
+        'ruta': reverse('incidencias:eventos')
+    }, usuario='trabajador', ajustes={'EVENTOS': {**getattr(settings, 'EVENTOS', {}), 'DURACION_MAXIMA': 0}}),
+    Escenario('sistema_metricas', 'get', 'incidencias:metricas-sistema', lambda c: {
+        'ruta': reverse('incidencias:metricas-sistema')
+    }),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95), consultas SQL y memoria pico de los endpoints de la API sobre '
+        'bases de datos de prueba de distintos tamaños y las compara con una línea base'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos', default='1000',
+            help='Tamaños del conjunto de datos separados por comas (p. ej. 1000,100000,1000000)'
+        )
+        parser.add_argument('--repeticiones', type=int, default=20, help='Repeticiones medidas por escenario')
+        parser.add_argument('--calentamiento', type=int, default=3, help='Repeticiones previas sin medir')
+        parser.add_argument('--escenarios', help='Nombres de escenarios a ejecutar separados por comas')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla de generar_datos_prueba')
+        parser.add_argument('--baseline', default=BASELINE_POR_DEFECTO, help='Archivo JSON de la línea base')
+        parser.add_argument(
+            '--guardar-baseline', action='store_true',
+            help='Guardar los resultados como nueva línea base en lugar de compararlos'
+        )
+        parser.add_argument(
+            '--tolerancia', type=float, default=0.25,
+            help='Aumento relativo de p95 y memoria admitido antes de considerarlo regresión'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Conservar la base de datos de prueba y reutilizarla si ya tiene el tamaño pedido'
+        )
+
+    def handle(self, *args, **options):
+        sin_escenario = rutas_sin_escenario()
+        if sin_escenario:
+            raise CommandError(f'URL sin escenario de benchmark: {", ".join(sorted(sin_escenario))}')
+
+        tamanos = [int(tamano) for tamano in options['tamanos'].split(',')]
+        escenarios = ESCENARIOS
+        if options['escenarios']:
+            nombres = set(options['escenarios'].split(','))
+            desconocidos = nombres - {escenario.nombre for escenario in ESCENARIOS}
+            if desconocidos:
+                raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(desconocidos))}')
+            escenarios = [escenario for escenario in ESCENARIOS if escenario.nombre in nombres]
+
+        # Base de datos de prueba aislada: nunca se mide contra la base real
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            resultados = {}
+            with self.media_temporal():
+                for tamano in tamanos:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'\n📊 {tamano} incidencias'))
+                    contexto = self.preparar_datos(tamano, options)
+                    resultados[str(tamano)] = {
+                        escenario.nombre: self.medir(escenario, contexto, options)
+                        for escenario in escenarios
+                    }
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.comparar(resultados, options)
+
+    # ==================== Datos ====================
+
+    @contextmanager
+    def media_temporal(self):
+        """MEDIA_ROOT temporal: los reportes y archivos del benchmark no llegan a la carpeta real"""
+        carpeta = tempfile.mkdtemp(prefix='benchmark-media-')
+        try:
+            with override_settings(MEDIA_ROOT=carpeta):
+                yield carpeta
+        finally:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    def preparar_datos(self, tamano, options):
+        if Incidencia.objects.count() != tamano or not Usuario.objects.filter(username='admin').exists():
+            call_command(
+                'generar_datos_prueba', incidencias=tamano, usuarios=max(50, tamano // 200),
+                semilla=options['semilla'], limpiar=True, stdout=open(os.devnull, 'w')
+            )
+
+        trabajador = Usuario.objects.filter(tipo_usuario='trabajador').order_by('id').first()
+        saliente, _ = Usuario.objects.get_or_create(
+            username='benchmark.saliente',
+            defaults={'nombre_completo': 'Usuario Benchmark', 'tipo_usuario': 'trabajador', 'estado': 'activo'}
+        )
+        ids = list(Incidencia.objects.order_by('-id').values_list('id', flat=True)[:51])
+        admin = Usuario.objects.get(username='admin')
+        # Reporte ya generado para consultar su estado, descargarlo y servirlo como media
+        reporte = ReporteJob.objects.create(usuario=admin, formato='csv', filtros={'fecha_desde': _fecha_desde(30)})
+        generar_reporte(reporte.id)
+        reporte.refresh_from_db()
+        return {
+            'admin': admin,
+            'trabajador': trabajador,
+            'saliente': saliente,
+            'incidencia_id': ids[0],
+            'ids_masivo': ids[1:],
+            'reporte': reporte,
+        }
+
+    # ==================== Medición ====================
+
+    def medir(self, escenario, contexto, options):
+        cliente = APIClient()
+
+        def ejecutar():
+            peticion = escenario.preparar(contexto)
+            if resolve(urlsplit(peticion['ruta']).path).view_name != escenario.ruta:
+                raise CommandError(f'{escenario.nombre}: {peticion["ruta"]} no es la URL {escenario.ruta}')
+            if escenario.usuario:
+                token, _ = Token.objects.get_or_create(user=contexto[escenario.usuario])
+                cliente.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            else:
+                cliente.credentials()
+            metodo = getattr(cliente, escenario.metodo)
+            formato = peticion.get('formato', 'json')
+            with override_settings(**escenario.ajustes):
+                inicio = time.perf_counter()
+                if 'datos' in peticion:
+                    respuesta = metodo(peticion['ruta'], peticion['datos'], format=formato)
+                else:
+                    respuesta = metodo(peticion['ruta'])
+                if respuesta.streaming:
+                    b''.join(respuesta.streaming_content)
+                duracion = time.perf_counter() - inicio
+            if respuesta.status_code >= 400:
+                raise CommandError(f'{escenario.nombre}: respuesta {respuesta.status_code}')
+            return duracion
+
+        for _ in range(options['calentamiento']):
+            ejecutar()
+
+        # El registro de consultas es un deque acotado: vaciarlo para que el recuento sea exacto
+        reset_queries()
+        with CaptureQueriesContext(connection) as consultas:
+            ejecutar()
+
+        tracemalloc.start()
+        try:
+            ejecutar()
+            memoria = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        tiempos = sorted(ejecutar() * 1000 for _ in range(options['repeticiones']))
+        resultado = {
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+            'consultas': len(consultas.captured_queries),
+            'memoria_kb': round(memoria / 1024, 1),
+        }
+        self.stdout.write(
+            f'  {escenario.nombre:<36} p50={resultado["p50_ms"]:>8.2f}ms  p95={resultado["p95_ms"]:>8.2f}ms  '
+            f'consultas={resultado["consultas"]:>3}  memoria={resultado["memoria_kb"]:>9.1f}KB'
+        )
+        return resultado
+
+    # ==================== Línea base ====================
+
+    def comparar(self, resultados, options):
+        ruta = options['baseline']
+        motor = connection.vendor
+        baseline = {}
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as archivo:
+                baseline = json.load(archivo)
+
+        if options['guardar_baseline']:
+            baseline.setdefault(motor, {}).update(resultados)
+            os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                json.dump(baseline, archivo, indent=2, sort_keys=True)
+                archivo.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Línea base guardada en {ruta}'))
+            return
+
+        referencia = baseline.get(motor, {})
+        if not referencia:
+            self.stdout.write(self.style.WARNING(f'\n⚠️  No hay línea base para {motor} en {ruta}; nada que comparar'))
+            return
+
+        tolerancia = options['tolerancia']
+        regresiones = []
+        for tamano, escenarios in resultados.items():
+            for nombre, actual in escenarios.items():
+                base = referencia.get(tamano, {}).get(nombre)
+                if base is None:
+                    continue
+                if actual['consultas'] > base['consultas']:
+                    regresiones.append(f'{tamano}/{nombre}: consultas {base["consultas"]} -> {actual["consultas"]}')
+                limite = max(base['p95_ms'] * (1 + tolerancia), base['p95_ms'] + MARGEN_LATENCIA_MS)
+                if actual['p95_ms'] > limite:
+                    regresiones.append(f'{tamano}/{nombre}: p95 {base["p95_ms"]}ms -> {actual["p95_ms"]}ms')
+                if actual['memoria_kb'] > base['memoria_kb'] * (1 + tolerancia) + 64:
+                    regresiones.append(
+                        f'{tamano}/{nombre}: memoria {base["memoria_kb"]}KB -> {actual["memoria_kb"]}KB'
+                    )
+
+        if regresiones:
+            for regresion in regresiones:
+                self.stdout.write(self.style.ERROR(f'❌ {regresion}'))
+            raise CommandError(f'{len(regresiones)} regresiones respecto a la línea base')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Sin regresiones respecto a la línea base'))
@@ -0,0 +1,380 @@
+import random
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from estadisticas import contadores, resumen
+from incidencias.importacion import copiar_filas, reservar_ids
+from incidencias.models import Incidencia, CambioEstado, ComentarioAdmin
+from usuarios.models import Usuario
+
+# Prefijo de los usuarios generados (permite limpiarlos sin tocar los reales)
+PREFIJO_USUARIO = 'carga.'
+
+TIPOS = ['hardware', 'software', 'red', 'otro']
+PESOS_TIPOS = [35, 30, 25, 10]
+
+PRIORIDADES = ['baja', 'media', 'alta']
+PESOS_PRIORIDADES = [30, 50, 20]
+
+# Horas medias hasta pasar a en_proceso y desde ahí hasta resolver, por prioridad
+HORAS_MEDIAS = {
+    'alta': (2, 8),
+    'media': (12, 36),
+    'baja': (48, 120),
+}
+
+DESCRIPCIONES = {
+    'hardware': [
+        'El monitor de mi computadora no enciende. He verificado las conexiones y el problema persiste.',
+        'La impresora no funciona correctamente. Se atasca el papel constantemente.',
+        'El teclado tiene varias teclas que no funcionan (A, S, Enter).',
+        'La computadora se reinicia sola cada 30 minutos aproximadamente.',
+        'El proyector del aula no detecta la señal HDMI.',
+        'El ratón deja de responder de forma intermitente.',
+    ],
+    'software': [
+        'No puedo acceder al sistema de gestión académica. Me aparece error de conexión.',
+        'Microsoft Office se cierra inesperadamente al abrir documentos grandes.',
+        'El antivirus está bloqueando aplicaciones necesarias para el trabajo.',
+        'El sistema operativo solicita una actualización que falla al instalarse.',
+        'No se sincroniza el correo institucional en el cliente de escritorio.',
+    ],
+    'red': [
+        'La conexión a internet es muy lenta en toda la oficina. Afecta el trabajo diario.',
+        'No hay acceso a la red WiFi institucional desde el aula 301.',
+        'El punto de red de la oficina no tiene conectividad.',
+        'Se pierde la conexión VPN cada pocos minutos.',
+    ],
+    'otro': [
+        'Solicitud de instalación de software especializado para diseño gráfico.',
+        'Solicitud de alta de un nuevo usuario en el sistema.',
+        'Solicitud de traslado de equipos a otra oficina.',
+    ],
+}
+
+UBICACIONES = [
+    'Oficina 205, Edificio A', 'Sala de profesores, Planta 3', 'Departamento de Sistemas',
+    'Secretaría General', 'Oficina 102, Edificio B', 'Aula 301, Edificio C',
+    'Laboratorio de Informática 1', 'Oficina 150, Edificio A', 'Departamento de Diseño',
+    'Oficina del Director', 'Biblioteca central', 'Laboratorio de Química',
+]
+
+COMENTARIOS_PROCESO = [
+    'Incidencia tomada en proceso por el equipo técnico',
+    'Se asignó un técnico para revisar el problema',
+    'En revisión por el área de soporte',
+]
+
+COMENTARIOS_RESOLUCION = [
+    'Problema solucionado exitosamente',
+    'Se reemplazó el componente defectuoso',
+    'Se reconfiguró el equipo y se verificó su funcionamiento',
+]
+
+MENSAJES_ADMIN = [
+    'Estamos revisando el problema.',
+    'Se requiere acceso al equipo para continuar.',
+    'Problema resuelto. Se realizaron las correcciones necesarias.',
+    'Pendiente de repuesto del proveedor.',
+]
+
+NOMBRES = ['Juan', 'Ana', 'Carlos', 'Lucía', 'Miguel', 'María', 'José', 'Laura', 'Pedro', 'Sofía', 'Andrés', 'Elena']
+APELLIDOS = ['Pérez', 'Martínez', 'Rodríguez', 'Fernández', 'Santos', 'González', 'López', 'Gómez', 'Torres', 'Ruiz']
+
+# Fracción de incidencias que quedan atascadas (esperando repuestos, terceros...) y factor de demora
+PROB_ATASCO = 0.05
+FACTOR_ATASCO = 40
+
+_HORA = 3600
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos deterministas (usuarios, incidencias, historial y comentarios) para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador aleatorio')
+        parser.add_argument('--usuarios', type=int, default=50, help='Trabajadores a generar')
+        parser.add_argument('--administradores', type=int, default=3, help='Administradores a generar')
+        parser.add_argument('--incidencias', type=int, default=1000, help='Incidencias a generar')
+        parser.add_argument('--dias', type=int, default=365, help='Días hacia atrás que cubren las fechas de creación')
+        parser.add_argument(
+            '--max-reaperturas', type=int, default=1,
+            help='Reaperturas máximas por incidencia resuelta (profundidad extra del historial)'
+        )
+        parser.add_argument(
+            '--prob-reapertura', type=float, default=0.05,
+            help='Probabilidad de reabrir una incidencia resuelta'
+        )
+        parser.add_argument(
+            '--max-comentarios', type=int, default=2,
+            help='Comentarios de administrador máximos por incidencia atendida'
+        )
+        parser.add_argument('--tamano-lote', type=int, default=10000, help='Incidencias insertadas por transacción')
+        parser.add_argument(
+            '--limpiar', action='store_true',
+            help='Eliminar antes todas las incidencias y los usuarios generados previamente'
+        )
+        parser.add_argument('--sin-copy', action='store_true', help='No usar COPY en PostgreSQL')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['semilla'])
+        self.alias = router.db_for_write(Incidencia)
+        self.connection = connections[self.alias]
+        self.usar_copy = self.connection.vendor == 'postgresql' and not options['sin_copy']
+        self.opciones = options
+
+        if options['limpiar']:
+            self.limpiar()
+
+        administradores, trabajadores = self.crear_usuarios(options['administradores'], options['usuarios'])
+        if not trabajadores:
+            self.stdout.write(self.style.ERROR('❌ No hay trabajadores para crear incidencias'))
+            return
+
+        self.generar_incidencias(options['incidencias'], administradores, trabajadores)
+
+        self.stdout.write('🔄 Recalculando contadores de estado...')
+        contadores.reconciliar()
+        self.stdout.write('🔄 Reconstruyendo el resumen diario...')
+        resumen.reconstruir()
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('✅ Datos de prueba creados exitosamente!'))
+        self.stdout.write(f'👥 Usuarios totales: {Usuario.objects.count()}')
+        self.stdout.write(f'📝 Incidencias totales: {Incidencia.objects.count()}')
+        self.stdout.write(f'🔁 Cambios de estado: {CambioEstado.objects.count()}')
+        self.stdout.write(f'💬 Comentarios: {ComentarioAdmin.objects.count()}')
+        self.stdout.write('\n🔑 Credenciales de acceso:')
+        self.stdout.write('👑 Administrador: admin / admin123')
+        self.stdout.write(f'👷 Trabajadores: {PREFIJO_USUARIO}trabajador00001 ... / 123456')
+
+    # ==================== Limpieza ====================
+
+    def limpiar(self):
+        self.stdout.write('🗑️  Eliminando datos existentes...')
+        with transaction.atomic(using=self.alias):
+            if self.connection.vendor == 'postgresql':
+                quote = self.connection.ops.quote_name
+                tablas = ', '.join(quote(modelo._meta.db_table) for modelo in (ComentarioAdmin, CambioEstado, Incidencia))
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f'TRUNCATE {tablas} CASCADE')
+            else:
+                ComentarioAdmin.objects.using(self.alias).all().delete()
+                CambioEstado.objects.using(self.alias).all().delete()
+                Incidencia.objects.using(self.alias).all().delete()
+            Usuario.objects.using(self.alias).filter(username__startswith=PREFIJO_USUARIO).delete()
+
+    # ==================== Usuarios ====================
+
+    def crear_usuarios(self, num_administradores, num_trabajadores):
+        self.stdout.write('🔄 Creando usuarios de prueba...')
+        if not Usuario.objects.filter(username='admin').exists():
+            Usuario.objects.create_user(
+                username='admin',
+                email='admin@universidad.edu',
+                password='admin123',
+                nombre_completo='Administrador Sistema',
+                tipo_usuario='administrador',
+                estado='activo',
+                is_staff=True,
+                is_superuser=True
+            )
+
+        # Un único hash para todos: calcularlo por usuario domina el tiempo de generación
+        password = make_password('123456')
+        usuarios = []
+        for tipo, cantidad in (('administrador', num_administradores), ('trabajador', num_trabajadores)):
+            for n in range(1, cantidad + 1):
+                username = f'{PREFIJO_USUARIO}{tipo}{n:05d}'
+                usuarios.append(Usuario(
+                    username=username,
+                    email=f'{username}@universidad.edu',
+                    password=password,
+                    nombre_completo=f'{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)} {self.rng.choice(APELLIDOS)}',
+                    tipo_usuario=tipo,
+                    estado='activo'
+                ))
+        Usuario.objects.bulk_create(usuarios, batch_size=1000, ignore_conflicts=True)
+
+        administradores = list(
+            Usuario.objects.filter(tipo_usuario='administrador').order_by('id').values_list('id', flat=True)
+        )
+        trabajadores = list(
+            Usuario.objects.filter(tipo_usuario='trabajador', username__startswith=PREFIJO_USUARIO)
+            .order_by('id').values_list('id', flat=True)
+        )
+        return administradores, trabajadores
+
+    # ==================== Incidencias ====================
+
+    def generar_incidencias(self, cantidad, administradores, trabajadores):
+        self.stdout.write(f'🔄 Generando {cantidad} incidencias...')
+        tamano_lote = self.opciones['tamano_lote']
+        ahora = timezone.now()
+        self.ahora = ahora.timestamp()
+        self.zona = timezone.get_current_timezone()
+        inicio = self.ahora - self.opciones['dias'] * 86400
+        paso = (self.ahora - inicio) / max(cantidad, 1)
+
+        siguiente_id = None
+        if not self.usar_copy:
+            siguiente_id = (Incidencia.objects.using(self.alias).aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+
+        escritores = {
+            modelo: _Escritor(self.connection, modelo, columnas, self.usar_copy)
+            for modelo, columnas in (
+                (Incidencia, _COLUMNAS_INCIDENCIA), (CambioEstado, _COLUMNAS_CAMBIO), (ComentarioAdmin, _COLUMNAS_COMENTARIO)
+            )
+        }
+
+        generadas = 0
+        comienzo = time.monotonic()
+        while generadas < cantidad:
+            tamano = min(tamano_lote, cantidad - generadas)
+            # Cada lote cubre un tramo consecutivo de fechas, así los ids crecen con la fecha de creación
+            desde = inicio + generadas * paso
+            fechas = sorted(self.fecha_laboral(desde, desde + tamano * paso) for _ in range(tamano))
+
+            with transaction.atomic(using=self.alias):
+                if self.usar_copy:
+                    ids = reservar_ids(self.connection, Incidencia, tamano)
+                else:
+                    ids = range(siguiente_id, siguiente_id + tamano)
+                    siguiente_id += tamano
+
+                incidencias, cambios, comentarios = [], [], []
+                for incidencia_id, creacion in zip(ids, fechas):
+                    self.generar_incidencia(
+                        incidencia_id, creacion, administradores, trabajadores, incidencias, cambios, comentarios
+                    )
+                escritores[Incidencia].escribir(incidencias)
+                escritores[CambioEstado].escribir(cambios)
+                escritores[ComentarioAdmin].escribir(comentarios)
+
+            generadas += tamano
+            transcurrido = time.monotonic() - comienzo
+            self.stdout.write(f'   {generadas}/{cantidad} incidencias ({generadas / transcurrido:.0f}/s)')
+
+    def generar_incidencia(self, incidencia_id, creacion, administradores, trabajadores, incidencias, cambios, comentarios):
+        rng = self.rng
+        tipo = rng.choices(TIPOS, PESOS_TIPOS)[0]
+        prioridad = rng.choices(PRIORIDADES, PESOS_PRIORIDADES)[0]
+        horas_proceso, horas_resolucion = HORAS_MEDIAS[prioridad]
+        if rng.random() < PROB_ATASCO:
+            horas_proceso, horas_resolucion = horas_proceso * FACTOR_ATASCO, horas_resolucion * FACTOR_ATASCO
+        creador = rng.choice(trabajadores)
+        admin = rng.choice(administradores) if administradores else creador
+
+        # Línea de tiempo: el estado actual es el último evento anterior a "ahora"
+        historial = [(creacion, None, 'pendiente', 'Incidencia creada', creador)]
+        fecha_resolucion = None
+        t = creacion + rng.expovariate(1 / (horas_proceso * _HORA))
+        if t < self.ahora:
+            historial.append((t, 'pendiente', 'en_proceso', rng.choice(COMENTARIOS_PROCESO), admin))
+            t += rng.expovariate(1 / (horas_resolucion * _HORA))
+            reaperturas = 0
+            while t < self.ahora:
+                historial.append((t, 'en_proceso', 'resuelto', rng.choice(COMENTARIOS_RESOLUCION), admin))
+                fecha_resolucion = t
+                if reaperturas >= self.opciones['max_reaperturas'] or rng.random() >= self.opciones['prob_reapertura']:
+                    break
+                t += rng.expovariate(1 / (72 * _HORA))
+                if t >= self.ahora:
+                    break
+                historial.append((t, 'resuelto', 'en_proceso', 'Incidencia reabierta', creador))
+                fecha_resolucion = None
+                reaperturas += 1
+                t += rng.expovariate(1 / (horas_resolucion * _HORA))
+
+        estado = historial[-1][2]
+        ultima = historial[-1][0]
+
+        if estado != 'pendiente' and self.opciones['max_comentarios']:
+            fin = min(ultima + _HORA, self.ahora)
+            for _ in range(rng.randint(0, self.opciones['max_comentarios'])):
+                fecha = rng.uniform(historial[1][0], fin)
+                ultima = max(ultima, fecha)
+                comentarios.append((
+                    incidencia_id, rng.choice(MENSAJES_ADMIN), self.fecha(fecha), admin, rng.random() < 0.9
+                ))
+
+        for fecha, anterior, nuevo, comentario, usuario_id in historial:
+            cambios.append((incidencia_id, anterior, nuevo, comentario, self.fecha(fecha), usuario_id))
+
+        incidencias.append((
+            incidencia_id, tipo, rng.choice(DESCRIPCIONES[tipo]), prioridad, rng.choice(UBICACIONES), estado,
+            self.fecha(creacion), self.fecha(ultima),
+            self.fecha(fecha_resolucion) if fecha_resolucion is not None else None,
+            creador, ''
+        ))
+
+    def fecha_laboral(self, desde, hasta):
+        """Instante aleatorio entre `desde` y `hasta`, concentrado en horario laboral de lunes a viernes"""
+        while True:
+            t = self.rng.uniform(desde, hasta)
+            local = datetime.fromtimestamp(t, self.zona)
+            if (local.weekday() < 5 and 8 <= local.hour < 19) or self.rng.random() < 0.1:
+                return t
+
+    def fecha(self, t):
+        return datetime.fromtimestamp(t, dt_timezone.utc)
+
+
+_COLUMNAS_INCIDENCIA = [
+    'id', 'tipo_incidencia', 'descripcion', 'prioridad', 'ubicacion', 'estado',
+    'fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion', 'usuario_creador_id', 'imagen',
+]
+_COLUMNAS_CAMBIO = ['incidencia_id', 'estado_anterior', 'estado_nuevo', 'comentario', 'fecha', 'usuario_id']
+_COLUMNAS_COMENTARIO = ['incidencia_id', 'mensaje', 'fecha', 'usuario_id', 'es_visible']
+
+
+class _Escritor:
+    """Inserta tuplas en el orden de `columnas` con COPY (PostgreSQL) o executemany.
+
+    Los campos del modelo que el generador no rellena reciben su valor por defecto.
+    """
+
+    def __init__(self, connection, modelo, columnas, usar_copy):
+        self.connection = connection
+        self.modelo = modelo
+        self.usar_copy = usar_copy
+        por_attname = {campo.attname: campo for campo in modelo._meta.concrete_fields}
+        restantes = [
+            campo for campo in modelo._meta.concrete_fields
+            if campo.attname not in columnas and not campo.primary_key
+        ]
+        self.campos = [por_attname[columna] for columna in columnas] + restantes
+        self.extra = tuple(campo.get_db_prep_save(campo.get_default(), connection) for campo in restantes)
+        self.fechas = [
+            posicion for posicion, campo in enumerate(self.campos) if campo.get_internal_type() == 'DateTimeField'
+        ]
+
+        quote = connection.ops.quote_name
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(modelo._meta.db_table),
+            ', '.join(quote(campo.column) for campo in self.campos),
+            ', '.join(['%s'] * len(self.campos))
+        )
+
+    def escribir(self, filas):
+        if not filas:
+            return
+        if self.usar_copy:
+            copiar_filas(self.connection, self.modelo, self.campos, (fila + self.extra for fila in filas))
+            return
+
+        adaptar = self.connection.ops.adapt_datetimefield_value
+        parametros = []
+        for fila in filas:
+            fila = list(fila + self.extra)
+            for posicion in self.fechas:
+                fila[posicion] = adaptar(fila[posicion])
+            parametros.append(fila)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, parametros)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from incidencias.imagenes import generar_variantes
+from incidencias.models import Incidencia
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes (miniatura, vista previa) que falten de las imágenes de incidencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Regenerar también las variantes existentes')
+
+    def handle(self, *args, **options):
+        nombres = (
+            Incidencia.objects.exclude(imagen='').exclude(imagen__isnull=True)
+            .values_list('imagen', flat=True).distinct().iterator()
+        )
+        imagenes = creadas = errores = 0
+        for nombre in nombres:
+            imagenes += 1
+            try:
+                creadas += generar_variantes(nombre, forzar=options['forzar'])
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.ERROR(f'❌ {nombre}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {imagenes} imágenes revisadas, {creadas} variantes generadas'))
+        if errores:
+            self.stdout.write(self.style.WARNING(f'⚠️  {errores} imágenes no se pudieron procesar'))
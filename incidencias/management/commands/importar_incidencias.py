@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from incidencias.importacion import FORMATOS_IMPORTACION, TAMANO_LOTE, detectar_formato, importar_incidencias
+from usuarios.models import Usuario
+
+
+class Command(BaseCommand):
+    help = 'Importa incidencias en bloque desde un archivo CSV o NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo a importar')
+        parser.add_argument(
+            '--usuario', required=True,
+            help='Username del administrador que realiza la importación (creador por defecto)'
+        )
+        parser.add_argument(
+            '--formato', choices=FORMATOS_IMPORTACION,
+            help='Formato del archivo; por defecto se deduce de la extensión'
+        )
+        parser.add_argument(
+            '--tamano-lote', type=int, default=TAMANO_LOTE,
+            help='Filas insertadas por transacción'
+        )
+        parser.add_argument(
+            '--sin-copy', action='store_true',
+            help='Usar bulk_create también en PostgreSQL en lugar de COPY'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f'No existe el usuario {options["usuario"]}')
+
+        formato = detectar_formato(options['archivo'], options['formato'])
+        try:
+            archivo = open(options['archivo'], 'rb')
+        except OSError as e:
+            raise CommandError(f'No se puede abrir el archivo: {e}')
+
+        with archivo:
+            resultado = importar_incidencias(
+                archivo, formato, usuario,
+                tamano_lote=options['tamano_lote'],
+                usar_copy=False if options['sin_copy'] else None
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {resultado["importadas"]} de {resultado["procesadas"]} filas importadas'
+        ))
+        if resultado['errores']:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {resultado["errores"]} filas con errores: {resultado["archivo_errores"]}'
+            ))
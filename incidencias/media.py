@@ -0,0 +1,230 @@
+"""Entrega protegida de los archivos de MEDIA_ROOT.
+
+Los archivos ya no se sirven como estáticos públicos: cada descarga pasa por
+una vista que comprueba quién la pide (un trabajador solo ve las imágenes de
+sus incidencias; reportes y errores de importación son solo para
+administradores). La transferencia de los bytes se delega, según
+MEDIA_PROTEGIDA['MODO'], en:
+
+- 'x-accel': nginx, con una location interna que apunta a MEDIA_ROOT:
+
+      location /media-protegida/ {
+          internal;
+          alias /ruta/a/media/;
+      }
+
+- 'x-sendfile': Apache (mod_xsendfile) o lighttpd, con la ruta absoluta.
+- 'django': un FileResponse, que los servidores WSGI envían con sendfile()
+  cuando es el archivo entero. Atiende Range con un único tramo.
+
+En todos los modos se responden antes 304/412 a los GET condicionales con un
+ETag y Last-Modified sacados del stat del archivo, sin abrirlo.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from rest_framework.negotiation import BaseContentNegotiation
+
+from . import imagenes
+from .models import Incidencia
+
+CONFIGURACION_POR_DEFECTO = {
+    # 'django', 'x-accel' (nginx) o 'x-sendfile' (Apache, lighttpd)
+    'MODO': 'django',
+    # Location interna de nginx que apunta a MEDIA_ROOT (solo 'x-accel')
+    'PREFIJO_INTERNO': '/media-protegida/',
+    # Segundos que el navegador reutiliza un archivo sin revalidarlo
+    'MAX_AGE': 3600,
+}
+
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'MEDIA_PROTEGIDA', {})}
+
+
+class NegociacionArchivos(BaseContentNegotiation):
+    """Ignora Accept: un <img> pide image/*, pero los errores se envían siempre con el primer renderer"""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class RangoNoSatisfacible(Exception):
+    pass
+
+
+def archivo_visible(usuario, nombre):
+    """Nombre del archivo que se entrega a `usuario` cuando pide `nombre`, o None si no puede verlo.
+
+    Los administradores ven todas las imágenes sin consultar la base de datos.
+    Un trabajador solo las de sus incidencias. Si la variante pedida todavía no
+    se ha generado se entrega la imagen original.
+    """
+    nombre = posixpath.normpath(nombre)
+    if nombre.startswith(('/', '..')):
+        return None
+    es_administrador = usuario.tipo_usuario == 'administrador'
+    if not nombre.startswith(f'{imagenes.CARPETA}/'):
+        return nombre if es_administrador else None
+
+    storage = imagenes.almacenamiento()
+    base, variante = imagenes.separar_variante(nombre)
+    if es_administrador and (variante is None or storage.exists(nombre)):
+        return nombre
+
+    incidencias = Incidencia.objects.all()
+    if not es_administrador:
+        incidencias = incidencias.filter(usuario_creador=usuario)
+    if variante is None:
+        return nombre if incidencias.filter(imagen=nombre).exists() else None
+
+    candidatas = incidencias.filter(imagen__startswith=f'{base}.').values_list('imagen', flat=True)
+    original = next((c for c in candidatas if imagenes.nombre_variante(c, variante) == nombre), None)
+    if original is None:
+        return None
+    # Las variantes se generan en segundo plano tras la subida
+    return nombre if storage.exists(nombre) else original
+
+
+def servir_archivo(request, nombre, storage=None, nombre_descarga=None):
+    """Respuesta que entrega el archivo `nombre` de `storage` (por defecto el de MEDIA).
+
+    Con `nombre_descarga` se envía como adjunto con ese nombre. Lanza Http404
+    si el archivo no existe.
+    """
+    opciones = configuracion()
+    storage = storage or default_storage
+    ruta = _ruta_local(storage, nombre)
+    try:
+        if ruta is not None:
+            estado = os.stat(ruta)
+            tamano, modificado = estado.st_size, estado.st_mtime
+        else:
+            tamano, modificado = storage.size(nombre), storage.get_modified_time(nombre).timestamp()
+    except FileNotFoundError:
+        raise Http404('Archivo no encontrado')
+    # Mismo formato que nginx: fecha de modificación y tamaño en hexadecimal
+    etag = f'"{int(modificado * 1000):x}-{tamano:x}"'
+    ultima_modificacion = int(modificado)
+    tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if response is None:
+        modo = opciones['MODO'] if ruta is not None else 'django'
+        if modo == 'x-accel':
+            response = HttpResponse(content_type=tipo)
+            response['X-Accel-Redirect'] = quote(opciones['PREFIJO_INTERNO'].rstrip('/') + '/' + nombre)
+        elif modo == 'x-sendfile':
+            response = HttpResponse(content_type=tipo)
+            response['X-Sendfile'] = ruta
+        else:
+            response = _respuesta_archivo(request, storage, nombre, ruta, tamano, etag, ultima_modificacion, tipo)
+        if nombre_descarga:
+            response['Content-Disposition'] = content_disposition_header(True, nombre_descarga)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(ultima_modificacion)
+    response['Accept-Ranges'] = 'bytes'
+    # Cada archivo depende de quién lo pide: nunca en cachés compartidas
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True, max_age=opciones['MAX_AGE'])
+    return response
+
+
+def _ruta_local(storage, nombre):
+    try:
+        return storage.path(nombre)
+    except NotImplementedError:
+        # Almacenamiento remoto: no hay ruta que pasar al proxy
+        return None
+
+
+def _respuesta_archivo(request, storage, nombre, ruta, tamano, etag, ultima_modificacion, tipo):
+    try:
+        rango = _rango(request, tamano, etag, ultima_modificacion)
+    except RangoNoSatisfacible:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamano}'
+        return response
+
+    archivo = open(ruta, 'rb') if ruta is not None else storage.open(nombre, 'rb')
+    if rango is None:
+        return FileResponse(archivo, content_type=tipo)
+
+    inicio, fin = rango
+    archivo.seek(inicio)
+    response = FileResponse(_Tramo(archivo, fin - inicio + 1), status=206, content_type=tipo)
+    response['Content-Length'] = fin - inicio + 1
+    response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    return response
+
+
+def _rango(request, tamano, etag, ultima_modificacion):
+    """Tramo (inicio, fin) pedido con Range, o None para enviar el archivo entero.
+
+    Varios tramos, una sintaxis desconocida o un If-Range que ya no coincide
+    se atienden con el archivo entero, como permite RFC 9110.
+    """
+    cabecera = request.headers.get('Range')
+    if not cabecera or request.method != 'GET':
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and not _if_range_coincide(if_range, etag, ultima_modificacion):
+        return None
+    coincidencia = _RANGO.match(cabecera.strip())
+    if coincidencia is None:
+        return None
+
+    inicio, fin = coincidencia.groups()
+    if not inicio:
+        if not fin:
+            return None
+        # bytes=-N: los últimos N bytes
+        sufijo = int(fin)
+        if sufijo == 0 or tamano == 0:
+            raise RangoNoSatisfacible()
+        return max(tamano - sufijo, 0), tamano - 1
+    inicio = int(inicio)
+    if fin and int(fin) < inicio:
+        return None
+    if inicio >= tamano:
+        raise RangoNoSatisfacible()
+    return inicio, min(int(fin), tamano - 1) if fin else tamano - 1
+
+
+def _if_range_coincide(valor, etag, ultima_modificacion):
+    if valor.startswith(('"', 'W/')):
+        # If-Range exige comparación fuerte
+        return valor == etag
+    return parse_http_date_safe(valor) == ultima_modificacion
+
+
+class _Tramo:
+    """Lectura de `longitud` bytes de un archivo a partir de su posición actual"""
+
+    def __init__(self, archivo, longitud):
+        self._archivo = archivo
+        self._restante = longitud
+
+    def read(self, tamano=-1):
+        if tamano < 0 or tamano > self._restante:
+            tamano = self._restante
+        datos = self._archivo.read(tamano)
+        self._restante -= len(datos)
+        return datos
+
+    def close(self):
+        self._archivo.close()
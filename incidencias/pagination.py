@@ -0,0 +1,128 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class IncidenciaCursorPagination(BasePagination):
+    """Paginación por cursor (keyset) sobre el orden (-fecha_creacion, -id).
+
+    No ejecuta COUNT(*) ni OFFSET: cada página filtra a partir de la última fila
+    vista, por lo que la página 10.000 cuesta lo mismo que la primera.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor['reverse']
+
+        if cursor is None:
+            queryset = queryset.order_by('-fecha_creacion', '-id')
+        elif self.reverse:
+            # La cota simple sobre fecha_creacion es la que el índice puede usar como límite del recorrido
+            queryset = queryset.filter(fecha_creacion__gte=cursor['fecha']).filter(
+                Q(fecha_creacion__gt=cursor['fecha']) |
+                Q(fecha_creacion=cursor['fecha'], id__gt=cursor['id'])
+            ).order_by('fecha_creacion', 'id')
+        else:
+            queryset = queryset.filter(fecha_creacion__lte=cursor['fecha']).filter(
+                Q(fecha_creacion__lt=cursor['fecha']) |
+                Q(fecha_creacion=cursor['fecha'], id__lt=cursor['id'])
+            ).order_by('-fecha_creacion', '-id')
+
+        # Se pide una fila extra para saber si hay más resultados sin contar
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            data = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            fecha = parse_datetime(data['f'])
+            if fecha is None:
+                raise ValueError
+            return {'fecha': fecha, 'id': data['i'], 'reverse': bool(data.get('r'))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        data = {'f': _valor(item, 'fecha_creacion').isoformat(), 'i': _valor(item, 'id')}
+        if reverse:
+            data['r'] = 1
+        encoded = b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def _valor(item, campo):
+    """Obtiene un campo tanto de instancias de modelo como de filas de .values()"""
+    if isinstance(item, dict):
+        return item[campo]
+    return getattr(item, campo)
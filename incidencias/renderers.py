@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RapidoJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer que usa orjson cuando está instalado.
+
+    Produce los mismos bytes que JSONRenderer en modo compacto; si orjson no
+    está disponible, se pide sangría o el dato no es serializable por orjson,
+    delega en la implementación estándar.
+    """
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if orjson is None or not self.compact or self.ensure_ascii or self.strict is False:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            # Las fechas pasan por el JSONEncoder de DRF para conservar su formato
+            ret = orjson.dumps(data, default=self._encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que JSONRenderer: escapar \u2028 y \u2029
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """Renderer para ?format=csv.
+
+    Los reportes en CSV se envían como StreamingHttpResponse; este renderer solo
+    se usa para las respuestas de error de esas vistas.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['clave', 'valor'])
+        for clave, valor in data.items():
+            writer.writerow([clave, valor])
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Renderer para ?format=ndjson (un objeto JSON por línea)"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        linea = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        return (linea + '\n').encode('utf-8')
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """Renderer para Accept: text/event-stream.
+
+    El flujo de eventos se envía como StreamingHttpResponse; este renderer
+    permite negociar el tipo y envía las respuestas de error como un evento.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        datos = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        return f'event: error\ndata: {datos}\n\n'.encode(self.charset)
@@ -0,0 +1,213 @@
+"""Serialización rápida de solo lectura para Incidencia, CambioEstado y ComentarioAdmin.
+
+Construye exactamente la misma estructura que IncidenciaSerializer (mismas
+claves, mismo orden y mismos formatos) a partir de filas de `.values()`, sin
+instanciar modelos ni pasar por la maquinaria de campos de DRF. Cualquier
+cambio en los serializers de lectura debe reflejarse aquí.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from incidencias_project.instrumentacion import medir
+
+from .imagenes import nombre_variante
+from .models import Incidencia, CambioEstado, ComentarioAdmin
+from .serializers import IncidenciaSerializer
+
+# Campo del serializer -> columna de .values()
+_COLUMNAS_INCIDENCIA = {
+    'id': 'id',
+    'tipo_incidencia': 'tipo_incidencia',
+    'descripcion': 'descripcion',
+    'prioridad': 'prioridad',
+    'ubicacion': 'ubicacion',
+    'estado': 'estado',
+    'fecha_creacion': 'fecha_creacion',
+    'fecha_actualizacion': 'fecha_actualizacion',
+    'fecha_resolucion': 'fecha_resolucion',
+    'usuario_creador': 'usuario_creador',
+    'usuario_creador_nombre': 'usuario_creador__nombre_completo',
+    'imagen': 'imagen',
+    'imagen_miniatura': 'imagen',
+    'imagen_vista_previa': 'imagen',
+}
+
+# Campo del serializer -> variante de la imagen
+_VARIANTES_IMAGEN = {'imagen_miniatura': 'miniatura', 'imagen_vista_previa': 'vista_previa'}
+
+COLUMNAS_CAMBIO = [
+    'incidencia_id', 'id', 'estado_anterior', 'estado_nuevo', 'comentario', 'fecha',
+    'usuario_id', 'usuario__nombre_completo',
+]
+
+COLUMNAS_COMENTARIO = [
+    'incidencia_id', 'id', 'mensaje', 'fecha', 'usuario_id', 'usuario__nombre_completo', 'es_visible',
+]
+
+# Tamaño de los bloques de ids para las consultas de historial y comentarios
+TAMANO_BLOQUE = 1000
+
+_fecha = serializers.DateTimeField()
+
+
+def columnas_incidencia(campos):
+    """Columnas de .values() necesarias para serializar `campos`.
+
+    Siempre incluye id y fecha_creacion, que usan la paginación y las relaciones.
+    """
+    columnas = ['id', 'fecha_creacion']
+    if 'usuario_creador_nombre' in campos:
+        columnas.append('usuario_creador')
+    for campo in IncidenciaSerializer.Meta.fields:
+        columna = _COLUMNAS_INCIDENCIA.get(campo)
+        if campo in campos and columna and columna not in columnas:
+            columnas.append(columna)
+    return columnas
+
+
+def valores_incidencias(queryset, campos):
+    """Convierte un queryset de incidencias en un queryset de .values() listo para serializar"""
+    return queryset.prefetch_related(None).values(*columnas_incidencia(campos))
+
+
+def serializar_incidencias(filas, campos, request=None):
+    """Equivalente a IncidenciaSerializer(..., many=True).data para filas de `valores_incidencias`"""
+    filas = list(filas)
+    ids = [fila['id'] for fila in filas]
+    historial = {}
+    comentarios = {}
+    if 'historial_cambios' in campos:
+        historial = agrupar_por_incidencia(_por_bloques(CambioEstado.objects.all(), ids, COLUMNAS_CAMBIO))
+    if 'comentarios_admin' in campos:
+        comentarios = agrupar_por_incidencia(_por_bloques(ComentarioAdmin.objects.all(), ids, COLUMNAS_COMENTARIO))
+    with medir('serializacion'):
+        return construir_incidencias(filas, campos, historial, comentarios, request)
+
+
+async def aserializar_incidencias(filas, campos, request=None):
+    """Versión asíncrona de serializar_incidencias; `filas` puede ser el queryset de `valores_incidencias`"""
+    if hasattr(filas, '__aiter__'):
+        filas = [fila async for fila in filas]
+    ids = [fila['id'] for fila in filas]
+    historial = {}
+    comentarios = {}
+    if 'historial_cambios' in campos:
+        cambios = _apor_bloques(CambioEstado.objects.all(), ids, COLUMNAS_CAMBIO)
+        historial = agrupar_por_incidencia([fila async for fila in cambios])
+    if 'comentarios_admin' in campos:
+        mensajes = _apor_bloques(ComentarioAdmin.objects.all(), ids, COLUMNAS_COMENTARIO)
+        comentarios = agrupar_por_incidencia([fila async for fila in mensajes])
+    with medir('serializacion'):
+        return construir_incidencias(filas, campos, historial, comentarios, request)
+
+
+def _por_bloques(queryset, ids, columnas):
+    for inicio in range(0, len(ids), TAMANO_BLOQUE):
+        yield from queryset.filter(incidencia_id__in=ids[inicio:inicio + TAMANO_BLOQUE]).values(*columnas)
+
+
+async def _apor_bloques(queryset, ids, columnas):
+    for inicio in range(0, len(ids), TAMANO_BLOQUE):
+        async for fila in queryset.filter(incidencia_id__in=ids[inicio:inicio + TAMANO_BLOQUE]).values(*columnas):
+            yield fila
+
+
+def agrupar_por_incidencia(filas):
+    """Agrupa filas de historial o comentarios por incidencia conservando su orden"""
+    agrupadas = defaultdict(list)
+    for fila in filas:
+        agrupadas[fila['incidencia_id']].append(fila)
+    return agrupadas
+
+
+def construir_incidencias(filas, campos, historial, comentarios, request=None):
+    """Construye la representación de cada incidencia a partir de filas ya consultadas"""
+    orden = [campo for campo in IncidenciaSerializer.Meta.fields if campo in campos]
+    fecha_iso = _formateador_fechas()
+    resultado = []
+
+    for fila in filas:
+        data = {}
+        for campo in orden:
+            if campo == 'historial_cambios':
+                data[campo] = [_cambio(cambio, fecha_iso) for cambio in historial.get(fila['id'], ())]
+            elif campo == 'comentarios_admin':
+                data[campo] = [_comentario(comentario, fecha_iso) for comentario in comentarios.get(fila['id'], ())]
+            elif campo == 'usuario_creador_nombre':
+                # DRF omite el campo cuando la relación es nula
+                if fila['usuario_creador'] is not None:
+                    data[campo] = _texto(fila['usuario_creador__nombre_completo'])
+            elif campo in ('fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion'):
+                data[campo] = None if fila[campo] is None else fecha_iso(fila[campo])
+            elif campo == 'imagen':
+                data[campo] = _url_archivo(fila[campo], request)
+            elif campo in _VARIANTES_IMAGEN:
+                data[campo] = _url_archivo(fila['imagen'] and nombre_variante(fila['imagen'], _VARIANTES_IMAGEN[campo]), request)
+            elif campo in ('id', 'usuario_creador'):
+                data[campo] = fila[campo]
+            else:
+                data[campo] = _texto(fila[campo])
+        resultado.append(data)
+
+    return resultado
+
+
+def _cambio(fila, fecha_iso):
+    data = {
+        'id': fila['id'],
+        'estado_anterior': _texto(fila['estado_anterior']),
+        'estado_nuevo': _texto(fila['estado_nuevo']),
+        'comentario': _texto(fila['comentario']),
+        'fecha': None if fila['fecha'] is None else fecha_iso(fila['fecha']),
+    }
+    if fila['usuario_id'] is not None:
+        data['usuario_nombre'] = _texto(fila['usuario__nombre_completo'])
+    return data
+
+
+def _comentario(fila, fecha_iso):
+    data = {
+        'id': fila['id'],
+        'mensaje': _texto(fila['mensaje']),
+        'fecha': None if fila['fecha'] is None else fecha_iso(fila['fecha']),
+    }
+    if fila['usuario_id'] is not None:
+        data['usuario_nombre'] = _texto(fila['usuario__nombre_completo'])
+    data['es_visible'] = None if fila['es_visible'] is None else bool(fila['es_visible'])
+    return data
+
+
+def _texto(valor):
+    return None if valor is None else str(valor)
+
+
+def _formateador_fechas():
+    """Formatea fechas igual que serializers.DateTimeField, resolviendo la zona horaria una sola vez"""
+    formato = api_settings.DATETIME_FORMAT
+    if not settings.USE_TZ or formato is None or formato.lower() != ISO_8601:
+        return _fecha.to_representation
+
+    zona = timezone.get_current_timezone()
+
+    def formatear(valor):
+        if isinstance(valor, str) or timezone.is_naive(valor):
+            return _fecha.to_representation(valor)
+        texto = valor.astimezone(zona).isoformat()
+        if texto.endswith('+00:00'):
+            return texto[:-6] + 'Z'
+        return texto
+
+    return formatear
+
+
+def _url_archivo(nombre, request):
+    if not nombre:
+        return None
+    url = Incidencia._meta.get_field('imagen').storage.url(nombre)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
@@ -1,9 +1,60 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db.models import Prefetch
+from incidencias_project.instrumentacion import medir
+from .imagenes import nombre_variante, preparar_imagen, programar_variantes
 from .models import Incidencia, CambioEstado, ComentarioAdmin
 from usuarios.models import Usuario
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class CamposDinamicosMixin:
+    """Permite limitar los campos con ?fields= y expandir las colecciones anidadas con ?expand=
+
+    Las colecciones de `campos_expandibles` se incluyen por defecto salvo que el
+    contexto indique `expandir_por_defecto=False` (representación compacta de listas).
+    """
+    campos_expandibles = ()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        if campos is None:
+            campos = self.campos_activos(
+                self.context.get('request'),
+                self.context.get('expandir_por_defecto', True)
+            )
+        for nombre in list(self.fields):
+            if nombre not in campos:
+                self.fields.pop(nombre)
+    
+    def to_representation(self, instance):
+        # Cuenta como tiempo de serialización en la instrumentación por petición
+        with medir('serializacion'):
+            return super().to_representation(instance)
+    
+    @classmethod
+    def campos_activos(cls, request=None, expandir_por_defecto=True):
+        """Conjunto de campos que se serializarán para la petición dada"""
+        solicitados = None
+        expandir = set()
+        # Solo se aplica en lecturas para no ignorar datos enviados en escrituras
+        if request is not None and request.method in ('GET', 'HEAD'):
+            if request.query_params.get('fields'):
+                solicitados = set(_lista_parametro(request.query_params['fields']))
+            expandir = set(_lista_parametro(request.query_params.get('expand', '')))
+        
+        campos = set()
+        for nombre in cls.Meta.fields:
+            if nombre in cls.campos_expandibles:
+                if nombre in expandir or (solicitados is None and expandir_por_defecto) or (solicitados and nombre in solicitados):
+                    campos.add(nombre)
+            elif solicitados is None or nombre in solicitados or nombre == 'id':
+                campos.add(nombre)
+        return campos
+
+def _lista_parametro(valor):
+    return [nombre.strip() for nombre in valor.split(',') if nombre.strip()]
+
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Usuario"""
     
     class Meta:
@@ -49,11 +100,15 @@ class ComentarioAdminSerializer(serializers.ModelSerializer):
         model = ComentarioAdmin
         fields = ['id', 'mensaje', 'fecha', 'usuario_nombre', 'es_visible']
 
-class IncidenciaSerializer(serializers.ModelSerializer):
+class IncidenciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Incidencia"""
+    campos_expandibles = ('historial_cambios', 'comentarios_admin')
     usuario_creador_nombre = serializers.CharField(source='usuario_creador.nombre_completo', read_only=True)
     historial_cambios = CambioEstadoSerializer(many=True, read_only=True)
     comentarios_admin = ComentarioAdminSerializer(many=True, read_only=True)
+    # Variantes redimensionadas de la imagen para listados y pantallas de detalle
+    imagen_miniatura = serializers.SerializerMethodField()
+    imagen_vista_previa = serializers.SerializerMethodField()
     
     class Meta:
         model = Incidencia
@@ -61,9 +116,50 @@ class IncidenciaSerializer(serializers.ModelSerializer):
             'id', 'tipo_incidencia', 'descripcion', 'prioridad', 'ubicacion', 
             'estado', 'fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion',
             'usuario_creador', 'usuario_creador_nombre', 'historial_cambios', 
-            'comentarios_admin', 'imagen'
+            'comentarios_admin', 'imagen', 'imagen_miniatura', 'imagen_vista_previa'
         ]
-        read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion']
+        read_only_fields = ['id', 'fecha_creacion', 'fecha_actualizacion', 'fecha_resolucion', 'usuario_creador']
+    
+    def get_imagen_miniatura(self, obj):
+        return self._url_variante(obj, 'miniatura')
+    
+    def get_imagen_vista_previa(self, obj):
+        return self._url_variante(obj, 'vista_previa')
+    
+    def _url_variante(self, obj, variante):
+        if not obj.imagen:
+            return None
+        url = obj.imagen.storage.url(nombre_variante(obj.imagen.name, variante))
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+    
+    def update(self, instance, validated_data):
+        preparar_imagen(validated_data)
+        instance = super().update(instance, validated_data)
+        if 'imagen' in validated_data:
+            programar_variantes(instance.imagen.name)
+        return instance
+    
+    @classmethod
+    def optimizar_queryset(cls, queryset, campos=None):
+        """Precarga solo las relaciones que se van a serializar, en un número fijo de consultas"""
+        if campos is None:
+            campos = set(cls.Meta.fields)
+        
+        if 'usuario_creador_nombre' in campos:
+            queryset = queryset.select_related('usuario_creador')
+        
+        prefetch = []
+        if 'historial_cambios' in campos:
+            prefetch.append(Prefetch('historial_cambios', queryset=CambioEstado.objects.select_related('usuario')))
+        if 'comentarios_admin' in campos:
+            prefetch.append(Prefetch('comentarios_admin', queryset=ComentarioAdmin.objects.select_related('usuario')))
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        
+        return queryset
 
 class IncidenciaCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear incidencias"""
@@ -74,7 +170,26 @@ class IncidenciaCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         # El usuario creador se asigna en la vista
-        return Incidencia.objects.create(**validated_data)
+        preparar_imagen(validated_data)
+        incidencia = Incidencia.objects.create(**validated_data)
+        programar_variantes(incidencia.imagen.name)
+        return incidencia
+
+class ImportarIncidenciaSerializer(IncidenciaCreateSerializer):
+    """Valida una fila de la importación masiva con las reglas de IncidenciaCreateSerializer.
+
+    Admite además el estado y las fechas originales, y el username del creador.
+    """
+    estado = serializers.ChoiceField(choices=Incidencia.ESTADOS_CHOICES, default='pendiente')
+    fecha_creacion = serializers.DateTimeField(required=False)
+    fecha_resolucion = serializers.DateTimeField(required=False, allow_null=True)
+    usuario_creador = serializers.CharField(required=False)
+    
+    class Meta(IncidenciaCreateSerializer.Meta):
+        fields = [
+            'tipo_incidencia', 'descripcion', 'prioridad', 'ubicacion',
+            'estado', 'fecha_creacion', 'fecha_resolucion', 'usuario_creador'
+        ]
 
 class LoginSerializer(serializers.Serializer):
     """Serializer para el login"""
@@ -101,6 +216,49 @@ class CambiarEstadoSerializer(serializers.Serializer):
     estado = serializers.ChoiceField(choices=Incidencia.ESTADOS_CHOICES)
     comentario = serializers.CharField(required=False, allow_blank=True)
 
+class IdIncidenciaField(serializers.Field):
+    """Id de incidencia con los mismos valores que admiten las rutas de una incidencia (<str:incidencia_id>).
+
+    Los enteros y los textos formados solo por dígitos se convierten a entero;
+    cualquier otro texto, y los números fuera del rango de ids de la base de
+    datos, se conservan tal cual para informarlos como incidencia no
+    encontrada, igual que respondería la ruta individual, en lugar de rechazar
+    toda la petición. Solo `es_valido` indica si merece la pena buscarlo.
+    """
+    # Rango de una clave primaria BIGINT positiva
+    ID_MINIMO = 1
+    ID_MAXIMO = 2 ** 63 - 1
+
+    default_error_messages = {
+        'invalid': 'Debe ser un número o un texto.',
+    }
+
+    @classmethod
+    def es_valido(cls, valor):
+        return isinstance(valor, int) and cls.ID_MINIMO <= valor <= cls.ID_MAXIMO
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail('invalid')
+        if isinstance(data, str) and data.isascii() and data.isdigit():
+            numero = int(data)
+            # Un texto fuera de rango se conserva como texto
+            return numero if self.es_valido(numero) else data
+        return data
+
+    def to_representation(self, value):
+        return value
+
+class CambiarEstadoMasivoSerializer(serializers.Serializer):
+    """Serializer para cambiar el estado de varias incidencias a la vez"""
+    ids = serializers.ListField(child=IdIncidenciaField(), allow_empty=False, max_length=1000)
+    estado = serializers.ChoiceField(choices=Incidencia.ESTADOS_CHOICES)
+    comentario = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_ids(self, value):
+        # Quitar duplicados conservando el orden recibido
+        return list(dict.fromkeys(value))
+
 class AgregarComentarioSerializer(serializers.Serializer):
     """Serializer para agregar comentarios del administrador"""
     mensaje = serializers.CharField(max_length=1000)
@@ -0,0 +1,93 @@
+"""Datos comunes de los tests de incidencias"""
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from incidencias.authentication import cache_tokens
+from incidencias.models import CambioEstado, ComentarioAdmin, Incidencia
+from usuarios.models import Usuario
+
+
+def crear_usuarios():
+    admin = Usuario.objects.create_user(
+        'admin', password='admin123', nombre_completo='Ana Administradora', tipo_usuario='administrador'
+    )
+    trabajadores = [
+        Usuario.objects.create_user(
+            f'trabajador{numero}', password='123456', nombre_completo=f'Trabajador {numero}', tipo_usuario='trabajador'
+        )
+        for numero in range(3)
+    ]
+    return admin, trabajadores
+
+
+def crear_incidencias(admin, trabajadores, total, cambios=3, comentarios=2):
+    """Incidencias repartidas entre los trabajadores, cada una con historial y comentarios de varios usuarios"""
+    ahora = timezone.now()
+    incidencias = Incidencia.objects.bulk_create([
+        Incidencia(
+            tipo_incidencia=('hardware', 'software', 'red', 'otro')[numero % 4],
+            descripcion=f'Incidencia de prueba {numero}',
+            prioridad=('baja', 'media', 'alta')[numero % 3],
+            ubicacion=f'Aula {numero % 7}',
+            estado=('pendiente', 'en_proceso', 'resuelto')[numero % 3],
+            fecha_resolucion=ahora if numero % 3 == 2 else None,
+            usuario_creador=trabajadores[numero % len(trabajadores)],
+        )
+        for numero in range(total)
+    ])
+    # Fechas distintas para que el orden de los listados sea estable
+    for numero, incidencia in enumerate(incidencias):
+        incidencia.fecha_creacion = ahora - timedelta(minutes=numero)
+    Incidencia.objects.bulk_update(incidencias, ['fecha_creacion'])
+
+    CambioEstado.objects.bulk_create([
+        CambioEstado(
+            incidencia=incidencia,
+            estado_anterior=None if paso == 0 else 'pendiente',
+            estado_nuevo='pendiente' if paso == 0 else 'en_proceso',
+            comentario=f'Cambio {paso}',
+            usuario=incidencia.usuario_creador if paso == 0 else admin,
+        )
+        for incidencia in incidencias for paso in range(cambios)
+    ])
+    ComentarioAdmin.objects.bulk_create([
+        ComentarioAdmin(
+            incidencia=incidencia,
+            mensaje=f'Comentario {paso}',
+            usuario=admin if paso % 2 == 0 else None,
+            es_visible=paso % 2 == 0,
+        )
+        for incidencia in incidencias for paso in range(comentarios)
+    ])
+    return incidencias
+
+
+def limpiar_caches():
+    """La caché de tokens es del proceso y sobrevive a la transacción de cada test"""
+    cache_tokens.limpiar()
+    cache.clear()
+
+
+def imagen_png(nombre='foto.png', tamano=(1600, 900), color=(200, 30, 30)):
+    """Imagen PNG lista para subirse en un formulario multipart"""
+    buffer = BytesIO()
+    Image.new('RGB', tamano, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/png')
+
+
+def media_temporal(test):
+    """MEDIA_ROOT en un directorio temporal mientras dure el test"""
+    directorio = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+    ajustes = override_settings(MEDIA_ROOT=directorio)
+    ajustes.enable()
+    test.addCleanup(ajustes.disable)
+    return directorio
@@ -0,0 +1,122 @@
+"""Caché de tokens de CacheTokenAuthentication y revocaciones entre procesos.
+
+Para simular otro proceso, que conserva en su caché la entrada leída antes de
+la revocación, se vuelve a guardar esa entrada en cache_tokens después de
+revocar: solo la marca publicada en la caché de Django puede descartarla.
+"""
+from django.test import TestCase
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from incidencias.authentication import CacheTokenAuthentication, cache_tokens
+from usuarios.models import Usuario
+
+from .datos import crear_usuarios, limpiar_caches
+
+
+class CacheTokensTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.trabajador = cls.trabajadores[0]
+        cls.token = Token.objects.create(user=cls.trabajador)
+
+    def setUp(self):
+        limpiar_caches()
+        self.autenticacion = CacheTokenAuthentication()
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+
+    def autenticar(self):
+        return self.autenticacion.authenticate_credentials(self.token.key)
+
+    def entrada_de_otro_proceso(self):
+        """Autentica para llenar la caché y devuelve la entrada tal como la guardaría otro proceso"""
+        self.autenticar()
+        entrada = cache_tokens.obtener(self.token.key)
+        self.assertIsNotNone(entrada)
+        return entrada
+
+    def assertRevocadoEnOtroProceso(self, entrada):
+        # El proceso que atendió la revocación ya la ha quitado de su caché
+        self.assertIsNone(cache_tokens.obtener(self.token.key))
+        cache_tokens.guardar(self.token.key, *entrada)
+        revocadas = cache_tokens.metricas()['revocadas']
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.autenticar()
+        self.assertEqual(cache_tokens.metricas()['revocadas'], revocadas + 1)
+
+    # ==================== Aciertos ====================
+
+    def test_acierto_sin_consultas(self):
+        usuario, token = self.autenticar()
+        self.assertEqual(usuario, self.trabajador)
+        with self.assertNumQueries(0):
+            usuario, token = self.autenticar()
+        self.assertEqual((usuario.pk, token.key), (self.trabajador.pk, self.token.key))
+        # Cada petición recibe su propia copia del usuario
+        self.assertIsNot(usuario, self.autenticar()[0])
+
+    def test_peticion_con_token_en_cache(self):
+        cliente = APIClient(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(cliente.get('/api/usuarios/autocompletar/').status_code, 403)
+        with self.assertNumQueries(0):
+            self.assertEqual(cliente.get('/api/usuarios/autocompletar/').status_code, 403)
+
+    def test_token_invalido(self):
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.autenticacion.authenticate_credentials('no-existe')
+        self.assertIsNone(cache_tokens.obtener('no-existe'))
+
+    def test_entrada_no_revocada_sigue_valiendo(self):
+        entrada = self.entrada_de_otro_proceso()
+        # Revocar otro usuario no afecta a esta entrada
+        self.admin_client.post(f'/api/usuarios/{self.trabajadores[1].id}/restablecer-password/')
+        cache_tokens.guardar(self.token.key, *entrada)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.autenticar()[0].pk, self.trabajador.pk)
+
+    # ==================== Revocaciones ====================
+
+    def test_logout(self):
+        entrada = self.entrada_de_otro_proceso()
+        cliente = APIClient(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(cliente.post('/api/auth/logout/').status_code, 200)
+        self.assertRevocadoEnOtroProceso(entrada)
+
+    def test_restablecer_password(self):
+        entrada = self.entrada_de_otro_proceso()
+        response = self.admin_client.post(f'/api/usuarios/{self.trabajador.id}/restablecer-password/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRevocadoEnOtroProceso(entrada)
+
+    def test_desactivar_usuario(self):
+        entrada = self.entrada_de_otro_proceso()
+        response = self.admin_client.post(
+            f'/api/usuarios/{self.trabajador.id}/cambiar-estado/', {'estado': 'inactivo'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertRevocadoEnOtroProceso(entrada)
+
+        # Al reactivarlo el mismo token vuelve a valer
+        self.admin_client.post(f'/api/usuarios/{self.trabajador.id}/cambiar-estado/', {'estado': 'activo'}, format='json')
+        self.assertEqual(self.autenticar()[0].pk, self.trabajador.pk)
+
+    def test_eliminar_usuario(self):
+        entrada = self.entrada_de_otro_proceso()
+        response = self.admin_client.delete(f'/api/usuarios/{self.trabajador.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Usuario.objects.filter(pk=self.trabajador.pk).exists())
+        self.assertRevocadoEnOtroProceso(entrada)
+
+    def test_modificar_usuario_relee_sus_datos(self):
+        entrada = self.entrada_de_otro_proceso()
+        response = self.admin_client.patch(
+            f'/api/usuarios/{self.trabajador.id}/', {'nombre_completo': 'Nombre nuevo'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        cache_tokens.guardar(self.token.key, *entrada)
+        # La entrada anterior se descarta y el usuario se vuelve a leer
+        self.assertEqual(self.autenticar()[0].nombre_completo, 'Nombre nuevo')
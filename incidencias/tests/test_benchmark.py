@@ -0,0 +1,28 @@
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from incidencias.management.commands import benchmark_endpoints
+from incidencias.management.commands.benchmark_endpoints import ESCENARIOS, nombres_de_rutas, rutas_sin_escenario
+
+
+class CoberturaBenchmarkTests(SimpleTestCase):
+
+    def test_todas_las_urls_tienen_escenario(self):
+        self.assertEqual(rutas_sin_escenario(), set())
+
+    def test_escenarios_de_urls_existentes(self):
+        rutas = nombres_de_rutas()
+        self.assertIn('reportes:descargar-reporte', rutas)
+        self.assertNotIn('admin:index', rutas)
+        for escenario in ESCENARIOS:
+            with self.subTest(escenario=escenario.nombre):
+                self.assertIn(escenario.ruta, rutas)
+
+    def test_url_sin_escenario_falla(self):
+        escenarios = [escenario for escenario in ESCENARIOS if escenario.ruta != 'incidencias:eventos']
+        with mock.patch.object(benchmark_endpoints, 'ESCENARIOS', escenarios):
+            with self.assertRaisesMessage(CommandError, 'incidencias:eventos'):
+                call_command('benchmark_endpoints')
@@ -0,0 +1,46 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from usuarios.models import Usuario
+
+from .datos import crear_usuarios, limpiar_caches
+
+
+class BusquedaUsuariosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, _ = crear_usuarios()
+        cls.perez = Usuario.objects.create_user(
+            'jperez', email='jperez@colegio.es', password='123456', nombre_completo='Juan Pérez',
+            tipo_usuario='trabajador'
+        )
+        cls.ezequiel = Usuario.objects.create_user(
+            'eruiz', email='eruiz@colegio.es', password='123456', nombre_completo='Ezequiel Ruiz',
+            tipo_usuario='trabajador'
+        )
+
+    def setUp(self):
+        limpiar_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ids_listado(self, texto):
+        response = self.client.get('/api/usuarios/', {'search': texto})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return {usuario['id'] for usuario in (data['results'] if isinstance(data, dict) else data)}
+
+    def ids_autocompletar(self, texto):
+        response = self.client.get('/api/usuarios/autocompletar/', {'q': texto})
+        self.assertEqual(response.status_code, 200)
+        return {usuario['id'] for usuario in response.json()['data']}
+
+    def test_listado_busca_subcadenas_cortas(self):
+        self.assertEqual(self.ids_listado('ez'), {self.perez.id, self.ezequiel.id})
+        self.assertEqual(self.ids_listado('z'), {self.perez.id, self.ezequiel.id})
+        self.assertEqual(self.ids_listado('rez'), {self.perez.id})
+
+    def test_autocompletar_busca_prefijos_cortos(self):
+        self.assertEqual(self.ids_autocompletar('ez'), {self.ezequiel.id})
+        self.assertEqual(self.ids_autocompletar('rez'), {self.perez.id})
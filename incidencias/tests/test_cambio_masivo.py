@@ -0,0 +1,62 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+
+class CambioEstadoMasivoIdsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=3, cambios=1, comentarios=0)
+
+    def setUp(self):
+        limpiar_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_mismos_ids_que_las_rutas_individuales(self):
+        primera, segunda, _ = self.incidencias
+        response = self.client.post('/api/incidencias/cambiar-estado-masivo/', {
+            'ids': [primera.id, str(segunda.id), 'abc', 0],
+            'estado': 'resuelto',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        resultados = {resultado['id']: resultado for resultado in response.json()['resultados']}
+
+        # Los ids en texto funcionan como en /incidencias/<id>/cambiar-estado/
+        self.assertIn(segunda.id, resultados)
+        self.assertEqual(response.json()['actualizadas'], 2 - [primera.estado, segunda.estado].count('resuelto'))
+        for valor in ('abc', 0):
+            self.assertEqual(resultados[valor]['message'], 'Incidencia no encontrada')
+
+        response = self.client.post('/api/incidencias/abc/cambiar-estado/', {'estado': 'resuelto'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_ids_fuera_de_rango_o_con_formato_laxo(self):
+        primera = self.incidencias[0]
+        fuera_de_rango = ['99999999999999999999999', 2 ** 70, 2 ** 63, -1, f' {primera.id}', f'{primera.id}_0', '\u0665']
+        response = self.client.post('/api/incidencias/cambiar-estado-masivo/', {
+            'ids': fuera_de_rango,
+            'estado': 'resuelto',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['actualizadas'], 0)
+        for resultado in response.json()['resultados']:
+            self.assertEqual(resultado['message'], 'Incidencia no encontrada')
+        # Cada valor se informa tal como se envió
+        self.assertEqual([resultado['id'] for resultado in response.json()['resultados']], fuera_de_rango)
+
+        # Igual que la ruta individual
+        response = self.client.post(
+            '/api/incidencias/99999999999999999999999/cambiar-estado/', {'estado': 'resuelto'}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_ids_que_no_son_escalares(self):
+        response = self.client.post('/api/incidencias/cambiar-estado-masivo/', {
+            'ids': [{'id': 1}, True],
+            'estado': 'resuelto',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
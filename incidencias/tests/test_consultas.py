@@ -0,0 +1,111 @@
+"""Presupuesto de consultas de los listados y el detalle de incidencias.
+
+El número de consultas de cada endpoint no puede depender del tamaño de la
+página ni del historial o los comentarios de cada incidencia: si una
+relación deja de precargarse, estos tests fallan.
+"""
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+# Consultas de un listado paginado por número de página:
+# 2 del ETag (última modificación y última eliminación), COUNT y la página
+CONSULTAS_LISTA = 4
+# Por cada colección anidada pedida con ?expand= se añade un prefetch
+CONSULTAS_PREFETCH = 1
+# El cursor no necesita COUNT
+CONSULTAS_LISTA_CURSOR = CONSULTAS_LISTA - 1
+# Detalle: ETag, incidencia con su creador y un prefetch por colección anidada
+CONSULTAS_DETALLE_BASE = 2
+
+
+class PresupuestoConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=120)
+
+    def setUp(self):
+        limpiar_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url, consultas):
+        with self.assertNumQueries(consultas):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    # ==================== Listado ====================
+
+    def test_lista_tamanos_de_pagina(self):
+        for tamano in (1, 20, 100):
+            with self.subTest(tamano=tamano), mock.patch.object(PageNumberPagination, 'page_size', tamano):
+                data = self.get('/api/incidencias/', CONSULTAS_LISTA)
+                self.assertEqual(len(data['results']), tamano)
+
+    def test_lista_ultima_pagina(self):
+        data = self.get('/api/incidencias/?page=6', CONSULTAS_LISTA)
+        self.assertEqual(len(data['results']), 20)
+        self.assertIsNone(data['next'])
+
+    def test_lista_cursor_tamanos_de_pagina(self):
+        for tamano in (1, 20, 100):
+            with self.subTest(tamano=tamano):
+                data = self.get(f'/api/incidencias/?paginacion=cursor&page_size={tamano}', CONSULTAS_LISTA_CURSOR)
+                self.assertEqual(len(data['results']), tamano)
+
+    def test_lista_expandida(self):
+        for tamano in (1, 20, 100):
+            with self.subTest(tamano=tamano), mock.patch.object(PageNumberPagination, 'page_size', tamano):
+                data = self.get(
+                    '/api/incidencias/?expand=historial_cambios,comentarios_admin',
+                    CONSULTAS_LISTA + 2 * CONSULTAS_PREFETCH
+                )
+                self.assertEqual(len(data['results'][0]['historial_cambios']), 3)
+                self.assertEqual(len(data['results'][0]['comentarios_admin']), 2)
+
+    def test_lista_campos(self):
+        data = self.get('/api/incidencias/?fields=id,estado,usuario_creador_nombre', CONSULTAS_LISTA)
+        self.assertEqual(set(data['results'][0]), {'id', 'estado', 'usuario_creador_nombre'})
+
+        data = self.get('/api/incidencias/?fields=id,historial_cambios', CONSULTAS_LISTA + CONSULTAS_PREFETCH)
+        self.assertEqual(set(data['results'][0]), {'id', 'historial_cambios'})
+
+    def test_lista_trabajador(self):
+        self.client.force_authenticate(self.trabajadores[0])
+        data = self.get('/api/incidencias/?expand=historial_cambios', CONSULTAS_LISTA + CONSULTAS_PREFETCH)
+        self.assertEqual({fila['usuario_creador'] for fila in data['results']}, {self.trabajadores[0].id})
+
+    # ==================== Detalle ====================
+
+    def test_detalle(self):
+        url = f'/api/incidencias/{self.incidencias[0].id}/'
+        data = self.get(url, CONSULTAS_DETALLE_BASE + 2 * CONSULTAS_PREFETCH)
+        self.assertEqual(len(data['historial_cambios']), 3)
+        self.assertEqual(data['historial_cambios'][1]['usuario_nombre'], 'Ana Administradora')
+        self.assertEqual(len(data['comentarios_admin']), 2)
+
+    def test_detalle_campos(self):
+        url = f'/api/incidencias/{self.incidencias[0].id}/'
+        self.get(f'{url}?fields=id,estado,usuario_creador_nombre', CONSULTAS_DETALLE_BASE)
+        self.get(f'{url}?fields=id,comentarios_admin', CONSULTAS_DETALLE_BASE + CONSULTAS_PREFETCH)
+        self.get(f'{url}?fields=id,estado&expand=historial_cambios', CONSULTAS_DETALLE_BASE + CONSULTAS_PREFETCH)
+
+    def test_detalle_no_depende_del_historial(self):
+        # Una incidencia con diez veces más historial cuesta lo mismo
+        larga = crear_incidencias(self.admin, self.trabajadores, total=1, cambios=30, comentarios=20)[0]
+        data = self.get(f'/api/incidencias/{larga.id}/', CONSULTAS_DETALLE_BASE + 2 * CONSULTAS_PREFETCH)
+        self.assertEqual(len(data['historial_cambios']), 30)
+
+    def test_detalle_no_modificado(self):
+        url = f'/api/incidencias/{self.incidencias[0].id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,51 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from estadisticas import contadores, resumen
+from incidencias.models import Incidencia
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+
+class ContadoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=9, cambios=2, comentarios=1)
+        # crear_incidencias usa bulk_create: partir de contadores y resumen cuadrados
+        contadores.reconciliar()
+        resumen.reconstruir()
+
+    def setUp(self):
+        limpiar_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertCuadran(self):
+        self.assertEqual(contadores.reconciliar(reparar=False), [])
+        self.assertEqual(resumen.reconstruir(reparar=False), [])
+
+    def test_eliminar_usuario_descuenta_sus_incidencias(self):
+        trabajador = self.trabajadores[0]
+        self.assertTrue(Incidencia.objects.filter(usuario_creador=trabajador).exists())
+
+        response = self.client.delete(f'/api/usuarios/{trabajador.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Incidencia.objects.filter(usuario_creador_id=trabajador.id).exists())
+        self.assertCuadran()
+        self.assertEqual(contadores.obtener_estadisticas()['total'], Incidencia.objects.count())
+
+    def test_edicion_no_reasigna_el_creador(self):
+        incidencia = self.incidencias[0]
+        otro = self.trabajadores[1]
+        self.assertNotEqual(incidencia.usuario_creador_id, otro.id)
+
+        response = self.client.patch(
+            f'/api/incidencias/{incidencia.id}/', {'usuario_creador': otro.id, 'estado': 'resuelto'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        incidencia.refresh_from_db()
+        self.assertEqual(incidencia.usuario_creador_id, self.trabajadores[0].id)
+        self.assertEqual(incidencia.estado, 'resuelto')
+        self.assertCuadran()
@@ -0,0 +1,139 @@
+import json
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from incidencias.eventos import REINICIO, _evento, canal_eventos, flujo_eventos
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+
+def leer_eventos(texto):
+    """(tipo, datos) de cada evento de un texto text/event-stream"""
+    eventos = []
+    for bloque in texto.split('\n\n'):
+        campos = dict(linea.split(': ', 1) for linea in bloque.splitlines() if ': ' in linea and not linea.startswith(':'))
+        if 'event' in campos:
+            eventos.append((campos['event'], json.loads(campos['data'])))
+    return eventos
+
+
+class EventosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.trabajador = cls.trabajadores[0]
+        incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=2, cambios=1, comentarios=0)
+        cls.propia, cls.ajena = incidencias
+
+    def setUp(self):
+        limpiar_caches()
+        self.configurar()
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+
+    def configurar(self, **opciones):
+        """Broker en memoria nuevo con EVENTOS = opciones"""
+        ajustes = override_settings(EVENTOS={'LATIDO': 0.01, **opciones})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        canal_eventos.reset()
+        self.addCleanup(canal_eventos.reset)
+
+    def suscribir(self, usuario, ultimo_id=None):
+        suscripcion, pendientes = canal_eventos.suscribir(usuario, ultimo_id)
+        self.addCleanup(canal_eventos.cancelar, suscripcion)
+        return suscripcion, pendientes
+
+    def recibidos(self, suscripcion):
+        eventos = []
+        while (evento := suscripcion.siguiente(0)) is not None:
+            eventos.append(evento)
+        return [(evento['tipo'], evento['incidencia']) for evento in eventos]
+
+    def publicar(self, evento):
+        canal_eventos.publicar(evento)
+        return evento['id']
+
+    def publicar_cambios(self):
+        """Cambios de estado y comentarios en una incidencia propia del trabajador y en una ajena"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for incidencia in (self.propia, self.ajena):
+                self.admin_client.post(
+                    f'/api/incidencias/{incidencia.id}/cambiar-estado/', {'estado': 'en_proceso'}, format='json'
+                )
+                for visible in (True, False):
+                    self.admin_client.post(
+                        f'/api/incidencias/{incidencia.id}/agregar-comentario/',
+                        {'mensaje': 'Revisado', 'es_visible': visible}, format='json'
+                    )
+
+    # ==================== Permisos ====================
+
+    def test_en_vivo_solo_eventos_propios(self):
+        trabajador, _ = self.suscribir(self.trabajador)
+        administrador, _ = self.suscribir(self.admin)
+        self.publicar_cambios()
+
+        self.assertEqual(self.recibidos(trabajador), [
+            ('estado_cambiado', self.propia.id),
+            ('comentario_agregado', self.propia.id),
+        ])
+        self.assertEqual(len(self.recibidos(administrador)), 6)
+
+    def test_reenvio_solo_eventos_propios(self):
+        # Un evento anterior que hace de Last-Event-ID
+        ultimo_id = self.publicar(_evento('incidencia_creada', self.ajena.id, self.ajena.usuario_creador_id))
+        self.publicar_cambios()
+
+        _, pendientes = self.suscribir(self.trabajador, ultimo_id)
+        self.assertEqual([(evento['tipo'], evento['incidencia']) for evento in pendientes], [
+            ('estado_cambiado', self.propia.id),
+            ('comentario_agregado', self.propia.id),
+        ])
+        _, pendientes = self.suscribir(self.admin, ultimo_id)
+        self.assertEqual(len(pendientes), 6)
+
+    def test_reenvio_por_http(self):
+        # El flujo termina en cuanto envía lo pendiente
+        self.configurar(DURACION_MAXIMA=0)
+        ultimo_id = self.publicar(_evento('incidencia_creada', self.propia.id, self.trabajador.id))
+        self.publicar_cambios()
+
+        client = APIClient()
+        client.force_authenticate(self.trabajador)
+        response = client.get('/api/eventos/', headers={'Last-Event-ID': ultimo_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        eventos = leer_eventos(b''.join(response.streaming_content).decode())
+        self.assertEqual([(tipo, datos['incidencia']) for tipo, datos in eventos], [
+            ('estado_cambiado', self.propia.id),
+            ('comentario_agregado', self.propia.id),
+        ])
+        # El marcador interno no se envía al cliente
+        self.assertTrue(all('solo_administradores' not in datos for _, datos in eventos))
+
+        # Un Last-Event-ID que ya no está en el historial pide recargar
+        response = client.get('/api/eventos/', headers={'Last-Event-ID': 'desconocido'})
+        eventos = leer_eventos(b''.join(response.streaming_content).decode())
+        self.assertEqual([tipo for tipo, _ in eventos], [REINICIO])
+
+    # ==================== Desbordamiento ====================
+
+    def test_suscripcion_desbordada_recibe_reinicio(self):
+        self.configurar(MAX_PENDIENTES=2)
+        flujo = flujo_eventos(self.trabajador)
+        self.addCleanup(flujo.close)
+        self.assertTrue(next(flujo).startswith('retry: '))
+
+        for _ in range(3):
+            self.publicar(_evento('estado_cambiado', self.propia.id, self.trabajador.id))
+        self.assertEqual(canal_eventos.metricas()['desbordes'], 1)
+        # Los pendientes se descartan y el cliente recibe un reinicio
+        self.assertEqual([tipo for tipo, _ in leer_eventos(next(flujo))], [REINICIO])
+
+        # Después sigue recibiendo los eventos nuevos
+        self.publicar(_evento('comentario_agregado', self.propia.id, self.trabajador.id))
+        self.assertEqual([tipo for tipo, _ in leer_eventos(next(flujo))], ['comentario_agregado'])
+        self.assertEqual(next(flujo), ': latido\n\n')
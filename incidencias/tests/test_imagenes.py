@@ -0,0 +1,98 @@
+import hashlib
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from PIL import Image
+from rest_framework.test import APIClient
+
+from incidencias import imagenes
+from incidencias.models import Incidencia
+
+from .datos import crear_usuarios, imagen_png, limpiar_caches, media_temporal
+
+
+class ImagenesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+
+    def setUp(self):
+        limpiar_caches()
+        media_temporal(self)
+        self.client = APIClient()
+        self.client.force_authenticate(self.trabajadores[0])
+
+    def crear(self, imagen):
+        # Las variantes se programan al confirmar la transacción, que en TestCase no llega
+        response = self.client.post('/api/incidencias/', {
+            'tipo_incidencia': 'hardware', 'descripcion': 'Pantalla rota', 'prioridad': 'alta',
+            'ubicacion': 'Aula 3', 'imagen': imagen,
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return Incidencia.objects.latest('id')
+
+    # ==================== Subida ====================
+
+    def test_subidas_identicas_comparten_archivo(self):
+        contenido = imagen_png().read()
+        sha = hashlib.sha256(contenido).hexdigest()
+
+        primera = self.crear(SimpleUploadedFile('a.png', contenido, content_type='image/png'))
+        segunda = self.crear(SimpleUploadedFile('otro nombre.png', contenido, content_type='image/png'))
+
+        nombre = f'{imagenes.CARPETA}/{sha[:2]}/{sha}.png'
+        self.assertEqual(primera.imagen.name, nombre)
+        self.assertEqual(segunda.imagen.name, nombre)
+        storage = imagenes.almacenamiento()
+        self.assertEqual(storage.listdir(f'{imagenes.CARPETA}/{sha[:2]}')[1], [f'{sha}.png'])
+        with storage.open(nombre, 'rb') as archivo:
+            self.assertEqual(archivo.read(), contenido)
+
+        # Otro contenido, otro archivo
+        tercera = self.crear(imagen_png(color=(0, 0, 255)))
+        self.assertNotEqual(tercera.imagen.name, nombre)
+
+    def test_solo_las_vistas_de_incidencias_calculan_el_hash(self):
+        with mock.patch.object(imagenes, 'guardar_imagen', wraps=imagenes.guardar_imagen) as guardar:
+            self.crear(imagen_png())
+        archivo = guardar.call_args.args[0]
+        self.assertEqual(len(archivo.sha256), 64)
+
+        # Otras subidas siguen con los manejadores por defecto de Django
+        self.client.force_authenticate(self.admin)
+        csv = SimpleUploadedFile('importar.csv', b'tipo_incidencia,descripcion,prioridad,ubicacion\n', content_type='text/csv')
+        with mock.patch.object(imagenes.HashUploadHandler, 'new_file') as nuevo:
+            self.client.post('/api/incidencias/importar/', {'archivo': csv}, format='multipart')
+        nuevo.assert_not_called()
+
+    # ==================== Variantes ====================
+
+    def test_generar_variantes(self):
+        incidencia = self.crear(imagen_png(tamano=(2000, 1000)))
+        nombre = incidencia.imagen.name
+        storage = imagenes.almacenamiento()
+
+        self.assertEqual(imagenes.generar_variantes(nombre), 2)
+        for variante, lado in imagenes.configuracion()['VARIANTES'].items():
+            with self.subTest(variante=variante), storage.open(imagenes.nombre_variante(nombre, variante), 'rb') as archivo:
+                with Image.open(archivo) as imagen:
+                    self.assertEqual(imagen.format, 'JPEG')
+                    self.assertEqual(imagen.size, (lado, lado // 2))
+        # Las que ya existen no se repiten
+        self.assertEqual(imagenes.generar_variantes(nombre), 0)
+
+    def test_urls_de_las_variantes(self):
+        incidencia = self.crear(imagen_png())
+        imagenes.generar_variantes(incidencia.imagen.name)
+
+        data = self.client.get(f'/api/incidencias/{incidencia.id}/').json()
+        for campo, variante in (('imagen_miniatura', 'miniatura'), ('imagen_vista_previa', 'vista_previa')):
+            with self.subTest(campo=campo):
+                self.assertTrue(data[campo].endswith(imagenes.nombre_variante(incidencia.imagen.name, variante)))
+                response = self.client.get(data[campo])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'image/jpeg')
+                with imagenes.almacenamiento().open(imagenes.nombre_variante(incidencia.imagen.name, variante), 'rb') as archivo:
+                    self.assertEqual(b''.join(response.streaming_content), archivo.read())
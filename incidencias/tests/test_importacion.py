@@ -0,0 +1,109 @@
+import csv
+import io
+from datetime import datetime, timezone as dt_timezone
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from estadisticas import contadores
+from incidencias.importacion import COMENTARIO_IMPORTACION, _valor_copy, importar_incidencias
+from incidencias.models import CambioEstado, Incidencia
+
+from .datos import crear_usuarios, limpiar_caches, media_temporal
+
+CREADA = datetime(2024, 3, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc)
+RESUELTA = datetime(2024, 3, 2, 18, 0, tzinfo=dt_timezone.utc)
+
+# Descripciones con los caracteres que el formato de texto de COPY tiene que escapar
+FILAS = [
+    {
+        'tipo_incidencia': 'hardware', 'descripcion': 'Columnas\tseparadas\tpor tabuladores',
+        'prioridad': 'alta', 'ubicacion': 'Aula 1', 'estado': 'pendiente',
+        'fecha_creacion': CREADA.isoformat(), 'usuario_creador': 'trabajador0',
+    },
+    {
+        'tipo_incidencia': 'software', 'descripcion': 'Primera línea\nsegunda línea\r\ntercera',
+        'prioridad': 'media', 'ubicacion': 'Sala "B"', 'estado': 'resuelto',
+        'fecha_creacion': CREADA.isoformat(), 'fecha_resolucion': RESUELTA.isoformat(),
+    },
+    {
+        'tipo_incidencia': 'red', 'descripcion': 'Ruta C:\\red\\nuevo y \\N literal, sin escapar',
+        'prioridad': 'baja', 'ubicacion': 'Despacho \\ 2', 'estado': 'en_proceso',
+        'usuario_creador': 'trabajador1',
+    },
+]
+
+
+def archivo_csv(filas):
+    texto = io.StringIO(newline='')
+    writer = csv.DictWriter(texto, fieldnames=list(dict.fromkeys(campo for fila in filas for campo in fila)))
+    writer.writeheader()
+    writer.writerows(filas)
+    return io.BytesIO(texto.getvalue().encode())
+
+
+class ImportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+
+    def setUp(self):
+        limpiar_caches()
+        media_temporal(self)
+
+    def importar(self, usar_copy):
+        resultado = importar_incidencias(archivo_csv(FILAS), 'csv', self.admin, tamano_lote=2, usar_copy=usar_copy)
+        self.assertEqual(resultado, {'procesadas': 3, 'importadas': 3, 'errores': 0, 'archivo_errores': None})
+
+    def assertFilasImportadas(self):
+        incidencias = list(Incidencia.objects.order_by('id'))
+        self.assertEqual(len(incidencias), len(FILAS))
+        creadores = [self.trabajadores[0].id, self.admin.id, self.trabajadores[1].id]
+
+        for incidencia, fila, creador in zip(incidencias, FILAS, creadores):
+            with self.subTest(descripcion=fila['descripcion']):
+                for campo in ('tipo_incidencia', 'descripcion', 'prioridad', 'ubicacion', 'estado'):
+                    self.assertEqual(getattr(incidencia, campo), fila[campo])
+                self.assertEqual(incidencia.usuario_creador_id, creador)
+                self.assertFalse(incidencia.imagen)
+
+        primera, segunda, tercera = incidencias
+        self.assertEqual(primera.fecha_creacion, CREADA)
+        self.assertIsNone(primera.fecha_resolucion)
+        self.assertEqual(segunda.fecha_resolucion, RESUELTA)
+        self.assertIsNone(tercera.fecha_resolucion)
+        self.assertGreater(tercera.fecha_creacion, CREADA)
+
+        cambios = list(CambioEstado.objects.order_by('incidencia_id'))
+        self.assertEqual(
+            [(cambio.incidencia_id, cambio.estado_anterior, cambio.estado_nuevo, cambio.comentario, cambio.usuario_id)
+             for cambio in cambios],
+            [(incidencia.id, None, incidencia.estado, COMENTARIO_IMPORTACION, self.admin.id) for incidencia in incidencias]
+        )
+        self.assertEqual([cambio.fecha for cambio in cambios[:2]], [CREADA, CREADA])
+        self.assertEqual(contadores.reconciliar(reparar=False), [])
+
+    def test_importar_con_bulk_create(self):
+        self.importar(usar_copy=False)
+        self.assertFilasImportadas()
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY solo existe en PostgreSQL')
+    def test_importar_con_copy(self):
+        self.importar(usar_copy=True)
+        self.assertFilasImportadas()
+
+        # Los ids salen de la secuencia: las altas posteriores no chocan con los importados
+        nueva = Incidencia.objects.create(
+            tipo_incidencia='otro', descripcion='Después de importar', prioridad='baja', ubicacion='Aula 9',
+            usuario_creador=self.admin
+        )
+        self.assertGreater(nueva.id, Incidencia.objects.exclude(id=nueva.id).order_by('-id').values_list('id', flat=True)[0])
+
+    def test_valor_copy(self):
+        self.assertEqual(_valor_copy(None), '\\N')
+        self.assertEqual(_valor_copy(True), 't')
+        self.assertEqual(_valor_copy(False), 'f')
+        self.assertEqual(_valor_copy(CREADA), '2024-03-01T09:30:15.123456+00:00')
+        self.assertEqual(_valor_copy('a\tb\nc\r\\N'), 'a\\tb\\nc\\r\\\\N')
@@ -0,0 +1,134 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from incidencias import imagenes
+from incidencias.models import Incidencia
+
+from .datos import crear_usuarios, imagen_png, limpiar_caches, media_temporal
+
+
+class MediaProtegidaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+
+    def setUp(self):
+        limpiar_caches()
+        media_temporal(self)
+        self.propia = self.incidencia_con_imagen(self.trabajadores[0], (255, 0, 0))
+        self.ajena = self.incidencia_con_imagen(self.trabajadores[1], (0, 255, 0))
+        self.reporte = imagenes.almacenamiento().save('reportes/reporte.csv', ContentFile(b'id,estado\n1,pendiente\n'))
+
+    def incidencia_con_imagen(self, usuario, color):
+        nombre = imagenes.guardar_imagen(imagen_png(color=color))
+        imagenes.generar_variantes(nombre)
+        return Incidencia.objects.create(
+            tipo_incidencia='hardware', descripcion='Con foto', prioridad='media', ubicacion='Aula 1',
+            usuario_creador=usuario, imagen=nombre
+        )
+
+    def get(self, usuario, nombre, **cabeceras):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client.get(f'/media/{nombre}', headers=cabeceras)
+
+    def contenido(self, nombre):
+        with imagenes.almacenamiento().open(nombre, 'rb') as archivo:
+            return archivo.read()
+
+    def variante(self, incidencia, variante='miniatura'):
+        return imagenes.nombre_variante(incidencia.imagen.name, variante)
+
+    # ==================== Permisos ====================
+
+    def test_trabajador_ve_sus_imagenes(self):
+        trabajador = self.trabajadores[0]
+        for nombre in (self.propia.imagen.name, self.variante(self.propia), self.variante(self.propia, 'vista_previa')):
+            with self.subTest(nombre=nombre):
+                response = self.get(trabajador, nombre)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b''.join(response.streaming_content), self.contenido(nombre))
+                self.assertIn('private', response['Cache-Control'])
+                self.assertIn('Authorization', response['Vary'])
+
+    def test_trabajador_no_ve_archivos_ajenos(self):
+        trabajador = self.trabajadores[0]
+        carpeta = self.propia.imagen.name.split('/')[1]
+        for nombre in (
+            self.ajena.imagen.name,
+            self.variante(self.ajena),
+            self.reporte,
+            f'{imagenes.CARPETA}/{carpeta}/../../{self.reporte}',
+            f'{imagenes.CARPETA}/../{self.reporte}',
+            f'{imagenes.CARPETA}/no-existe.png',
+        ):
+            with self.subTest(nombre=nombre):
+                response = self.get(trabajador, nombre)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()['message'], 'Archivo no encontrado')
+
+    def test_rutas_fuera_de_media(self):
+        for nombre in ('../settings.py', f'{imagenes.CARPETA}/../../settings.py', '%2e%2e/settings.py'):
+            with self.subTest(nombre=nombre):
+                self.assertEqual(self.get(self.admin, nombre).status_code, 404)
+
+    def test_administrador_ve_todo(self):
+        for nombre in (self.ajena.imagen.name, self.variante(self.ajena), self.reporte):
+            with self.subTest(nombre=nombre):
+                self.assertEqual(self.get(self.admin, nombre).status_code, 200)
+
+    def test_variante_pendiente_entrega_la_original(self):
+        imagenes.almacenamiento().delete(self.variante(self.propia))
+        response = self.get(self.trabajadores[0], self.variante(self.propia))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.contenido(self.propia.imagen.name))
+
+    def test_sin_autenticar(self):
+        self.assertEqual(APIClient().get(f'/media/{self.propia.imagen.name}').status_code, 401)
+
+    # ==================== Range y GET condicional ====================
+
+    def test_rango(self):
+        nombre = self.propia.imagen.name
+        contenido = self.contenido(nombre)
+        tamano = len(contenido)
+
+        response = self.get(self.admin, nombre, Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{tamano}')
+        self.assertEqual(b''.join(response.streaming_content), contenido[10:20])
+
+        response = self.get(self.admin, nombre, Range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), contenido[-5:])
+
+        response = self.get(self.admin, nombre, Range=f'bytes={tamano}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{tamano}')
+
+        # Un If-Range que ya no coincide devuelve el archivo entero
+        response = self.get(self.admin, nombre, Range='bytes=0-9', **{'If-Range': '"otro"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), contenido)
+
+    def test_no_modificado(self):
+        nombre = self.propia.imagen.name
+        etag = self.get(self.trabajadores[0], nombre)['ETag']
+        response = self.get(self.trabajadores[0], nombre, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        # El 304 no revela archivos ajenos
+        response = self.get(self.trabajadores[1], nombre, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_PROTEGIDA={'MODO': 'x-accel', 'PREFIJO_INTERNO': '/media-protegida/'})
+    def test_modo_x_accel(self):
+        nombre = self.propia.imagen.name
+        response = self.get(self.trabajadores[0], nombre)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/media-protegida/{nombre}')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.get(self.trabajadores[1], nombre).status_code, 404)
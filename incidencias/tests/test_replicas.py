@@ -0,0 +1,122 @@
+"""Enrutado de lecturas a la réplica (incidencias_project.replicas).
+
+Necesita el alias 'replica' en DATABASES, que en las pruebas es un espejo del
+primario (TEST['MIRROR']); basta con definir DB_REPLICA_HOST, por ejemplo
+DB_REPLICA_HOST=localhost python manage.py test incidencias.tests.test_replicas.
+Se usa TransactionTestCase porque el router no lee de la réplica dentro de una
+transacción, y TestCase envuelve cada test en una.
+"""
+import time
+from unittest import mock, skipUnless
+
+from django.contrib.sessions.models import Session
+from django.db import connections, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from incidencias.models import Incidencia
+from incidencias_project import replicas
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+# GET de cada nombre de ruta de REPLICAS['RUTAS']
+URLS_REPLICA = {
+    'incidencias:incidencia-list-create': '/api/incidencias/',
+    'incidencias:usuario-list-create': '/api/usuarios/',
+    'incidencias:estadisticas': '/api/estadisticas/',
+    'incidencias:reporte-incidencias': '/api/reportes/?format=csv',
+    'incidencias:resumen-reporte': '/api/reportes/resumen/',
+    'incidencias:tendencias': '/api/estadisticas/tendencias/',
+}
+
+
+@skipUnless(replicas.replica_configurada(), 'Sin réplica en DATABASES (DB_REPLICA_HOST)')
+class ReplicasTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        limpiar_caches()
+        self.addCleanup(limpiar_caches)
+        self.addCleanup(replicas.usar_replica, False)
+        self.admin, self.trabajadores = crear_usuarios()
+        self.incidencias = crear_incidencias(self.admin, self.trabajadores, total=6, cambios=1, comentarios=1)
+        self.admin_client = self.cliente(self.admin)
+
+    def cliente(self, usuario):
+        token, _ = Token.objects.get_or_create(user=usuario)
+        return APIClient(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def get(self, cliente, url):
+        """Petición GET; devuelve las consultas de cada alias sin contar las del token"""
+        with CaptureQueriesContext(connections['default']) as primario, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = cliente.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        # Bajo WSGI el contexto del hilo sobrevive a la petición
+        replicas.usar_replica(False)
+        self.assertEqual(response.status_code, 200, url)
+        consultas_primario = [
+            consulta['sql'] for consulta in primario.captured_queries if Token._meta.db_table not in consulta['sql']
+        ]
+        return consultas_primario, [consulta['sql'] for consulta in replica.captured_queries]
+
+    def assertReplica(self, cliente, url):
+        primario, replica = self.get(cliente, url)
+        self.assertTrue(replica, url)
+        self.assertEqual(primario, [], url)
+
+    def assertPrimario(self, cliente, url):
+        primario, replica = self.get(cliente, url)
+        self.assertTrue(primario, url)
+        self.assertEqual(replica, [], url)
+
+    def test_rutas_configuradas_leen_de_la_replica(self):
+        self.assertEqual(set(URLS_REPLICA), set(replicas.configuracion()['RUTAS']))
+        for url in URLS_REPLICA.values():
+            with self.subTest(url=url):
+                self.assertReplica(self.admin_client, url)
+
+    def test_otras_rutas_y_sincronizacion_leen_del_primario(self):
+        self.assertPrimario(self.admin_client, f'/api/incidencias/{self.incidencias[0].id}/')
+        self.assertPrimario(self.admin_client, '/api/incidencias/?since=')
+
+    def test_escritura_fija_al_primario(self):
+        trabajador_client = self.cliente(self.trabajadores[0])
+        response = self.admin_client.post(
+            f'/api/incidencias/{self.incidencias[0].id}/cambiar-estado/', {'estado': 'resuelto'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        # Quien ha escrito lee del primario; los demás clientes siguen en la réplica
+        self.assertPrimario(self.admin_client, '/api/incidencias/')
+        self.assertReplica(trabajador_client, '/api/incidencias/')
+
+        # Pasados FIJACION_SEGUNDOS vuelve a la réplica
+        despues = time.time() + replicas.configuracion()['FIJACION_SEGUNDOS'] + 1
+        with mock.patch('django.core.cache.backends.locmem.time') as reloj:
+            reloj.time.return_value = despues
+            self.assertReplica(self.admin_client, '/api/incidencias/')
+
+    def test_escritura_fallida_no_fija(self):
+        response = self.admin_client.post(
+            f'/api/incidencias/{self.incidencias[0].id}/cambiar-estado/', {'estado': 'no-existe'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertReplica(self.admin_client, '/api/incidencias/')
+
+    def test_router(self):
+        replicas.usar_replica(True)
+        alias = replicas.configuracion()['ALIAS']
+        self.assertEqual(Incidencia.objects.all().db, alias)
+        # Tokens y sesiones, y cualquier lectura dentro de una transacción, al primario
+        self.assertEqual(Token.objects.all().db, 'default')
+        self.assertEqual(Session.objects.all().db, 'default')
+        with transaction.atomic():
+            self.assertEqual(Incidencia.objects.all().db, 'default')
+        self.assertEqual(Incidencia.objects.create(
+            tipo_incidencia='red', descripcion='Nueva', prioridad='baja', ubicacion='Aula 1',
+            usuario_creador=self.trabajadores[0]
+        )._state.db, 'default')
@@ -0,0 +1,136 @@
+"""Paridad de la serialización rápida con IncidenciaSerializer + JSONRenderer.
+
+serializacion.py replica a mano la semántica de los campos de DRF (formato de
+fechas, URLs de ImageField, campos nulos, orden de las colecciones anidadas) y
+RapidoJSONRenderer es el renderer por defecto: cualquier diferencia cambiaría
+en silencio todas las respuestas. Se comparan los bytes finales.
+"""
+import unittest
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from incidencias import renderers
+from incidencias.models import CambioEstado, ComentarioAdmin, Incidencia
+from incidencias.renderers import RapidoJSONRenderer
+from incidencias.serializacion import serializar_incidencias, valores_incidencias
+from incidencias.serializers import IncidenciaSerializer
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+TODOS = ('historial_cambios', 'comentarios_admin')
+
+
+class ParidadSerializacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.admin.nombre_completo = 'Ana Ñúñez "la admin"  '
+        cls.admin.save()
+        incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=40)
+
+        # Casos límite: textos con comillas, controles y separadores de línea,
+        # imagen con espacios, fecha de resolución en UTC e historial sin usuario
+        especial = incidencias[0]
+        especial.descripcion = 'Ñandú "roto" \\ \x01 \t \u2028 fin \U0001F600'
+        especial.ubicacion = ''
+        especial.imagen = 'incidencias/foto con espacios ñ.jpg'
+        especial.save()
+        Incidencia.objects.filter(pk=especial.pk).update(
+            fecha_resolucion=datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        )
+        Incidencia.objects.filter(pk=incidencias[1].pk).update(imagen='')
+        CambioEstado.objects.create(incidencia=especial, estado_nuevo='resuelto', comentario='', usuario=None)
+        ComentarioAdmin.objects.create(incidencia=especial, mensaje='Sin\nautor', usuario=None, es_visible=False)
+
+    def setUp(self):
+        limpiar_caches()
+
+    def peticion(self, url='/api/incidencias/'):
+        return Request(APIRequestFactory().get(url))
+
+    def renderizar(self, campos, request=None):
+        """Bytes de la ruta original y de la rápida para las mismas incidencias"""
+        queryset = Incidencia.objects.order_by('-fecha_creacion', '-id')
+        contexto = {'campos': campos}
+        if request is not None:
+            contexto['request'] = request
+        original = IncidenciaSerializer(
+            IncidenciaSerializer.optimizar_queryset(queryset, campos), many=True, context=contexto
+        ).data
+        rapida = serializar_incidencias(valores_incidencias(queryset, campos), campos, request)
+        return JSONRenderer().render(original), RapidoJSONRenderer().render(rapida)
+
+    def assertParidad(self, campos, request=None):
+        original, rapida = self.renderizar(campos, request)
+        self.assertEqual(rapida, original)
+        return original
+
+    def variantes(self):
+        completos = IncidenciaSerializer.campos_activos()
+        compactos = completos - set(TODOS)
+        return {
+            'completa': completos,
+            'compacta': compactos,
+            'solo_historial': compactos | {'historial_cambios'},
+            'campos_minimos': {'id', 'estado', 'fecha_resolucion'},
+            'imagenes': {'id', 'imagen', 'imagen_miniatura', 'imagen_vista_previa'},
+            'creador': {'id', 'usuario_creador_nombre', 'comentarios_admin'},
+        }
+
+    def comprobar_variantes(self):
+        for nombre, campos in self.variantes().items():
+            for request in (None, self.peticion()):
+                with self.subTest(variante=nombre, request=request is not None):
+                    self.assertParidad(campos, request)
+
+    # ==================== Serializadores ====================
+
+    @unittest.skipIf(renderers.orjson is None, 'orjson no está instalado')
+    def test_paridad_con_orjson(self):
+        self.comprobar_variantes()
+
+    def test_paridad_sin_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.comprobar_variantes()
+
+    def test_paridad_en_utc(self):
+        # En UTC DRF escribe el sufijo 'Z' en lugar de '+00:00'
+        with timezone.override('UTC'):
+            self.comprobar_variantes()
+
+    @override_settings(REST_FRAMEWORK={'DATETIME_FORMAT': '%d/%m/%Y %H:%M'})
+    def test_paridad_formato_de_fecha_propio(self):
+        self.assertParidad(IncidenciaSerializer.campos_activos(), self.peticion())
+
+    def test_paridad_sin_incidencias(self):
+        Incidencia.objects.all().delete()
+        self.assertEqual(self.assertParidad(IncidenciaSerializer.campos_activos()), b'[]')
+
+    def test_orden_de_colecciones_anidadas(self):
+        original = self.assertParidad({'id', 'historial_cambios', 'comentarios_admin'})
+        self.assertIn(b'"usuario_nombre"', original)
+
+    # ==================== Respuesta del listado ====================
+
+    def test_listado_igual_que_el_serializer(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.admin)
+        url = '/api/incidencias/?page_size=100&paginacion=cursor&expand=historial_cambios,comentarios_admin'
+        response = cliente.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        request = response.wsgi_request
+        campos = IncidenciaSerializer.campos_activos(self.peticion(url), expandir_por_defecto=False)
+        queryset = IncidenciaSerializer.optimizar_queryset(Incidencia.objects.order_by('-fecha_creacion', '-id'), campos)
+        esperado = IncidenciaSerializer(queryset, many=True, context={'campos': campos, 'request': request}).data
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render({'next': None, 'previous': None, 'results': esperado})
+        )
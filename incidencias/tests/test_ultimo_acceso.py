@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from incidencias.ultimo_acceso import BufferUltimoAcceso
+from usuarios.models import Usuario
+
+from .datos import crear_usuarios
+
+
+class VaciadoUltimoAccesoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+
+    def ultimo_acceso(self, usuario):
+        return Usuario.objects.values_list('ultimo_acceso', flat=True).get(pk=usuario.pk)
+
+    def test_vaciado_tardio_no_retrasa_el_acceso(self):
+        ahora = timezone.now()
+        reciente, antiguo, nuevo = self.trabajadores
+        Usuario.objects.filter(pk=reciente.pk).update(ultimo_acceso=ahora)
+        Usuario.objects.filter(pk=antiguo.pk).update(ultimo_acceso=ahora - timedelta(hours=1))
+        Usuario.objects.filter(pk=nuevo.pk).update(ultimo_acceso=None)
+
+        # Un worker con el intervalo en 0 escribe en el momento, como un vaciado
+        buffer = BufferUltimoAcceso(0)
+        for usuario in (reciente, antiguo, nuevo):
+            buffer.registrar(usuario.pk, ahora - timedelta(minutes=5))
+
+        self.assertEqual(self.ultimo_acceso(reciente), ahora)
+        self.assertEqual(self.ultimo_acceso(antiguo), ahora - timedelta(minutes=5))
+        self.assertEqual(self.ultimo_acceso(nuevo), ahora - timedelta(minutes=5))
+        self.assertIsNone(self.ultimo_acceso(self.admin))
@@ -0,0 +1,131 @@
+"""Las vistas asíncronas de urls_asgi responden lo mismo que las vistas DRF síncronas.
+
+vistas_async reimplementa lo que hace APIView (autenticación, negociación,
+excepciones, paginación y ETag): cada petición se hace con el Client contra
+incidencias_project.urls y con el AsyncClient contra urls_asgi, y se comparan
+estado, cabeceras y cuerpo. Es un TransactionTestCase porque el manejador
+ASGI ejecuta las consultas en otro hilo, con otra conexión, que no vería los
+datos de la transacción de un TestCase.
+"""
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client, TransactionTestCase, override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+
+from incidencias.authentication import cache_tokens
+
+from .datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+URLS_ASGI = 'incidencias_project.urls_asgi'
+
+
+class ParidadVistasAsincronasTests(TransactionTestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.addCleanup(limpiar_caches)
+        self.admin, self.trabajadores = crear_usuarios()
+        self.incidencias = crear_incidencias(self.admin, self.trabajadores, total=45)
+        self.token_admin = Token.objects.create(user=self.admin).key
+        self.token_trabajador = Token.objects.create(user=self.trabajadores[0]).key
+
+    def cabeceras(self, token, extra=None):
+        return {**({'Authorization': f'Token {token}'} if token else {}), **(extra or {})}
+
+    def respuesta_sincrona(self, url, token, extra=None):
+        response = Client(headers=self.cabeceras(token, extra)).get(url)
+        cuerpo = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, dict(response.items()), cuerpo
+
+    def respuesta_asincrona(self, url, token, extra=None):
+        async def pedir():
+            response = await AsyncClient().get(url, headers=self.cabeceras(token, extra))
+            if response.streaming:
+                return response, b''.join([parte async for parte in response.streaming_content])
+            return response, response.content
+
+        with override_settings(ROOT_URLCONF=URLS_ASGI):
+            response, cuerpo = async_to_sync(pedir)()
+        return response.status_code, dict(response.items()), cuerpo
+
+    def assertMismaRespuesta(self, url, token, extra=None):
+        sincrona = self.respuesta_sincrona(url, token, extra)
+        asincrona = self.respuesta_asincrona(url, token, extra)
+        self.assertEqual(asincrona, sincrona)
+        return sincrona
+
+    def comprobar(self, urls, token):
+        for url, estado in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.assertMismaRespuesta(url, token)[0], estado)
+
+    def test_vistas_asincronas_en_urls_asgi(self):
+        with override_settings(ROOT_URLCONF=URLS_ASGI):
+            for url in ('/api/incidencias/', f'/api/incidencias/{self.incidencias[0].id}/', '/api/estadisticas/',
+                        '/api/reportes/'):
+                self.assertEqual(resolve(url).func.__module__, 'incidencias.vistas_async')
+
+    def test_administrador(self):
+        incidencia = self.incidencias[0]
+        self.comprobar([
+            ('/api/incidencias/', 200),
+            ('/api/incidencias/?page=2', 200),
+            ('/api/incidencias/?page=last', 200),
+            ('/api/incidencias/?page=9', 404),
+            ('/api/incidencias/?fields=id,estado,usuario_creador_nombre', 200),
+            ('/api/incidencias/?expand=historial_cambios,comentarios_admin&estado=pendiente', 200),
+            ('/api/incidencias/?q=prueba', 200),
+            (f'/api/incidencias/{incidencia.id}/', 200),
+            (f'/api/incidencias/{incidencia.id}/?fields=id,comentarios_admin', 200),
+            ('/api/incidencias/999999/', 404),
+            ('/api/incidencias/abc/', 404),
+            ('/api/estadisticas/', 200),
+            ('/api/reportes/', 200),
+            ('/api/reportes/?estado=pendiente&q=prueba', 200),
+            ('/api/reportes/?format=csv', 200),
+            ('/api/reportes/?format=ndjson', 200),
+        ], self.token_admin)
+
+    def test_trabajador(self):
+        propia = self.incidencias[0]
+        ajena = self.incidencias[1]
+        self.assertEqual(propia.usuario_creador_id, self.trabajadores[0].id)
+        self.comprobar([
+            ('/api/incidencias/', 200),
+            ('/api/incidencias/?fields=id,estado', 200),
+            ('/api/incidencias/?q=prueba', 200),
+            (f'/api/incidencias/{propia.id}/', 200),
+            (f'/api/incidencias/{ajena.id}/', 404),
+            ('/api/estadisticas/', 200),
+            ('/api/reportes/', 403),
+            ('/api/reportes/?format=csv', 403),
+        ], self.token_trabajador)
+
+    def test_no_modificada(self):
+        for url in ('/api/incidencias/?page=2', f'/api/incidencias/{self.incidencias[0].id}/', '/api/estadisticas/'):
+            with self.subTest(url=url):
+                etag = self.respuesta_sincrona(url, self.token_admin)[1]['ETag']
+                respuesta = self.assertMismaRespuesta(url, self.token_admin, {'If-None-Match': etag})
+                self.assertEqual(respuesta[0], 304)
+
+    # ==================== Autenticación ====================
+
+    def test_sin_credenciales_y_token_invalido(self):
+        self.comprobar([('/api/incidencias/', 401), ('/api/estadisticas/', 401)], None)
+        self.comprobar([('/api/incidencias/', 401), ('/api/reportes/', 401)], 'no-existe')
+
+    def test_token_revocado(self):
+        # Ambas rutas dejan el token en la caché del proceso
+        self.assertMismaRespuesta('/api/incidencias/', self.token_trabajador)
+        entrada = cache_tokens.obtener(self.token_trabajador)
+
+        response = Client(headers=self.cabeceras(self.token_trabajador)).post('/api/auth/logout/')
+        self.assertEqual(response.status_code, 200)
+
+        # Otro proceso conserva la entrada leída antes del logout
+        respuestas = []
+        for respuesta in (self.respuesta_sincrona, self.respuesta_asincrona):
+            cache_tokens.guardar(self.token_trabajador, *entrada)
+            respuestas.append(respuesta('/api/incidencias/', self.token_trabajador))
+        self.assertEqual(respuestas[1], respuestas[0])
+        self.assertEqual(respuestas[0][0], 401)
@@ -0,0 +1,166 @@
+"""Escritura diferida (write-behind) de Usuario.ultimo_acceso.
+
+`login_view` registra el acceso en un buffer en memoria que conserva solo la
+fecha más reciente por usuario. Un hilo en segundo plano vacía el buffer cada
+ULTIMO_ACCESO_INTERVALO_FLUSH segundos con un único UPDATE por bloque de
+usuarios. El buffer también se vacía al terminar el proceso (atexit), de modo
+que un apagado ordenado del worker no pierde accesos. Con un intervalo de 0
+cada acceso se escribe en el momento.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router
+from django.db.models import Case, DateTimeField, F, Q, Value, When
+
+from usuarios.models import Usuario
+
+logger = logging.getLogger(__name__)
+
+# Usuarios actualizados por sentencia
+TAMANO_BLOQUE = 1000
+
+
+class BufferUltimoAcceso:
+    """Agrupa los últimos accesos por usuario y los escribe en bloque"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._pendientes = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = os.getpid()
+        self.registrados = 0
+        self.vaciados = 0
+        self.filas_escritas = 0
+        self.errores = 0
+        self.duracion_ultimo_vaciado = None
+
+    def registrar(self, usuario_id, fecha):
+        if self.intervalo <= 0:
+            _escribir({usuario_id: fecha})
+            with self._lock:
+                self.registrados += 1
+                self.filas_escritas += 1
+            return
+
+        self._comprobar_proceso()
+        with self._lock:
+            anterior = self._pendientes.get(usuario_id)
+            if anterior is None or anterior < fecha:
+                self._pendientes[usuario_id] = fecha
+            self.registrados += 1
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name='ultimo-acceso', daemon=True)
+                self._hilo.start()
+
+    def vaciar(self):
+        """Escribe los accesos pendientes; si falla, los devuelve al buffer"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        if not pendientes:
+            return 0
+
+        inicio = time.monotonic()
+        try:
+            _escribir(pendientes)
+        except Exception:
+            logger.exception('Error escribiendo ultimo_acceso de %s usuarios', len(pendientes))
+            with self._lock:
+                self.errores += 1
+                for usuario_id, fecha in pendientes.items():
+                    actual = self._pendientes.get(usuario_id)
+                    if actual is None or actual < fecha:
+                        self._pendientes[usuario_id] = fecha
+            return 0
+
+        with self._lock:
+            self.vaciados += 1
+            self.filas_escritas += len(pendientes)
+            self.duracion_ultimo_vaciado = round(time.monotonic() - inicio, 4)
+        return len(pendientes)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'intervalo': self.intervalo,
+                'pendientes': len(self._pendientes),
+                'registrados': self.registrados,
+                'vaciados': self.vaciados,
+                'filas_escritas': self.filas_escritas,
+                'errores': self.errores,
+                'duracion_ultimo_vaciado': self.duracion_ultimo_vaciado,
+            }
+
+    def _bucle(self):
+        while True:
+            time.sleep(self.intervalo)
+            try:
+                self.vaciar()
+            finally:
+                # El hilo no atiende peticiones: cerrar aquí su conexión
+                close_old_connections()
+
+    def _comprobar_proceso(self):
+        # Tras un fork (p. ej. gunicorn --preload) el hilo del padre no existe en el hijo
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._pendientes = {}
+            self._hilo = None
+
+
+def _escribir(pendientes):
+    alias = router.db_for_write(Usuario)
+    connection = connections[alias]
+    items = sorted(pendientes.items())
+    for inicio in range(0, len(items), TAMANO_BLOQUE):
+        bloque = items[inicio:inicio + TAMANO_BLOQUE]
+        if connection.vendor == 'postgresql':
+            _escribir_postgresql(connection, bloque)
+        else:
+            # Igual que en PostgreSQL, un vaciado tardío nunca retrasa ultimo_acceso
+            Usuario.objects.using(alias).filter(pk__in=[usuario_id for usuario_id, _ in bloque]).update(
+                ultimo_acceso=Case(
+                    *[
+                        When(
+                            Q(pk=usuario_id) & (Q(ultimo_acceso__isnull=True) | Q(ultimo_acceso__lt=fecha)),
+                            then=Value(fecha)
+                        )
+                        for usuario_id, fecha in bloque
+                    ],
+                    default=F('ultimo_acceso'),
+                    output_field=DateTimeField()
+                )
+            )
+
+
+def _escribir_postgresql(connection, bloque):
+    quote = connection.ops.quote_name
+    tabla = quote(Usuario._meta.db_table)
+    pk = quote(Usuario._meta.pk.column)
+    columna = quote(Usuario._meta.get_field('ultimo_acceso').column)
+    tipo = 'timestamptz' if settings.USE_TZ else 'timestamp'
+    valores = ', '.join([f'(%s, %s::{tipo})'] * len(bloque))
+    parametros = [valor for fila in bloque for valor in fila]
+    sql = (
+        f'UPDATE {tabla} AS u SET {columna} = v.fecha '
+        f'FROM (VALUES {valores}) AS v(id, fecha) '
+        f'WHERE u.{pk} = v.id AND (u.{columna} IS NULL OR u.{columna} < v.fecha)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+
+
+buffer_ultimo_acceso = BufferUltimoAcceso(getattr(settings, 'ULTIMO_ACCESO_INTERVALO_FLUSH', 5))
+atexit.register(buffer_ultimo_acceso.vaciar)
+
+
+def registrar_acceso(usuario, fecha):
+    """Anota el último acceso de un usuario sin guardar el resto de la fila"""
+    usuario.ultimo_acceso = fecha
+    buffer_ultimo_acceso.registrar(usuario.pk, fecha)
@@ -10,19 +10,30 @@ urlpatterns = [
     
     # Incidencias
     path('incidencias/', views.IncidenciaListCreateView.as_view(), name='incidencia-list-create'),
+    path('incidencias/cambiar-estado-masivo/', views.cambiar_estado_masivo, name='cambiar-estado-masivo'),
+    path('incidencias/importar/', views.importar_incidencias_view, name='importar-incidencias'),
     path('incidencias/<str:pk>/', views.IncidenciaDetailView.as_view(), name='incidencia-detail'),
     path('incidencias/<str:incidencia_id>/cambiar-estado/', views.cambiar_estado_incidencia, name='cambiar-estado'),
     path('incidencias/<str:incidencia_id>/agregar-comentario/', views.agregar_comentario_admin, name='agregar-comentario'),
     
     # Estadísticas
     path('estadisticas/', views.estadisticas_dashboard, name='estadisticas'),
+    path('estadisticas/tendencias/', views.tendencias_incidencias, name='tendencias'),
     
     # Usuarios (solo administradores)
     path('usuarios/', views.UsuarioListCreateView.as_view(), name='usuario-list-create'),
+    path('usuarios/autocompletar/', views.autocompletar_usuarios, name='autocompletar-usuarios'),
     path('usuarios/<int:pk>/', views.UsuarioDetailView.as_view(), name='usuario-detail'),
     path('usuarios/<int:usuario_id>/cambiar-estado/', views.cambiar_estado_usuario, name='cambiar-estado-usuario'),
     path('usuarios/<int:usuario_id>/restablecer-password/', views.restablecer_password, name='restablecer-password'),
     
     # Reportes
     path('reportes/', views.reporte_incidencias, name='reporte-incidencias'),
+    path('reportes/resumen/', views.resumen_reporte, name='resumen-reporte'),
+    
+    # Eventos en tiempo real (Server-Sent Events)
+    path('eventos/', views.eventos_incidencias, name='eventos'),
+    
+    # Sistema (solo administradores)
+    path('sistema/metricas/', views.metricas_sistema, name='metricas-sistema'),
 ]
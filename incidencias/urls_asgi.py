@@ -0,0 +1,23 @@
+"""Rutas de la API para el despliegue ASGI (incidencias_project.asgi).
+
+Son las de incidencias.urls, con las lecturas más frecuentes atendidas por
+las vistas asíncronas de incidencias.vistas_async.
+"""
+from django.urls import path
+
+from . import urls, vistas_async
+
+app_name = urls.app_name
+
+VISTAS_ASINCRONAS = {
+    'incidencia-list-create': vistas_async.incidencias,
+    'incidencia-detail': vistas_async.detalle_incidencia,
+    'estadisticas': vistas_async.estadisticas,
+    'reporte-incidencias': vistas_async.reporte,
+    'eventos': vistas_async.eventos,
+}
+
+urlpatterns = [
+    path(str(ruta.pattern), VISTAS_ASINCRONAS[ruta.name], name=ruta.name) if ruta.name in VISTAS_ASINCRONAS else ruta
+    for ruta in urls.urlpatterns
+]
@@ -1,19 +1,42 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from django.contrib.auth import login, logout
-from django.db.models import Q, Count
+from django.core.files.storage import default_storage
+from django.http import Http404, StreamingHttpResponse
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
 from .models import Incidencia, CambioEstado, ComentarioAdmin
 from usuarios.models import Usuario
+from busqueda.buscador import buscar_incidencias, buscar_usuarios
+from estadisticas import contadores, resumen
+from sincronizacion import delta as sincronizacion
+from incidencias_project.replicas import enrutado
+from .authentication import cache_tokens, invalidar_token, invalidar_usuario
+from .ultimo_acceso import buffer_ultimo_acceso, registrar_acceso
+from .imagenes import SubidaImagenesMixin, pool_variantes
+from .importacion import FORMATOS_IMPORTACION, detectar_formato, importar_incidencias
+from .condicional import calcular_etag, con_etag, marcadores_incidencias, no_modificada
+from .eventos import canal_eventos, flujo_eventos, publicar_evento
+from .media import NegociacionArchivos, archivo_visible, servir_archivo
+from .exportacion import estadisticas_reporte, exportar_csv, exportar_ndjson, filtrar_incidencias_reporte
+from .pagination import IncidenciaCursorPagination
+from .renderers import CSVRenderer, EventStreamRenderer, NDJSONRenderer
+from .serializacion import serializar_incidencias, valores_incidencias
 from .serializers import (
     IncidenciaSerializer, IncidenciaCreateSerializer, LoginSerializer,
-    CambiarEstadoSerializer, AgregarComentarioSerializer, EstadisticasSerializer,
+    CambiarEstadoSerializer, CambiarEstadoMasivoSerializer, IdIncidenciaField,
+    AgregarComentarioSerializer, EstadisticasSerializer,
     UsuarioSerializer, UsuarioCreateSerializer
 )
 
+# Número de sugerencias por defecto y máximo del autocompletado de usuarios
+LIMITE_AUTOCOMPLETAR = 10
+MAX_LIMITE_AUTOCOMPLETAR = 25
+
 # ==================== AUTENTICACIÓN ====================
 
 @api_view(['POST'])
@@ -24,9 +47,8 @@ def login_view(request):
     if serializer.is_valid():
         user = serializer.validated_data['user']
         
-        # Actualizar último acceso
-        user.ultimo_acceso = timezone.now()
-        user.save()
+        # Actualizar último acceso (se escribe en bloque en segundo plano)
+        registrar_acceso(user, timezone.now())
         
         # Crear o obtener token
         token, created = Token.objects.get_or_create(user=user)
@@ -57,7 +79,9 @@ def logout_view(request):
     """Vista para el logout de usuarios"""
     try:
         # Eliminar el token del usuario
+        key = request.user.auth_token.key
         request.user.auth_token.delete()
+        invalidar_token(key)
         return Response({
             'success': True,
             'message': 'Logout exitoso'
@@ -70,7 +94,7 @@ def logout_view(request):
 
 # ==================== INCIDENCIAS ====================
 
-class IncidenciaListCreateView(generics.ListCreateAPIView):
+class IncidenciaListCreateView(SubidaImagenesMixin, generics.ListCreateAPIView):
     """Vista para listar y crear incidencias"""
     permission_classes = [permissions.IsAuthenticated]
     
@@ -79,6 +103,13 @@ class IncidenciaListCreateView(generics.ListCreateAPIView):
             return IncidenciaCreateSerializer
         return IncidenciaSerializer
     
+    @property
+    def pagination_class(self):
+        # Paginación por cursor opcional: ?paginacion=cursor
+        if self.request.query_params.get('paginacion') == 'cursor':
+            return IncidenciaCursorPagination
+        return api_settings.DEFAULT_PAGINATION_CLASS
+    
     def get_queryset(self):
         user = self.request.user
         queryset = Incidencia.objects.all().order_by('-fecha_creacion')
@@ -99,8 +130,71 @@ class IncidenciaListCreateView(generics.ListCreateAPIView):
         if prioridad:
             queryset = queryset.filter(prioridad=prioridad)
         
+        # Búsqueda de texto completo ordenada por relevancia (con ?paginacion=cursor
+        # el orden sigue siendo cronológico)
+        q = self.request.query_params.get('q', None)
+        if q:
+            queryset = buscar_incidencias(queryset, q)
+        
+        if self.request.method == 'GET':
+            queryset = IncidenciaSerializer.optimizar_queryset(
+                queryset, IncidenciaSerializer.campos_activos(self.request, expandir_por_defecto=False)
+            )
+        
         return queryset
     
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Representación compacta: historial y comentarios solo con ?expand=
+        context['expandir_por_defecto'] = False
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        # Serialización rápida a partir de .values(), con la misma salida que IncidenciaSerializer
+        campos = IncidenciaSerializer.campos_activos(request, expandir_por_defecto=False)
+        
+        # GET condicional: cualquier cambio en las incidencias visibles invalida todos los listados
+        etag = calcular_etag(request, *marcadores_incidencias(request.user))
+        response = no_modificada(request, etag)
+        if response is not None:
+            return response
+        
+        if 'since' in request.query_params:
+            return con_etag(self.sincronizar(request, campos), etag)
+        filas = valores_incidencias(self.filter_queryset(self.get_queryset()), campos)
+        
+        page = self.paginate_queryset(filas)
+        if page is not None:
+            return con_etag(self.get_paginated_response(serializar_incidencias(page, campos, request)), etag)
+        return con_etag(Response(serializar_incidencias(filas, campos, request)), etag)
+    
+    def sincronizar(self, request, campos):
+        """Sincronización incremental: ?since=<token> (vacío la primera vez).
+        
+        Devuelve las incidencias visibles creadas o modificadas desde el token,
+        los ids de las eliminadas y el token para la siguiente petición. Si `mas`
+        es true hay más cambios y se debe repetir la petición con el nuevo token.
+        """
+        limite = sincronizacion.configuracion()['MAX_RESULTADOS']
+        try:
+            limite = min(int(request.query_params['page_size']), limite)
+        except (KeyError, ValueError):
+            pass
+        
+        delta = sincronizacion.calcular_delta(
+            self.get_queryset(), request.user, request.query_params['since'], max(limite, 1)
+        )
+        filas = valores_incidencias(
+            self.get_queryset().filter(id__in=delta['ids']).order_by('fecha_actualizacion', 'id'), campos
+        )
+        return Response({
+            'results': serializar_incidencias(filas, campos, request),
+            'eliminadas': delta['eliminadas'],
+            'token': delta['token'],
+            'mas': delta['mas']
+        })
+    
+    @transaction.atomic
     def perform_create(self, serializer):
         # Asignar el usuario creador
         incidencia = serializer.save(usuario_creador=self.request.user)
@@ -113,8 +207,11 @@ class IncidenciaListCreateView(generics.ListCreateAPIView):
             comentario='Incidencia creada',
             usuario=self.request.user
         )
+        
+        contadores.registrar_creacion(incidencia)
+        publicar_evento('incidencia_creada', incidencia.id, incidencia.usuario_creador_id, estado=incidencia.estado)
 
-class IncidenciaDetailView(generics.RetrieveUpdateDestroyAPIView):
+class IncidenciaDetailView(SubidaImagenesMixin, generics.RetrieveUpdateDestroyAPIView):
     """Vista para ver, actualizar y eliminar una incidencia específica"""
     serializer_class = IncidenciaSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -127,7 +224,63 @@ class IncidenciaDetailView(generics.RetrieveUpdateDestroyAPIView):
         if user.tipo_usuario == 'trabajador':
             queryset = queryset.filter(usuario_creador=user)
         
-        return queryset
+        return IncidenciaSerializer.optimizar_queryset(
+            queryset, IncidenciaSerializer.campos_activos(self.request)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        # GET condicional con la fecha_actualizacion de la incidencia, antes de cargarla
+        try:
+            fecha_actualizacion = self.get_queryset().prefetch_related(None).filter(
+                pk=kwargs['pk']
+            ).values_list('fecha_actualizacion', flat=True).first()
+        except (TypeError, ValueError):
+            fecha_actualizacion = None
+        if fecha_actualizacion is None:
+            return super().retrieve(request, *args, **kwargs)
+        
+        etag = calcular_etag(request, kwargs['pk'], fecha_actualizacion)
+        response = no_modificada(request, etag)
+        if response is not None:
+            return response
+        return con_etag(super().retrieve(request, *args, **kwargs), etag)
+    
+    def bloquear(self, instance):
+        """Vuelve a leer la incidencia con FOR UPDATE dentro de la transacción.
+        
+        La instancia se cargó antes de abrirla: sin el bloqueo dos peticiones
+        simultáneas partirían del mismo estado y descuadrarían los contadores.
+        Devuelve False si otra petición ya la ha eliminado.
+        """
+        bloqueadas = Incidencia.objects.select_for_update(of=('self',)).select_related('usuario_creador')
+        try:
+            instance.refresh_from_db(from_queryset=bloqueadas)
+        except Incidencia.DoesNotExist:
+            return False
+        return True
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        if not self.bloquear(serializer.instance):
+            raise Http404
+        anterior = resumen.fila(serializer.instance)
+        estado_anterior = anterior['estado']
+        incidencia = serializer.save()
+        contadores.registrar_actualizacion(incidencia, anterior)
+        publicar_evento(
+            'incidencia_actualizada', incidencia.id, incidencia.usuario_creador_id,
+            estado=incidencia.estado, estado_anterior=estado_anterior
+        )
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Si otra petición la ha eliminado ya, sus contadores están descontados
+        if not self.bloquear(instance):
+            return
+        contadores.registrar_eliminacion(instance)
+        sincronizacion.registrar_eliminacion(instance)
+        publicar_evento('incidencia_eliminada', instance.id, instance.usuario_creador_id)
+        instance.delete()
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -141,7 +294,7 @@ def cambiar_estado_incidencia(request, incidencia_id):
     
     try:
         incidencia = Incidencia.objects.get(id=incidencia_id)
-    except Incidencia.DoesNotExist:
+    except (Incidencia.DoesNotExist, ValueError):
         return Response({
             'success': False,
             'message': 'Incidencia no encontrada'
@@ -149,24 +302,43 @@ def cambiar_estado_incidencia(request, incidencia_id):
     
     serializer = CambiarEstadoSerializer(data=request.data)
     if serializer.is_valid():
-        estado_anterior = incidencia.estado
         nuevo_estado = serializer.validated_data['estado']
         comentario = serializer.validated_data.get('comentario', f'Estado cambiado a {nuevo_estado}')
         
-        # Actualizar la incidencia
-        incidencia.estado = nuevo_estado
-        if nuevo_estado == 'resuelto':
-            incidencia.fecha_resolucion = timezone.now()
-        incidencia.save()
+        with transaction.atomic():
+            # Releer la incidencia bloqueada: el estado anterior tiene que ser el
+            # que hay en la base de datos, no el leído antes de la transacción
+            incidencia = Incidencia.objects.select_for_update().filter(id=incidencia.id).first()
+            if incidencia is None:
+                return Response({
+                    'success': False,
+                    'message': 'Incidencia no encontrada'
+                }, status=status.HTTP_404_NOT_FOUND)
+            estado_anterior = incidencia.estado
+            
+            # Actualizar la incidencia
+            incidencia.estado = nuevo_estado
+            if nuevo_estado == 'resuelto':
+                incidencia.fecha_resolucion = timezone.now()
+            incidencia.save()
+            
+            # Crear registro de cambio
+            CambioEstado.objects.create(
+                incidencia=incidencia,
+                estado_anterior=estado_anterior,
+                estado_nuevo=nuevo_estado,
+                comentario=comentario,
+                usuario=request.user
+            )
+            
+            contadores.registrar_cambio_estado(incidencia, estado_anterior)
+            publicar_evento(
+                'estado_cambiado', incidencia.id, incidencia.usuario_creador_id,
+                estado=nuevo_estado, estado_anterior=estado_anterior
+            )
         
-        # Crear registro de cambio
-        CambioEstado.objects.create(
-            incidencia=incidencia,
-            estado_anterior=estado_anterior,
-            estado_nuevo=nuevo_estado,
-            comentario=comentario,
-            usuario=request.user
-        )
+        # Recargar con las relaciones precargadas para serializar sin consultas N+1
+        incidencia = IncidenciaSerializer.optimizar_queryset(Incidencia.objects.all()).get(id=incidencia.id)
         
         return Response({
             'success': True,
@@ -180,6 +352,124 @@ def cambiar_estado_incidencia(request, incidencia_id):
         'errors': serializer.errors
     }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def cambiar_estado_masivo(request):
+    """Vista para cambiar el estado de varias incidencias en una sola transacción (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para realizar esta acción'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = CambiarEstadoMasivoSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'success': False,
+            'message': 'Datos inválidos',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    ids = serializer.validated_data['ids']
+    nuevo_estado = serializer.validated_data['estado']
+    comentario = serializer.validated_data.get('comentario', f'Estado cambiado a {nuevo_estado}')
+    
+    with transaction.atomic():
+        # Bloquear las filas en orden de id para evitar interbloqueos con otros cambios
+        filas = {
+            fila['id']: fila
+            for fila in Incidencia.objects.select_for_update().filter(
+                id__in=[incidencia_id for incidencia_id in ids if IdIncidenciaField.es_valido(incidencia_id)]
+            ).order_by('id').values(
+                'usuario_creador_id', *resumen.CAMPOS
+            )
+        }
+        
+        resultados = []
+        actualizables = []
+        for incidencia_id in ids:
+            fila = filas.get(incidencia_id)
+            if fila is None:
+                resultados.append({'id': incidencia_id, 'success': False, 'message': 'Incidencia no encontrada'})
+            elif fila['estado'] == nuevo_estado:
+                resultados.append({'id': incidencia_id, 'success': False, 'message': f'La incidencia ya está en estado {nuevo_estado}'})
+            else:
+                resultados.append({'id': incidencia_id, 'success': True, 'estado_anterior': fila['estado']})
+                actualizables.append(fila)
+        
+        if actualizables:
+            ahora = timezone.now()
+            cambios = {'estado': nuevo_estado, 'fecha_actualizacion': ahora}
+            if nuevo_estado == 'resuelto':
+                cambios['fecha_resolucion'] = ahora
+            Incidencia.objects.filter(id__in=[fila['id'] for fila in actualizables]).update(**cambios)
+            
+            CambioEstado.objects.bulk_create([
+                CambioEstado(
+                    incidencia_id=fila['id'],
+                    estado_anterior=fila['estado'],
+                    estado_nuevo=nuevo_estado,
+                    comentario=comentario,
+                    usuario=request.user
+                )
+                for fila in actualizables
+            ])
+            
+            contadores.registrar_cambios_estado(actualizables, nuevo_estado)
+            for fila in actualizables:
+                publicar_evento(
+                    'estado_cambiado', fila['id'], fila['usuario_creador_id'],
+                    estado=nuevo_estado, estado_anterior=fila['estado']
+                )
+    
+    return Response({
+        'success': True,
+        'message': f'{len(actualizables)} de {len(ids)} incidencias cambiadas a {nuevo_estado}',
+        'actualizadas': len(actualizables),
+        'fallidas': len(ids) - len(actualizables),
+        'resultados': resultados
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def importar_incidencias_view(request):
+    """Vista para importar incidencias en bloque desde un archivo CSV o NDJSON (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para realizar esta acción'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return Response({
+            'success': False,
+            'message': 'Debe enviar el archivo a importar en el campo "archivo"'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    formato = detectar_formato(archivo.name, request.data.get('formato'))
+    if formato not in FORMATOS_IMPORTACION:
+        return Response({
+            'success': False,
+            'message': f'Formato no soportado: {formato}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    resultado = importar_incidencias(archivo, formato, request.user)
+    if resultado['importadas']:
+        # Un único aviso agregado: los paneles recargan en lugar de recibir miles de eventos
+        publicar_evento('incidencias_importadas', None, None, solo_administradores=True, importadas=resultado['importadas'])
+    
+    archivo_errores = resultado.pop('archivo_errores')
+    resultado['url_errores'] = (
+        request.build_absolute_uri(default_storage.url(archivo_errores)) if archivo_errores else None
+    )
+    
+    return Response({
+        'success': True,
+        'message': f'{resultado["importadas"]} incidencias importadas, {resultado["errores"]} filas con errores',
+        'data': resultado
+    })
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def agregar_comentario_admin(request, incidencia_id):
@@ -192,7 +482,7 @@ def agregar_comentario_admin(request, incidencia_id):
     
     try:
         incidencia = Incidencia.objects.get(id=incidencia_id)
-    except Incidencia.DoesNotExist:
+    except (Incidencia.DoesNotExist, ValueError):
         return Response({
             'success': False,
             'message': 'Incidencia no encontrada'
@@ -200,12 +490,22 @@ def agregar_comentario_admin(request, incidencia_id):
     
     serializer = AgregarComentarioSerializer(data=request.data)
     if serializer.is_valid():
-        ComentarioAdmin.objects.create(
+        comentario = ComentarioAdmin.objects.create(
             incidencia=incidencia,
             mensaje=serializer.validated_data['mensaje'],
             usuario=request.user,
             es_visible=serializer.validated_data['es_visible']
         )
+        # Un comentario nuevo cuenta como cambio de la incidencia para la sincronización
+        Incidencia.objects.filter(id=incidencia.id).update(fecha_actualizacion=comentario.fecha)
+        # Los comentarios no visibles solo se notifican a los administradores
+        publicar_evento(
+            'comentario_agregado', incidencia.id, incidencia.usuario_creador_id,
+            solo_administradores=not comentario.es_visible, comentario=comentario.id
+        )
+        
+        # Recargar con las relaciones precargadas para serializar sin consultas N+1
+        incidencia = IncidenciaSerializer.optimizar_queryset(Incidencia.objects.all()).get(id=incidencia.id)
         
         return Response({
             'success': True,
@@ -227,24 +527,46 @@ def estadisticas_dashboard(request):
     """Vista para obtener estadísticas del dashboard"""
     user = request.user
     
-    # Base queryset según el tipo de usuario
+    # Contadores mantenidos incrementalmente según el tipo de usuario
     if user.tipo_usuario == 'trabajador':
-        queryset = Incidencia.objects.filter(usuario_creador=user)
+        stats = contadores.obtener_estadisticas(usuario=user)
     else:
-        queryset = Incidencia.objects.all()
+        stats = contadores.obtener_estadisticas()
     
-    # Contar por estados
-    stats = queryset.aggregate(
-        total=Count('id'),
-        pendiente=Count('id', filter=Q(estado='pendiente')),
-        en_proceso=Count('id', filter=Q(estado='en_proceso')),
-        resuelto=Count('id', filter=Q(estado='resuelto'))
-    )
+    # Los contadores son el propio validador
+    etag = calcular_etag(request, stats)
+    response = no_modificada(request, etag)
+    if response is not None:
+        return response
     
     serializer = EstadisticasSerializer(stats)
-    return Response({
+    return con_etag(Response({
         'success': True,
         'data': serializer.data
+    }), etag)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def tendencias_incidencias(request):
+    """Vista con la evolución por día, semana o mes de las incidencias, leída del cubo diario (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para ver las tendencias'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    filtros = resumen.leer_filtros(request.query_params)
+    try:
+        data = resumen.tendencia(filtros, request.query_params.get('agrupar', 'dia'))
+    except ValueError as error:
+        return Response({
+            'success': False,
+            'message': str(error)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'data': {**data, 'filtros_aplicados': filtros}
     })
 
 # ==================== USUARIOS (Solo Administradores) ====================
@@ -271,11 +593,7 @@ class UsuarioListCreateView(generics.ListCreateAPIView):
         estado = self.request.query_params.get('estado', None)
         
         if search:
-            queryset = queryset.filter(
-                Q(nombre_completo__icontains=search) | 
-                Q(email__icontains=search) |
-                Q(username__icontains=search)
-            )
+            queryset = buscar_usuarios(queryset, search)
         if tipo:
             queryset = queryset.filter(tipo_usuario=tipo)
         if estado:
@@ -292,6 +610,32 @@ class UsuarioListCreateView(generics.ListCreateAPIView):
         
         return super().create(request, *args, **kwargs)
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def autocompletar_usuarios(request):
+    """Vista ligera de sugerencias de usuarios: solo id y nombre (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para buscar usuarios'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    texto = request.query_params.get('q', '').strip()
+    try:
+        limite = int(request.query_params.get('limite', LIMITE_AUTOCOMPLETAR))
+    except ValueError:
+        limite = LIMITE_AUTOCOMPLETAR
+    limite = min(max(limite, 1), MAX_LIMITE_AUTOCOMPLETAR)
+    
+    if not texto:
+        return Response({'success': True, 'data': []})
+    
+    usuarios = buscar_usuarios(Usuario.objects.all(), texto, prefijo_si_corto=True).order_by('nombre_completo', 'id')
+    return Response({
+        'success': True,
+        'data': list(usuarios.values('id', 'nombre_completo')[:limite])
+    })
+
 class UsuarioDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Vista para ver, actualizar y eliminar usuarios (solo administradores)"""
     queryset = Usuario.objects.all()
@@ -302,6 +646,32 @@ class UsuarioDetailView(generics.RetrieveUpdateDestroyAPIView):
         if self.request.user.tipo_usuario != 'administrador':
             return Usuario.objects.none()
         return Usuario.objects.all()
+    
+    @transaction.atomic
+    def perform_update(self, serializer):
+        nombre_anterior = serializer.instance.nombre_completo
+        usuario = serializer.save()
+        if usuario.nombre_completo != nombre_anterior:
+            # El nombre aparece en las incidencias: que sincronización y ETags lo vean como cambio
+            sincronizacion.marcar_incidencias_de_usuario(usuario.pk)
+        invalidar_usuario(usuario.pk)
+    
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        usuario_id = instance.pk
+        # Su nombre desaparece del historial y comentarios de otras incidencias
+        sincronizacion.marcar_incidencias_de_usuario(usuario_id)
+        # Sus incidencias se borran en cascada: descontarlas de los contadores
+        # globales y del resumen diario y dejar constancia para la sincronización
+        incidencias = list(
+            Incidencia.objects.select_for_update().filter(usuario_creador_id=usuario_id).values(
+                'usuario_creador_id', *resumen.CAMPOS
+            )
+        )
+        contadores.registrar_eliminaciones(incidencias)
+        sincronizacion.registrar_eliminaciones(incidencias)
+        instance.delete()
+        invalidar_usuario(usuario_id)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -329,7 +699,10 @@ def cambiar_estado_usuario(request, usuario_id):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     usuario.estado = nuevo_estado
+    # Un usuario inactivo no puede autenticarse, tampoco con un token ya emitido
+    usuario.is_active = nuevo_estado == 'activo'
     usuario.save()
+    invalidar_usuario(usuario.id)
     
     return Response({
         'success': True,
@@ -359,6 +732,9 @@ def restablecer_password(request, usuario_id):
     nueva_password = f"temp{usuario.id}2024"
     usuario.set_password(nueva_password)
     usuario.save()
+    # Las sesiones abiertas con la contraseña anterior dejan de valer
+    Token.objects.filter(user=usuario).delete()
+    invalidar_usuario(usuario.id)
     
     return Response({
         'success': True,
@@ -370,69 +746,121 @@ def restablecer_password(request, usuario_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [CSVRenderer, NDJSONRenderer])
 def reporte_incidencias(request):
-    """Vista para generar reportes de incidencias"""
+    """Vista para generar reportes de incidencias (JSON, o CSV/NDJSON en streaming con ?format=)"""
     if request.user.tipo_usuario != 'administrador':
         return Response({
             'success': False,
             'message': 'No tienes permisos para generar reportes'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Obtener parámetros de filtro
-    fecha_desde = request.query_params.get('fecha_desde')
-    fecha_hasta = request.query_params.get('fecha_hasta')
-    estado = request.query_params.get('estado')
-    tipo = request.query_params.get('tipo')
-    prioridad = request.query_params.get('prioridad')
-    
-    queryset = Incidencia.objects.all()
-    
-    # Aplicar filtros
-    if fecha_desde:
-        try:
-            fecha_desde = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
-            queryset = queryset.filter(fecha_creacion__date__gte=fecha_desde)
-        except ValueError:
-            pass
-    
-    if fecha_hasta:
-        try:
-            fecha_hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
-            queryset = queryset.filter(fecha_creacion__date__lte=fecha_hasta)
-        except ValueError:
-            pass
+    queryset, filtros = filtrar_incidencias_reporte(request.query_params)
     
-    if estado and estado != 'todos':
-        queryset = queryset.filter(estado=estado)
+    # Exportación en streaming: memoria constante y primeros bytes inmediatos
+    formato = request.accepted_renderer.format
+    if formato in ('csv', 'ndjson'):
+        exportar = exportar_csv if formato == 'csv' else exportar_ndjson
+        response = StreamingHttpResponse(
+            exportar(queryset, filtros, request),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="reporte-incidencias.{formato}"'
+        return response
+    
+    # Serializar datos (admite ?fields= y ?expand=)
+    campos = IncidenciaSerializer.campos_activos(request)
+    incidencias = serializar_incidencias(
+        valores_incidencias(queryset.order_by('-fecha_creacion'), campos),
+        campos
+    )
     
-    if tipo and tipo != 'todos':
-        queryset = queryset.filter(tipo_incidencia=tipo)
+    # Estadísticas del reporte
+    stats = estadisticas_reporte(queryset)
     
-    if prioridad and prioridad != 'todas':
-        queryset = queryset.filter(prioridad=prioridad)
+    return Response({
+        'success': True,
+        'data': {
+            'incidencias': incidencias,
+            'estadisticas': stats,
+            'filtros_aplicados': filtros
+        }
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def resumen_reporte(request):
+    """Vista con las estadísticas del reporte leídas del cubo diario, sin recorrer las incidencias (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para generar reportes'
+        }, status=status.HTTP_403_FORBIDDEN)
     
-    # Serializar datos
-    incidencias = IncidenciaSerializer(queryset.order_by('-fecha_creacion'), many=True)
+    # Mismos filtros que reporte_incidencias salvo la búsqueda de texto (q)
+    filtros = resumen.leer_filtros(request.query_params)
     
-    # Estadísticas del reporte
-    stats = queryset.aggregate(
-        total=Count('id'),
-        pendiente=Count('id', filter=Q(estado='pendiente')),
-        en_proceso=Count('id', filter=Q(estado='en_proceso')),
-        resuelto=Count('id', filter=Q(estado='resuelto'))
+    return Response({
+        'success': True,
+        'data': {**resumen.resumen(filtros), 'filtros_aplicados': filtros}
+    })
+
+# ==================== EVENTOS ====================
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [EventStreamRenderer])
+def eventos_incidencias(request):
+    """Flujo Server-Sent Events con los cambios de las incidencias visibles para el usuario"""
+    # EventSource reenvía el id del último evento recibido al reconectar
+    ultimo_id = request.headers.get('Last-Event-ID') or request.query_params.get('ultimo_evento')
+    
+    response = StreamingHttpResponse(
+        flujo_eventos(request.user, ultimo_id),
+        content_type='text/event-stream'
     )
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que nginx acumule el flujo en su buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# ==================== MEDIA ====================
+
+class MediaProtegidaView(APIView):
+    """Vista que entrega los archivos de MEDIA comprobando que el usuario puede verlos"""
+    permission_classes = [permissions.IsAuthenticated]
+    content_negotiation_class = NegociacionArchivos
+    
+    def get(self, request, nombre):
+        archivo = archivo_visible(request.user, nombre)
+        if archivo is None:
+            # 404 también sin permisos: no revelar qué archivos existen
+            return Response({
+                'success': False,
+                'message': 'Archivo no encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return servir_archivo(request, archivo)
+
+# ==================== SISTEMA ====================
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def metricas_sistema(request):
+    """Vista con métricas internas del proceso (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para ver las métricas'
+        }, status=status.HTTP_403_FORBIDDEN)
     
     return Response({
         'success': True,
         'data': {
-            'incidencias': incidencias.data,
-            'estadisticas': stats,
-            'filtros_aplicados': {
-                'fecha_desde': fecha_desde,
-                'fecha_hasta': fecha_hasta,
-                'estado': estado,
-                'tipo': tipo,
-                'prioridad': prioridad
-            }
+            'cache_tokens': cache_tokens.metricas(),
+            'ultimo_acceso': buffer_ultimo_acceso.metricas(),
+            'eventos': canal_eventos.metricas(),
+            'variantes_imagenes': pool_variantes.metricas(),
+            'replicas': enrutado.metricas()
         }
     })
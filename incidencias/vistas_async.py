@@ -0,0 +1,291 @@
+"""Vistas asíncronas de las lecturas más frecuentes, para el despliegue ASGI.
+
+incidencias.urls_asgi atiende con estas vistas el listado y el detalle de
+incidencias, las estadísticas, el reporte y el flujo de eventos. Los demás
+métodos (y los modos de listado que no tienen versión asíncrona: cursor y
+?since=) se delegan en la vista DRF síncrona, que Django ejecuta en un hilo.
+
+DRF no admite vistas asíncronas, así que `asincrona` hace lo que haría
+APIView: autentica (CacheTokenAuthentication.aauthenticate o la sesión),
+negocia el formato, convierte las excepciones con el exception_handler de DRF
+y renderiza la respuesta sin salir del bucle de eventos. Las respuestas son
+las mismas que las de las vistas síncronas.
+
+El ORM asíncrono de Django sigue ejecutando cada consulta en un hilo: lo que
+se gana es que la petición no retiene ningún hilo mientras espera entre
+consultas ni mientras envía la respuesta a un cliente lento (reportes en
+streaming y eventos incluidos).
+"""
+import math
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import exception_handler
+
+from estadisticas import contadores
+
+from . import views
+from .authentication import CacheTokenAuthentication
+from .condicional import amarcadores_incidencias, calcular_etag, con_etag, no_modificada
+from .eventos import aflujo_eventos
+from .exportacion import aestadisticas_reporte, aexportar_csv, aexportar_ndjson, filtrar_incidencias_reporte
+from .models import Incidencia
+from .serializacion import aserializar_incidencias, valores_incidencias
+from .serializers import EstadisticasSerializer, IncidenciaSerializer
+
+_autenticacion_token = CacheTokenAuthentication()
+_negociacion = DefaultContentNegotiation()
+
+
+def asincrona(vista_sync, delegar=None):
+    """Convierte una función async en vista GET/HEAD con la autenticación y el renderizado de DRF.
+
+    Los demás métodos, y los GET para los que `delegar(request)` es cierto,
+    los atiende `vista_sync` (la vista DRF equivalente).
+    """
+    clase = vista_sync.cls
+    renderers = [renderer() for renderer in clase.renderer_classes]
+    instancia = clase()
+    # setup() añade head a las vistas con get, como en cada petición síncrona
+    instancia.setup(None)
+    permitidos = ', '.join(instancia.allowed_methods)
+
+    def decorador(funcion):
+        @csrf_exempt
+        @wraps(funcion)
+        async def vista(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (delegar is not None and delegar(request)):
+                return await sync_to_async(vista_sync)(request, *args, **kwargs)
+
+            peticion = Request(request)
+            try:
+                peticion.user, peticion.auth = await _autenticar(request)
+                peticion.accepted_renderer, peticion.accepted_media_type = _negociacion.select_renderer(
+                    peticion, renderers
+                )
+                response = await funcion(peticion, *args, **kwargs)
+            except Exception as exc:
+                response = _excepcion(peticion, exc)
+
+            if isinstance(response, Response):
+                response = _renderizar(peticion, response, renderers)
+            # Las mismas cabeceras que APIView.finalize_response añade a toda respuesta
+            response['Allow'] = permitidos
+            if len(renderers) > 1:
+                patch_vary_headers(response, ['Accept'])
+            return response
+        return vista
+    return decorador
+
+
+async def _autenticar(request):
+    """(usuario, token) como CacheTokenAuthentication + SessionAuthentication e IsAuthenticated"""
+    resultado = await _autenticacion_token.aauthenticate(request)
+    if resultado is not None:
+        return resultado
+    usuario = await request.auser()
+    if usuario.is_authenticated and usuario.is_active:
+        return usuario, None
+    raise exceptions.NotAuthenticated()
+
+
+def _excepcion(peticion, exc):
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        exc.auth_header = _autenticacion_token.authenticate_header(peticion)
+    response = exception_handler(exc, {'request': peticion, 'view': None, 'args': (), 'kwargs': {}})
+    if response is None:
+        raise exc
+    return response
+
+
+def _renderizar(peticion, response, renderers):
+    """Renderiza una Response de DRF aquí mismo; Django la renderizaría en un hilo"""
+    if not hasattr(peticion, 'accepted_renderer'):
+        # La negociación falló (406): el error se envía con el primer renderer
+        peticion.accepted_renderer, peticion.accepted_media_type = renderers[0], renderers[0].media_type
+    response.accepted_renderer = peticion.accepted_renderer
+    response.accepted_media_type = peticion.accepted_media_type
+    response.renderer_context = {'request': peticion, 'response': response, 'view': None}
+    response.render()
+
+    resultado = HttpResponse(response.content, status=response.status_code)
+    for cabecera, valor in response.items():
+        resultado[cabecera] = valor
+    if 'Content-Type' not in response:
+        del resultado['Content-Type']
+    return resultado
+
+
+async def _paginar(request, queryset):
+    """Equivalente asíncrono de PageNumberPagination: (filas de la página, dict de la respuesta sin results)"""
+    tamano = api_settings.PAGE_SIZE
+    total = await queryset.acount()
+    paginas = max(1, math.ceil(total / tamano))
+    numero = request.query_params.get(PageNumberPagination.page_query_param, 1)
+    if numero in PageNumberPagination.last_page_strings:
+        numero = paginas
+    try:
+        numero = int(numero)
+    except (TypeError, ValueError):
+        numero = 0
+    if not 1 <= numero <= paginas:
+        raise exceptions.NotFound(PageNumberPagination.invalid_page_message.format(
+            page_number=request.query_params.get(PageNumberPagination.page_query_param), message=''
+        ))
+
+    inicio = (numero - 1) * tamano
+    filas = [fila async for fila in queryset[inicio:inicio + tamano]]
+    url = request.build_absolute_uri()
+    anterior = None
+    if numero > 1:
+        anterior = (
+            remove_query_param(url, PageNumberPagination.page_query_param) if numero == 2
+            else replace_query_param(url, PageNumberPagination.page_query_param, numero - 1)
+        )
+    siguiente = replace_query_param(url, PageNumberPagination.page_query_param, numero + 1) if numero < paginas else None
+    return filas, {'count': total, 'next': siguiente, 'previous': anterior}
+
+
+# ==================== INCIDENCIAS ====================
+
+def _lista_sincrona(request):
+    # La paginación por cursor y la sincronización incremental solo existen en la vista síncrona
+    return request.GET.get('paginacion') == 'cursor' or 'since' in request.GET
+
+
+@asincrona(views.IncidenciaListCreateView.as_view(), delegar=_lista_sincrona)
+async def incidencias(request):
+    """Listado de incidencias (GET de IncidenciaListCreateView)"""
+    vista = views.IncidenciaListCreateView(request=request, args=(), kwargs={}, format_kwarg=None)
+    campos = IncidenciaSerializer.campos_activos(request, expandir_por_defecto=False)
+
+    etag = calcular_etag(request, *await amarcadores_incidencias(request.user))
+    response = no_modificada(request, etag)
+    if response is not None:
+        return response
+
+    if request.query_params.get('q'):
+        # Fuera de PostgreSQL la búsqueda consulta su índice en memoria al construir el queryset
+        queryset = await sync_to_async(vista.get_queryset)()
+    else:
+        queryset = vista.get_queryset()
+    filas, pagina = await _paginar(request, valores_incidencias(queryset, campos))
+    return con_etag(Response({**pagina, 'results': await aserializar_incidencias(filas, campos, request)}), etag)
+
+
+@asincrona(views.IncidenciaDetailView.as_view())
+async def detalle_incidencia(request, pk):
+    """Detalle de una incidencia (GET de IncidenciaDetailView)"""
+    vista = views.IncidenciaDetailView(request=request, args=(), kwargs={'pk': pk}, format_kwarg=None)
+    try:
+        queryset = vista.get_queryset().prefetch_related(None).filter(pk=pk)
+        fecha_actualizacion = await queryset.values_list('fecha_actualizacion', flat=True).afirst()
+    except (TypeError, ValueError):
+        raise exceptions.NotFound()
+    if fecha_actualizacion is None:
+        # El mismo mensaje que get_object_or_404 en la vista síncrona
+        raise Http404(f'No {Incidencia._meta.object_name} matches the given query.')
+
+    etag = calcular_etag(request, pk, fecha_actualizacion)
+    response = no_modificada(request, etag)
+    if response is not None:
+        return response
+
+    campos = IncidenciaSerializer.campos_activos(request)
+    datos = await aserializar_incidencias(valores_incidencias(queryset, campos), campos, request)
+    if not datos:
+        raise exceptions.NotFound()
+    return con_etag(Response(datos[0]), etag)
+
+
+# ==================== ESTADÍSTICAS ====================
+
+@asincrona(views.estadisticas_dashboard)
+async def estadisticas(request):
+    """Estadísticas del dashboard (estadisticas_dashboard)"""
+    user = request.user
+    if user.tipo_usuario == 'trabajador':
+        stats = await contadores.aobtener_estadisticas(usuario=user)
+    else:
+        stats = await contadores.aobtener_estadisticas()
+
+    etag = calcular_etag(request, stats)
+    response = no_modificada(request, etag)
+    if response is not None:
+        return response
+
+    serializer = EstadisticasSerializer(stats)
+    return con_etag(Response({
+        'success': True,
+        'data': serializer.data
+    }), etag)
+
+
+# ==================== REPORTES ====================
+
+@asincrona(views.reporte_incidencias)
+async def reporte(request):
+    """Reporte de incidencias (reporte_incidencias)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para generar reportes'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    if request.query_params.get('q'):
+        queryset, filtros = await sync_to_async(filtrar_incidencias_reporte)(request.query_params)
+    else:
+        queryset, filtros = filtrar_incidencias_reporte(request.query_params)
+
+    # Bajo ASGI un iterador síncrono se consumiría entero en memoria antes de enviarse
+    formato = request.accepted_renderer.format
+    if formato in ('csv', 'ndjson'):
+        exportar = aexportar_csv if formato == 'csv' else aexportar_ndjson
+        response = StreamingHttpResponse(
+            exportar(queryset, filtros, request),
+            content_type=request.accepted_renderer.media_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="reporte-incidencias.{formato}"'
+        return response
+
+    campos = IncidenciaSerializer.campos_activos(request)
+    incidencias = await aserializar_incidencias(
+        valores_incidencias(queryset.order_by('-fecha_creacion'), campos),
+        campos
+    )
+    stats = await aestadisticas_reporte(queryset)
+
+    return Response({
+        'success': True,
+        'data': {
+            'incidencias': incidencias,
+            'estadisticas': stats,
+            'filtros_aplicados': filtros
+        }
+    })
+
+
+# ==================== EVENTOS ====================
+
+@asincrona(views.eventos_incidencias)
+async def eventos(request):
+    """Flujo Server-Sent Events (eventos_incidencias) sin ocupar un hilo por conexión"""
+    ultimo_id = request.headers.get('Last-Event-ID') or request.query_params.get('ultimo_evento')
+
+    response = StreamingHttpResponse(
+        aflujo_eventos(request.user, ultimo_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
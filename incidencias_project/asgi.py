@@ -0,0 +1,29 @@
+"""
+Punto de entrada ASGI del proyecto (uvicorn, daphne, hypercorn o gunicorn con
+UvicornWorker), p. ej.:
+
+    uvicorn incidencias_project.asgi:application --workers 2
+
+Usa la URLconf incidencias_project.urls_asgi: el listado y detalle de
+incidencias, las estadísticas, los reportes y los eventos se atienden con
+vistas asíncronas (incidencias.vistas_async) y el resto con las vistas
+síncronas de siempre, que Django ejecuta en un hilo.
+
+Cada petición ASGI ejecuta el código síncrono en un hilo propio: una conexión
+persistente (CONN_MAX_AGE) quedaría abierta con el hilo, así que aquí se fija
+DB_CONN_MAX_AGE=0; para reutilizar conexiones, DB_POOL=True.
+
+Bajo ASGI conviene servir MEDIA con MEDIA_PROTEGIDA['MODO'] 'x-accel' o
+'x-sendfile': Django lee entero en memoria el FileResponse de un archivo
+antes de enviarlo por ASGI.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'incidencias_project.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'incidencias_project.urls_asgi')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+application = get_asgi_application()
@@ -0,0 +1,89 @@
+"""Medición por petición de SQL, serialización y renderizado.
+
+InstrumentacionMiddleware crea una Medicion para cada petición muestreada y la
+publica en una ContextVar. El código de la aplicación marca las fases que
+quiere medir con `medir('serializacion')`; si la petición no se está midiendo,
+`medir` no hace nada más que leer la ContextVar.
+"""
+import heapq
+from contextvars import ContextVar
+from time import perf_counter
+
+_medicion_actual = ContextVar('medicion_actual', default=None)
+
+
+class Medicion:
+    """Acumula los tiempos de una petición"""
+
+    def __init__(self, max_consultas_lentas=5):
+        self.inicio = perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.fases = {}
+        self._profundidad = {}
+        self._max_lentas = max_consultas_lentas
+        self._lentas = []
+
+    # Envoltorio para connection.execute_wrapper()
+    def __call__(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_sql += duracion
+            if self._max_lentas:
+                entrada = (duracion, self.consultas, sql)
+                if len(self._lentas) < self._max_lentas:
+                    heapq.heappush(self._lentas, entrada)
+                elif duracion > self._lentas[0][0]:
+                    heapq.heapreplace(self._lentas, entrada)
+
+    def entrar(self, fase):
+        profundidad = self._profundidad.get(fase, 0)
+        self._profundidad[fase] = profundidad + 1
+        # Solo se cronometra la llamada más externa de cada fase
+        return profundidad == 0
+
+    def salir(self, fase, duracion=None):
+        self._profundidad[fase] -= 1
+        if duracion is not None:
+            self.fases[fase] = self.fases.get(fase, 0.0) + duracion
+
+    def consultas_lentas(self):
+        return [
+            {'ms': round(duracion * 1000, 2), 'sql': sql[:500]}
+            for duracion, _, sql in sorted(self._lentas, reverse=True)
+        ]
+
+
+class medir:
+    """Context manager que suma la duración del bloque a la fase indicada de la petición en curso"""
+    __slots__ = ('fase', 'medicion', 'inicio')
+
+    def __init__(self, fase):
+        self.fase = fase
+
+    def __enter__(self):
+        self.medicion = _medicion_actual.get()
+        if self.medicion is not None:
+            self.inicio = perf_counter() if self.medicion.entrar(self.fase) else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.medicion is not None:
+            self.medicion.salir(self.fase, None if self.inicio is None else perf_counter() - self.inicio)
+        return False
+
+
+def medicion_actual():
+    return _medicion_actual.get()
+
+
+def activar(medicion):
+    return _medicion_actual.set(medicion)
+
+
+def desactivar(token):
+    _medicion_actual.reset(token)
@@ -0,0 +1,165 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+from . import replicas
+from .instrumentacion import Medicion, activar, desactivar, medicion_actual
+
+logger = logging.getLogger('incidencias_project.instrumentacion')
+
+CONFIGURACION_POR_DEFECTO = {
+    'ACTIVA': False,
+    'MUESTREO': 1.0,
+    'UMBRAL_LENTO_MS': 500,
+    'CONSULTAS_LENTAS': 5,
+    'SERVER_TIMING': True,
+}
+
+
+class InstrumentacionMiddleware:
+    """Mide consultas SQL, serialización y renderizado de cada petición.
+
+    Se activa con INSTRUMENTACION['ACTIVA']; desactivado, Django lo descarta al
+    arrancar (MiddlewareNotUsed) y no añade ningún coste. Las peticiones
+    muestreadas reciben una cabecera Server-Timing y una línea de log JSON; las
+    que superan UMBRAL_LENTO_MS se registran como WARNING con sus consultas más
+    lentas. En las respuestas en streaming solo se mide hasta que la vista
+    devuelve la respuesta, no la generación del contenido.
+
+    Bajo ASGI funciona en modo asíncrono: las consultas de una petición se
+    ejecutan en su propio hilo (ThreadSensitiveContext), así que es en las
+    conexiones de ese hilo donde se instala la medición.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        configuracion = {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'INSTRUMENTACION', {})}
+        if not configuracion['ACTIVA']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.muestreo = configuracion['MUESTREO']
+        self.umbral = configuracion['UMBRAL_LENTO_MS'] / 1000
+        self.consultas_lentas = configuracion['CONSULTAS_LENTAS']
+        self.server_timing = configuracion['SERVER_TIMING']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        medicion = Medicion(self.consultas_lentas)
+        token = activar(medicion)
+        try:
+            with ExitStack() as stack:
+                self.envolver_conexiones(stack, medicion)
+                response = self.get_response(request)
+        finally:
+            desactivar(token)
+
+        return self.finalizar(request, response, medicion)
+
+    async def __acall__(self, request):
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return await self.get_response(request)
+
+        medicion = Medicion(self.consultas_lentas)
+        token = activar(medicion)
+        stack = ExitStack()
+        try:
+            await sync_to_async(self.envolver_conexiones)(stack, medicion)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            desactivar(token)
+
+        return self.finalizar(request, response, medicion)
+
+    def envolver_conexiones(self, stack, medicion):
+        for connection in connections.all(initialized_only=False):
+            stack.enter_context(connection.execute_wrapper(medicion))
+
+    def finalizar(self, request, response, medicion):
+        total = perf_counter() - medicion.inicio
+        if self.server_timing:
+            response['Server-Timing'] = self.cabecera(medicion, total)
+        self.registrar(request, response, medicion, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Las Response de DRF se renderizan después de la vista: medir ese tramo aparte
+        medicion = medicion_actual()
+        if medicion is not None:
+            inicio = perf_counter()
+            medicion.entrar('render')
+
+            def fin_render(response):
+                medicion.salir('render', perf_counter() - inicio)
+
+            response.add_post_render_callback(fin_render)
+        return response
+
+    def cabecera(self, medicion, total):
+        metricas = [f'db;dur={medicion.tiempo_sql * 1000:.2f};desc="{medicion.consultas} consultas"']
+        for fase, abreviatura in (('serializacion', 'ser'), ('render', 'render')):
+            if fase in medicion.fases:
+                metricas.append(f'{abreviatura};dur={medicion.fases[fase] * 1000:.2f}')
+        metricas.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metricas)
+
+    def registrar(self, request, response, medicion, total):
+        lenta = total >= self.umbral
+        registro = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'usuario': getattr(getattr(request, 'user', None), 'pk', None),
+            'total_ms': round(total * 1000, 2),
+            'consultas': medicion.consultas,
+            'sql_ms': round(medicion.tiempo_sql * 1000, 2),
+            'serializacion_ms': round(medicion.fases.get('serializacion', 0) * 1000, 2),
+            'render_ms': round(medicion.fases.get('render', 0) * 1000, 2),
+            'lenta': lenta,
+        }
+        if lenta:
+            registro['consultas_lentas'] = medicion.consultas_lentas()
+            logger.warning(json.dumps(registro, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Decide si las lecturas de cada petición van a la réplica (ver incidencias_project.replicas).
+
+    Sin réplica en DATABASES, Django lo descarta al arrancar (MiddlewareNotUsed).
+    """
+
+    def __init__(self, get_response):
+        if not replicas.replica_configurada():
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        # Bajo WSGI el contexto del hilo sobrevive a la petición: decidir siempre de nuevo.
+        # No se restablece al terminar porque un reporte en streaming sigue leyendo después.
+        replicas.usar_replica(False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if replicas.puede_leer_replica(request):
+            replicas.usar_replica(True)
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            replicas.fijar_primario(request)
+        return response
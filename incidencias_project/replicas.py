@@ -0,0 +1,144 @@
+"""Lecturas en una réplica de solo lectura, con fijación al primario tras escribir.
+
+ReplicaMiddleware decide en cada petición si sus lecturas pueden ir a la
+réplica (REPLICAS['ALIAS']): solo los GET/HEAD de las rutas de REPLICAS['RUTAS']
+(listados, estadísticas y reportes), y solo si el cliente no ha escrito en los
+últimos FIJACION_SEGUNDOS. La decisión se guarda en una ContextVar que consulta
+ReplicaRouter, de modo que también la siguen las consultas del ORM asíncrono
+(sync_to_async copia el contexto) y las de un reporte en streaming, que se
+ejecutan cuando la vista ya ha devuelto la respuesta.
+
+Tras una escritura con éxito (POST, PUT, PATCH, DELETE) el cliente queda fijado
+al primario y lee lo que acaba de escribir aunque la réplica vaya con retraso.
+La marca se guarda en la caché de Django con un resumen de sus credenciales
+(cabecera Authorization o cookie de sesión); con varios procesos la caché tiene
+que ser compartida (CACHE_REDIS_URL).
+
+Siempre van al primario las escrituras, las lecturas dentro de una
+transacción, los tokens y las sesiones (un token recién creado puede no haber
+llegado aún a la réplica) y la sincronización ?since=, cuyo margen no cubre el
+retraso de la réplica.
+"""
+import hashlib
+import threading
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CONFIGURACION_POR_DEFECTO = {
+    'ALIAS': 'replica',
+    # Segundos que un cliente lee del primario después de escribir
+    'FIJACION_SEGUNDOS': 10,
+    # Nombres de ruta cuyos GET pueden leer de la réplica
+    'RUTAS': [
+        'incidencias:incidencia-list-create',
+        'incidencias:usuario-list-create',
+        'incidencias:estadisticas',
+        'incidencias:reporte-incidencias',
+        'incidencias:resumen-reporte',
+        'incidencias:tendencias',
+    ],
+    'CACHE': 'default',
+}
+
+# Apps cuyas tablas se leen siempre del primario
+APPS_PRIMARIO = {'authtoken', 'sessions'}
+
+_usar_replica = ContextVar('usar_replica', default=False)
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'REPLICAS', {})}
+
+
+def replica_configurada():
+    return configuracion()['ALIAS'] in settings.DATABASES
+
+
+def usar_replica(valor):
+    _usar_replica.set(valor)
+
+
+class ReplicaRouter:
+    """Lecturas a la réplica cuando la petición lo permite; el resto, al primario"""
+
+    def db_for_read(self, model, **hints):
+        if not _usar_replica.get() or model._meta.app_label in APPS_PRIMARIO:
+            return None
+        # Dentro de una transacción hay que leer lo que ella misma ha escrito
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return configuracion()['ALIAS']
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        if db == configuracion()['ALIAS']:
+            return False
+        return None
+
+
+class Enrutado:
+    """Contadores del proceso: peticiones leídas de la réplica y fijadas al primario"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.replica = 0
+        self.fijadas = 0
+        self.escrituras = 0
+
+    def contar(self, campo):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + 1)
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'alias': configuracion()['ALIAS'] if replica_configurada() else None,
+                'peticiones_replica': self.replica,
+                'peticiones_fijadas': self.fijadas,
+                'escrituras': self.escrituras,
+            }
+
+
+enrutado = Enrutado()
+
+
+def _clave_cliente(request):
+    credencial = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credencial:
+        return None
+    return f'replicas:fijado:{hashlib.sha256(credencial.encode("utf-8")).hexdigest()[:32]}'
+
+
+def fijar_primario(request):
+    """Tras una escritura de este cliente, sus lecturas van al primario durante FIJACION_SEGUNDOS"""
+    clave = _clave_cliente(request)
+    if clave is None:
+        return
+    opciones = configuracion()
+    caches[opciones['CACHE']].set(clave, True, opciones['FIJACION_SEGUNDOS'])
+    enrutado.contar('escrituras')
+
+
+def puede_leer_replica(request):
+    """Si las lecturas de esta petición (ya resuelta) pueden ir a la réplica"""
+    opciones = configuracion()
+    if request.method not in ('GET', 'HEAD') or 'since' in request.GET:
+        return False
+    if request.resolver_match is None or request.resolver_match.view_name not in opciones['RUTAS']:
+        return False
+    clave = _clave_cliente(request)
+    if clave is not None and caches[opciones['CACHE']].get(clave):
+        enrutado.contar('fijadas')
+        return False
+    enrutado.contar('replica')
+    return True
@@ -29,20 +29,27 @@ INSTALLED_APPS = [
     # Local apps
     'usuarios',
     'incidencias',
+    'estadisticas',
+    'reportes',
+    'busqueda',
+    'sincronizacion',
 ]
 
 MIDDLEWARE = [
+    'incidencias_project.middleware.InstrumentacionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'incidencias_project.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'incidencias_project.urls'
+# asgi.py selecciona incidencias_project.urls_asgi (vistas de lectura asíncronas)
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'incidencias_project.urls')
 
 TEMPLATES = [
     {
@@ -61,19 +68,68 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'incidencias_project.wsgi.application'
+ASGI_APPLICATION = 'incidencias_project.asgi.application'
 
 # Database
+# Conexiones reutilizadas entre peticiones: DB_CONN_MAX_AGE segundos por hilo o, con
+# DB_POOL=True, un pool de psycopg 3 por proceso (requiere psycopg[pool]; el pool
+# exige CONN_MAX_AGE=0). Bajo ASGI cada petición tiene su propio hilo, así que
+# asgi.py fija DB_CONN_MAX_AGE=0 y conviene activar DB_POOL.
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'incidencias_db',
-        'USER': 'postgres',
-        'PASSWORD': 'admin',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'incidencias_db'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'admin'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),  # segundos esperando conexión libre
+            },
+        } if DB_POOL else {},
+    }
+}
+
+# Réplica de solo lectura para listados, estadísticas y reportes (incidencias_project.replicas).
+# DB_REPLICA_HOST la activa; en local basta otra base de datos: DB_REPLICA_HOST=localhost
+# DB_REPLICA_NAME=incidencias_replica
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Las pruebas usan la base de datos del primario también como réplica
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['incidencias_project.replicas.ReplicaRouter']
+
+REPLICAS = {
+    'ALIAS': 'replica',
+    'FIJACION_SEGUNDOS': int(os.environ.get('DB_REPLICA_FIJACION_SEGUNDOS', 10)),
 }
 
+# Caché compartida entre procesos (fijación al primario tras escribir y revocación de
+# tokens en la caché de autenticación). Sin ella cada
+# proceso usa su propia caché en memoria.
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -104,6 +160,74 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Entrega de MEDIA con control de acceso (incidencias.media): 'django', 'x-accel' (nginx) o 'x-sendfile'
+MEDIA_PROTEGIDA = {
+    'MODO': os.environ.get('MEDIA_MODO', 'django'),
+    'PREFIJO_INTERNO': os.environ.get('MEDIA_PREFIJO_INTERNO', '/media-protegida/'),
+    'MAX_AGE': 3600,  # segundos
+}
+
+# Variantes de las imágenes de incidencias generadas en segundo plano (incidencias.imagenes)
+IMAGENES = {
+    'HILOS': int(os.environ.get('IMAGENES_HILOS', 2)),
+    'CALIDAD_JPEG': 80,
+    'VARIANTES': {'miniatura': 240, 'vista_previa': 1280},  # lado máximo en píxeles
+}
+
+# Reportes en segundo plano (manage.py procesar_reportes)
+REPORTES_WORKERS = int(os.environ.get('REPORTES_WORKERS', os.cpu_count() or 2))
+
+# Caché en memoria de tokens de autenticación (incidencias.authentication)
+TOKEN_AUTH_CACHE = {
+    'MAX_ENTRADAS': int(os.environ.get('TOKEN_AUTH_CACHE_MAX_ENTRADAS', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),  # segundos
+}
+
+# Segundos entre escrituras en bloque de Usuario.ultimo_acceso (0 = escribir en cada login)
+ULTIMO_ACCESO_INTERVALO_FLUSH = float(os.environ.get('ULTIMO_ACCESO_INTERVALO_FLUSH', 5))
+
+# Sincronización incremental del listado (?since=<token>)
+SINCRONIZACION = {
+    'MARGEN_SEGUNDOS': 10,
+    'RETENCION_DIAS': 30,
+    'MAX_RESULTADOS': 500,
+}
+
+# Eventos en tiempo real (SSE). Con varios workers, usar un broker compartido:
+# EVENTOS_REDIS_URL=redis://... activa incidencias.eventos.BrokerRedis
+EVENTOS = {
+    'BROKER': 'incidencias.eventos.BrokerRedis' if os.environ.get('EVENTOS_REDIS_URL') else 'incidencias.eventos.BrokerMemoria',
+    'OPCIONES': {'url': os.environ['EVENTOS_REDIS_URL']} if os.environ.get('EVENTOS_REDIS_URL') else {},
+    'LATIDO': 15,
+    'DURACION_MAXIMA': 300,
+}
+
+# Instrumentación por petición (SQL, serialización, render) con cabecera Server-Timing
+INSTRUMENTACION = {
+    'ACTIVA': os.environ.get('INSTRUMENTACION_ACTIVA', 'False') == 'True',
+    'MUESTREO': float(os.environ.get('INSTRUMENTACION_MUESTREO', 1.0)),  # fracción de peticiones medidas
+    'UMBRAL_LENTO_MS': float(os.environ.get('INSTRUMENTACION_UMBRAL_LENTO_MS', 500)),
+    'CONSULTAS_LENTAS': 5,  # consultas más lentas incluidas en el log de peticiones lentas
+    'SERVER_TIMING': True,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'incidencias_project.instrumentacion': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -113,7 +237,7 @@ AUTH_USER_MODEL = 'usuarios.Usuario'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'incidencias.authentication.CacheTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -122,7 +246,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'incidencias.renderers.RapidoJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -1,13 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from incidencias.views import MediaProtegidaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('incidencias.urls')),
+    path('api/reportes/', include('reportes.urls')),
+    # Archivos media con control de acceso (ver incidencias.media)
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:nombre>', MediaProtegidaView.as_view(), name='media'),
 ]
-
-# Servir archivos media en desarrollo
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
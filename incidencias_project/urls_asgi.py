@@ -0,0 +1,9 @@
+"""URLconf del despliegue ASGI: la de urls.py con la API de incidencias.urls_asgi"""
+from django.urls import path, include
+
+from . import urls
+
+urlpatterns = [
+    path('api/', include('incidencias.urls_asgi')) if str(ruta.pattern) == 'api/' else ruta
+    for ruta in urls.urlpatterns
+]
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ReportesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'reportes'
+    verbose_name = 'Reportes'
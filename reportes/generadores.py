@@ -0,0 +1,159 @@
+import io
+import logging
+import tempfile
+
+from django.core.files import File
+from django.utils import timezone
+
+from incidencias.exportacion import (
+    COLUMNAS_EXPORTACION, es_formula, estadisticas_reporte, exportar_csv, filas_reporte, filtrar_incidencias_reporte
+)
+from .models import ReporteJob
+
+logger = logging.getLogger(__name__)
+
+
+def generar_reporte(job_id):
+    """Genera el archivo de un ReporteJob ya reclamado por el worker y guarda el resultado"""
+    job = ReporteJob.objects.get(pk=job_id)
+    queryset, filtros = filtrar_incidencias_reporte(job.filtros)
+
+    try:
+        generador = GENERADORES[job.formato]
+        with tempfile.TemporaryFile() as tmp:
+            job.total_filas = generador(tmp, queryset, filtros)
+            tmp.seek(0)
+            nombre = f'reporte-incidencias-{job.id}.{job.formato}'
+            job.archivo.save(nombre, File(tmp, name=nombre), save=False)
+        job.estado = 'completado'
+        job.mensaje_error = ''
+    except Exception as e:
+        logger.exception('Error generando el reporte %s', job.id)
+        job.estado = 'error'
+        job.mensaje_error = str(e)
+
+    job.fecha_fin = timezone.now()
+    job.save(update_fields=['archivo', 'total_filas', 'estado', 'mensaje_error', 'fecha_fin'])
+    return job.estado
+
+
+def generar_csv(archivo, queryset, filtros):
+    """Escribe el reporte en CSV (UTF-8 con BOM para que Excel respete los acentos)"""
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    texto.writelines(exportar_csv(queryset, filtros))
+    texto.flush()
+    texto.detach()
+    return queryset.count()
+
+
+def generar_xlsx(archivo, queryset, filtros):
+    """Escribe el reporte en XLSX en modo write-only (memoria constante)"""
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+    except ImportError:
+        raise RuntimeError('Se requiere openpyxl para exportar reportes en Excel')
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Incidencias')
+    hoja.append(COLUMNAS_EXPORTACION)
+
+    def texto(hoja, valor):
+        # openpyxl guarda como fórmula cualquier texto que empiece por '=': forzar celda de texto
+        if not es_formula(valor):
+            return valor
+        celda = WriteOnlyCell(hoja, valor)
+        celda.data_type = 's'
+        return celda
+
+    total = 0
+    for fila in filas_reporte(queryset):
+        hoja.append([texto(hoja, fila[columna]) for columna in COLUMNAS_EXPORTACION])
+        total += 1
+
+    resumen = libro.create_sheet('Resumen')
+    resumen.append(['Estadística', 'Valor'])
+    for clave, valor in estadisticas_reporte(queryset).items():
+        resumen.append([clave, valor])
+    resumen.append([])
+    resumen.append(['Filtro', 'Valor'])
+    for clave, valor in filtros.items():
+        resumen.append([clave, '' if valor is None else texto(resumen, str(valor))])
+
+    libro.save(archivo)
+    return total
+
+
+# Columnas incluidas en el PDF y su ancho en puntos (A4 apaisado)
+COLUMNAS_PDF = [
+    ('id', 40), ('fecha_creacion', 95), ('tipo_incidencia', 65), ('prioridad', 50),
+    ('estado', 65), ('ubicacion', 120), ('usuario_creador_nombre', 110), ('descripcion', 230),
+]
+
+
+def generar_pdf(archivo, queryset, filtros):
+    """Escribe el reporte en PDF página a página sin construir la tabla completa en memoria"""
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+    except ImportError:
+        raise RuntimeError('Se requiere reportlab para exportar reportes en PDF')
+
+    ancho, alto = landscape(A4)
+    margen = 30
+    alto_linea = 12
+    pdf = canvas.Canvas(archivo, pagesize=(ancho, alto))
+
+    def encabezado():
+        pdf.setFont('Helvetica-Bold', 12)
+        pdf.drawString(margen, alto - margen, 'Reporte de incidencias')
+        pdf.setFont('Helvetica-Bold', 8)
+        x = margen
+        for columna, ancho_columna in COLUMNAS_PDF:
+            pdf.drawString(x, alto - margen - 20, columna)
+            x += ancho_columna
+        pdf.setFont('Helvetica', 8)
+        return alto - margen - 20 - alto_linea
+
+    y = encabezado()
+    total = 0
+    for fila in filas_reporte(queryset):
+        if y < margen:
+            pdf.showPage()
+            y = encabezado()
+        x = margen
+        for columna, ancho_columna in COLUMNAS_PDF:
+            valor = '' if fila[columna] is None else str(fila[columna])
+            if columna == 'fecha_creacion':
+                valor = valor[:16].replace('T', ' ')
+            # Recortar el texto al ancho de la columna
+            max_caracteres = int(ancho_columna / 4.2)
+            if len(valor) > max_caracteres:
+                valor = valor[:max_caracteres - 1] + '…'
+            pdf.drawString(x, y, valor)
+            x += ancho_columna
+        y -= alto_linea
+        total += 1
+
+    pdf.showPage()
+    pdf.setFont('Helvetica-Bold', 12)
+    pdf.drawString(margen, alto - margen, 'Resumen')
+    pdf.setFont('Helvetica', 10)
+    y = alto - margen - 25
+    for clave, valor in estadisticas_reporte(queryset).items():
+        pdf.drawString(margen, y, f'{clave}: {valor}')
+        y -= 15
+    y -= 10
+    for clave, valor in filtros.items():
+        pdf.drawString(margen, y, f'{clave}: {"" if valor is None else valor}')
+        y -= 15
+
+    pdf.save()
+    return total
+
+
+GENERADORES = {
+    'csv': generar_csv,
+    'xlsx': generar_xlsx,
+    'pdf': generar_pdf,
+}
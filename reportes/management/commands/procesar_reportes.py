@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from reportes.models import ReporteJob
+from reportes.worker import (
+    devolver_a_la_cola, ejecutar_trabajo, inicializar_proceso, reclamar_trabajos, reencolar_abandonados,
+    renovar_latidos,
+)
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de reportes en segundo plano usando un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            default=getattr(settings, 'REPORTES_WORKERS', None) or os.cpu_count() or 2,
+            help='Número de procesos generadores'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=2.0,
+            help='Segundos entre consultas a la cola cuando no hay trabajo'
+        )
+        parser.add_argument(
+            '--reencolar-tras', type=int, default=60,
+            help='Minutos sin latido tras los que un trabajo "procesando" se considera abandonado'
+        )
+        parser.add_argument(
+            '--latido', type=float, default=30.0,
+            help='Segundos entre renovaciones del latido de los trabajos en curso'
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help='Procesar los trabajos pendientes y terminar'
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+
+        reencolados = reencolar_abandonados(options['reencolar_tras'])
+        if reencolados:
+            self.stdout.write(f'🔁 {reencolados} trabajos abandonados devueltos a la cola')
+
+        # Los procesos hijos abren sus propias conexiones
+        connections.close_all()
+        pool = self._crear_pool(workers)
+        self.stdout.write(f'🚀 Procesando reportes con {workers} procesos')
+
+        en_curso = {}
+        pool_roto = False
+        ultimo_latido = time.monotonic()
+        try:
+            while True:
+                if en_curso and time.monotonic() - ultimo_latido >= options['latido']:
+                    renovar_latidos(list(en_curso.values()))
+                    ultimo_latido = time.monotonic()
+
+                for future in [f for f in en_curso if f.done()]:
+                    job_id = en_curso.pop(future)
+                    try:
+                        self.stdout.write(f'📄 Reporte {job_id}: {future.result()}')
+                    except BrokenProcessPool:
+                        # Un proceso murió (p. ej. por falta de memoria): el pool queda inservible
+                        pool_roto = True
+                        self._marcar_error(job_id, 'El proceso generador terminó inesperadamente')
+                        self.stderr.write(f'❌ Reporte {job_id}: el proceso generador terminó inesperadamente')
+                    except Exception as e:
+                        self._marcar_error(job_id, str(e))
+                        self.stderr.write(f'❌ Reporte {job_id}: {e}')
+
+                if pool_roto:
+                    if en_curso:
+                        # Sin reclamar más hasta que terminen los futures del pool roto
+                        time.sleep(options['intervalo'])
+                        continue
+                    pool.shutdown(wait=False)
+                    pool = self._crear_pool(workers)
+                    pool_roto = False
+
+                libres = workers - len(en_curso)
+                ids = reclamar_trabajos(libres) if libres > 0 else []
+                for posicion, job_id in enumerate(ids):
+                    try:
+                        future = pool.submit(ejecutar_trabajo, job_id)
+                    except BrokenProcessPool:
+                        # El pool se rompió entre dos vueltas: los no enviados vuelven a la cola
+                        pool_roto = True
+                        devolver_a_la_cola(ids[posicion:])
+                        break
+                    en_curso[future] = job_id
+
+                if options['una_vez'] and not ids and not en_curso:
+                    break
+                if not ids:
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️  Deteniendo, esperando a los reportes en curso...')
+        finally:
+            pool.shutdown(wait=True)
+
+    def _crear_pool(self, workers):
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=inicializar_proceso,
+        )
+
+    def _marcar_error(self, job_id, mensaje):
+        ReporteJob.objects.filter(id=job_id, estado='procesando').update(
+            estado='error', mensaje_error=mensaje, fecha_fin=timezone.now()
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReporteJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel'), ('pdf', 'PDF')], max_length=10)),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('archivo', models.FileField(blank=True, null=True, upload_to='reportes/%Y/%m/')),
+                ('total_filas', models.PositiveIntegerField(blank=True, null=True)),
+                ('mensaje_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reportes_solicitados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='reporte_job_cola_idx')],
+            },
+        ),
+    ]
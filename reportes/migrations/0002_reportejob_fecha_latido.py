@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportejob',
+            name='fecha_latido',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
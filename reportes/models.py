@@ -0,0 +1,47 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class ReporteJob(models.Model):
+    """Trabajo de exportación de reportes procesado en segundo plano"""
+    FORMATOS_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+
+    ESTADOS_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reportes_solicitados'
+    )
+    formato = models.CharField(max_length=10, choices=FORMATOS_CHOICES)
+    filtros = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS_CHOICES, default='pendiente')
+    archivo = models.FileField(upload_to='reportes/%Y/%m/', null=True, blank=True)
+    total_filas = models.PositiveIntegerField(null=True, blank=True)
+    mensaje_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    # Lo renueva periódicamente el worker que tiene el trabajo en curso
+    fecha_latido = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='reporte_job_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f'Reporte {self.formato} ({self.estado}) - {self.usuario}'
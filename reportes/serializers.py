@@ -0,0 +1,53 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import ReporteJob
+
+
+class ReporteJobSerializer(serializers.ModelSerializer):
+    """Serializer para consultar el estado de un trabajo de reporte"""
+    url_descarga = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReporteJob
+        fields = [
+            'id', 'formato', 'filtros', 'estado', 'total_filas', 'mensaje_error',
+            'fecha_creacion', 'fecha_inicio', 'fecha_fin', 'url_descarga'
+        ]
+        read_only_fields = fields
+
+    def get_url_descarga(self, obj):
+        if obj.estado != 'completado':
+            return None
+        url = reverse('reportes:descargar-reporte', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class ReporteJobCreateSerializer(serializers.Serializer):
+    """Serializer para encolar un reporte con los mismos filtros que /reportes/"""
+    formato = serializers.ChoiceField(choices=['csv', 'xlsx', 'excel', 'pdf'])
+    fecha_desde = serializers.DateField(required=False, allow_null=True)
+    fecha_hasta = serializers.DateField(required=False, allow_null=True)
+    estado = serializers.CharField(required=False, allow_blank=True)
+    tipo = serializers.CharField(required=False, allow_blank=True)
+    prioridad = serializers.CharField(required=False, allow_blank=True)
+    # Búsqueda de texto: filtra las filas sin cambiar el orden cronológico del reporte
+    q = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_formato(self, value):
+        # La pantalla de exportación envía 'excel'
+        return 'xlsx' if value == 'excel' else value
+
+    def create(self, validated_data):
+        formato = validated_data.pop('formato')
+        filtros = {
+            clave: valor.isoformat() if hasattr(valor, 'isoformat') else valor
+            for clave, valor in validated_data.items()
+            if valor not in (None, '')
+        }
+        return ReporteJob.objects.create(
+            usuario=self.context['request'].user,
+            formato=formato,
+            filtros=filtros
+        )
@@ -0,0 +1,145 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from incidencias.exportacion import filtrar_incidencias_reporte
+from incidencias.models import Incidencia
+from incidencias.tests.datos import crear_incidencias, crear_usuarios, limpiar_caches
+
+from .generadores import generar_reporte
+from .models import ReporteJob
+from .worker import reencolar_abandonados, renovar_latidos
+
+
+class ReporteJobFiltrosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=12, cambios=1, comentarios=0)
+        Incidencia.objects.filter(pk__in=[incidencia.pk for incidencia in incidencias[:3]]).update(
+            descripcion='Proyector del laboratorio sin señal'
+        )
+
+    def setUp(self):
+        limpiar_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_busqueda_en_reporte_en_segundo_plano(self):
+        response = self.client.post('/api/reportes/exportar/', {'formato': 'csv', 'q': 'proyector'}, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(response.json()['reporte']['filtros'], {'q': 'proyector'})
+
+        job = ReporteJob.objects.get()
+        self.assertEqual(generar_reporte(job.id), 'completado')
+        job.refresh_from_db()
+        self.addCleanup(job.archivo.delete, save=False)
+        # Las mismas filas que /api/reportes/?q=proyector
+        esperadas, _ = filtrar_incidencias_reporte({'q': 'proyector'})
+        self.assertEqual(job.total_filas, esperadas.count())
+        self.assertEqual(job.total_filas, 3)
+        with default_storage.open(job.archivo.name) as archivo:
+            contenido = archivo.read().decode('utf-8-sig')
+        self.assertEqual(contenido.count('Proyector del laboratorio'), 3)
+        self.assertIn('filtros_aplicados,q,proyector', contenido)
+
+
+class PoolFalso:
+    """ProcessPoolExecutor que no lanza procesos: cada submit consume una respuesta.
+
+    Una respuesta es el resultado del future, una excepción que se guarda en el
+    future o la clase BrokenProcessPool, que hace fallar el propio submit.
+    """
+
+    def __init__(self, respuestas):
+        self.respuestas = list(respuestas)
+        self.enviados = []
+        self.cerrado = False
+
+    def submit(self, funcion, job_id):
+        respuesta = self.respuestas.pop(0)
+        if respuesta is BrokenProcessPool:
+            raise BrokenProcessPool('Un proceso del pool terminó')
+        self.enviados.append(job_id)
+        future = Future()
+        if isinstance(respuesta, Exception):
+            future.set_exception(respuesta)
+        else:
+            future.set_result(respuesta)
+        return future
+
+    def shutdown(self, wait=True):
+        self.cerrado = True
+
+
+class ColaReportesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, _ = crear_usuarios()
+
+    def crear_job(self, **campos):
+        job = ReporteJob.objects.create(usuario=self.admin, formato='csv', **campos)
+        if 'fecha_creacion' in campos:
+            ReporteJob.objects.filter(pk=job.pk).update(fecha_creacion=campos['fecha_creacion'])
+        return job
+
+    def test_solo_se_reencolan_los_latidos_caducados(self):
+        ahora = timezone.now()
+        hace_horas = ahora - timedelta(hours=3)
+        # Un reporte largo de un worker vivo: empezó hace horas pero renueva el latido
+        vivo = self.crear_job(estado='procesando', fecha_inicio=hace_horas, fecha_latido=ahora - timedelta(seconds=20))
+        caido = self.crear_job(estado='procesando', fecha_inicio=hace_horas, fecha_latido=ahora - timedelta(minutes=61))
+        sin_latido = self.crear_job(estado='procesando', fecha_inicio=hace_horas)
+        reciente = self.crear_job(estado='procesando', fecha_inicio=ahora)
+
+        self.assertEqual(reencolar_abandonados(60), 2)
+        estados = dict(ReporteJob.objects.values_list('id', 'estado'))
+        self.assertEqual(estados[vivo.id], 'procesando')
+        self.assertEqual(estados[reciente.id], 'procesando')
+        self.assertEqual(estados[caido.id], 'pendiente')
+        self.assertEqual(estados[sin_latido.id], 'pendiente')
+        caido.refresh_from_db()
+        self.assertIsNone(caido.fecha_inicio)
+        self.assertIsNone(caido.fecha_latido)
+
+    def test_renovar_latidos(self):
+        antes = timezone.now() - timedelta(minutes=61)
+        en_curso = self.crear_job(estado='procesando', fecha_inicio=antes, fecha_latido=antes)
+        terminado = self.crear_job(estado='completado', fecha_inicio=antes, fecha_latido=antes)
+
+        self.assertEqual(renovar_latidos([en_curso.id, terminado.id]), 1)
+        self.assertEqual(reencolar_abandonados(60), 0)
+        terminado.refresh_from_db()
+        self.assertEqual(terminado.fecha_latido, antes)
+
+    def test_pool_roto_se_recrea(self):
+        ahora = timezone.now()
+        primero = self.crear_job(fecha_creacion=ahora - timedelta(minutes=2))
+        segundo = self.crear_job(fecha_creacion=ahora - timedelta(minutes=1))
+        # El proceso del primer trabajo muere y el pool ya no acepta el segundo
+        roto = PoolFalso([BrokenProcessPool('Un proceso del pool terminó'), BrokenProcessPool])
+        nuevo = PoolFalso(['completado'])
+
+        with mock.patch('reportes.management.commands.procesar_reportes.connections'), \
+                mock.patch('reportes.management.commands.procesar_reportes.Command._crear_pool',
+                           side_effect=[roto, nuevo]) as crear_pool:
+            call_command('procesar_reportes', workers=2, intervalo=0, una_vez=True, stdout=mock.Mock(),
+                         stderr=mock.Mock())
+
+        self.assertEqual(crear_pool.call_count, 2)
+        self.assertTrue(roto.cerrado)
+        self.assertEqual(roto.enviados, [primero.id])
+        # El segundo volvió a la cola y lo ejecutó el pool nuevo
+        self.assertEqual(nuevo.enviados, [segundo.id])
+        primero.refresh_from_db()
+        self.assertEqual(primero.estado, 'error')
+        self.assertEqual(primero.mensaje_error, 'El proceso generador terminó inesperadamente')
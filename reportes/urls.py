@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'reportes'
+
+urlpatterns = [
+    path('exportar/', views.crear_reporte, name='crear-reporte'),
+    path('trabajos/<uuid:job_id>/', views.estado_reporte, name='estado-reporte'),
+    path('trabajos/<uuid:job_id>/descargar/', views.descargar_reporte, name='descargar-reporte'),
+]
@@ -0,0 +1,80 @@
+from rest_framework import status, permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from incidencias.media import servir_archivo
+
+from .models import ReporteJob
+from .serializers import ReporteJobSerializer, ReporteJobCreateSerializer
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def crear_reporte(request):
+    """Vista para encolar la exportación de un reporte (solo administradores)"""
+    if request.user.tipo_usuario != 'administrador':
+        return Response({
+            'success': False,
+            'message': 'No tienes permisos para generar reportes'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = ReporteJobCreateSerializer(data=request.data, context={'request': request})
+    if serializer.is_valid():
+        job = serializer.save()
+        return Response({
+            'success': True,
+            'message': 'Reporte en cola de generación',
+            'reporte': ReporteJobSerializer(job, context={'request': request}).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    return Response({
+        'success': False,
+        'message': 'Datos inválidos',
+        'errors': serializer.errors
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def estado_reporte(request, job_id):
+    """Vista para consultar el estado de un reporte encolado"""
+    try:
+        job = ReporteJob.objects.get(id=job_id, usuario=request.user)
+    except ReporteJob.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Reporte no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'success': True,
+        'reporte': ReporteJobSerializer(job, context={'request': request}).data
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def descargar_reporte(request, job_id):
+    """Vista para descargar el archivo de un reporte completado"""
+    try:
+        job = ReporteJob.objects.get(id=job_id, usuario=request.user)
+    except ReporteJob.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Reporte no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if job.estado != 'completado' or not job.archivo:
+        return Response({
+            'success': False,
+            'message': 'El reporte todavía no está disponible',
+            'estado': job.estado
+        }, status=status.HTTP_409_CONFLICT)
+
+    # Admite Range y GET condicional, y delega la transferencia en el proxy si está configurado
+    return servir_archivo(
+        request,
+        job.archivo.name,
+        job.archivo.storage,
+        nombre_descarga=f'reporte-incidencias.{job.formato}'
+    )
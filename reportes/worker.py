@@ -0,0 +1,75 @@
+"""Funciones ejecutadas dentro de los procesos del pool de reportes.
+
+Este módulo no importa modelos a nivel de módulo: los procesos hijos se crean
+con `spawn` y deben configurar Django antes de importar nada que dependa de él.
+"""
+from datetime import timedelta
+
+
+def inicializar_proceso():
+    """Inicializador de cada proceso del pool"""
+    import django
+    django.setup()
+
+
+def ejecutar_trabajo(job_id):
+    """Genera un reporte dentro de un proceso del pool"""
+    from .generadores import generar_reporte
+    return generar_reporte(job_id)
+
+
+def reclamar_trabajos(limite):
+    """Marca como 'procesando' hasta `limite` trabajos pendientes y devuelve sus ids.
+
+    Usa SELECT ... FOR UPDATE SKIP LOCKED para que varios workers puedan
+    consumir la misma cola sin tomar dos veces el mismo trabajo.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from .models import ReporteJob
+
+    with transaction.atomic():
+        ids = list(
+            ReporteJob.objects.select_for_update(skip_locked=True)
+            .filter(estado='pendiente')
+            .order_by('fecha_creacion')
+            .values_list('id', flat=True)[:limite]
+        )
+        if ids:
+            ahora = timezone.now()
+            ReporteJob.objects.filter(id__in=ids).update(estado='procesando', fecha_inicio=ahora, fecha_latido=ahora)
+    return ids
+
+
+def renovar_latidos(ids):
+    """Marca como vivos los trabajos `ids` que este worker sigue procesando"""
+    from django.utils import timezone
+    from .models import ReporteJob
+
+    return ReporteJob.objects.filter(id__in=ids, estado='procesando').update(fecha_latido=timezone.now())
+
+
+def devolver_a_la_cola(ids):
+    """Devuelve a 'pendiente' trabajos reclamados que no se llegaron a ejecutar"""
+    from .models import ReporteJob
+
+    return ReporteJob.objects.filter(id__in=ids, estado='procesando').update(
+        estado='pendiente', fecha_inicio=None, fecha_latido=None
+    )
+
+
+def reencolar_abandonados(minutos):
+    """Devuelve a la cola los trabajos 'procesando' cuyo worker dejó de renovar el latido.
+
+    Los trabajos de otros workers vivos tienen un latido reciente y no se tocan,
+    por mucho que dure el reporte.
+    """
+    from django.db.models import Q
+    from django.utils import timezone
+    from .models import ReporteJob
+
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ReporteJob.objects.filter(
+        Q(fecha_latido__lt=limite) | Q(fecha_latido__isnull=True, fecha_inicio__lt=limite),
+        estado='procesando'
+    ).update(estado='pendiente', fecha_inicio=None, fecha_latido=None)
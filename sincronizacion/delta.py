@@ -0,0 +1,152 @@
+"""Sincronización incremental del listado de incidencias (?since=<token>).
+
+El cliente guarda el token opaco de la última respuesta y lo envía en la
+siguiente para recibir solo las incidencias creadas o modificadas desde
+entonces (por fecha_actualizacion) y los ids de las eliminadas.
+
+fecha_actualizacion se asigna al guardar, no al confirmar la transacción: una
+transacción lenta puede confirmar una fila con una fecha anterior a la de un
+token ya entregado. Por eso ningún token pasa de MARGEN_SEGUNDOS antes del
+momento de la consulta: las páginas intermedias (`mas`) solo recorren filas
+anteriores a ese límite y las del margen se envían al final y se repiten en
+la siguiente sincronización (el cliente debe aplicarlas como upsert por id).
+Las marcas de eliminación se conservan RETENCION_DIAS; un token más antiguo
+obliga a sincronizar desde cero.
+"""
+import json
+from base64 import b64decode, b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from incidencias.models import CambioEstado, ComentarioAdmin, Incidencia
+
+from .models import IncidenciaEliminada
+
+CONFIGURACION_POR_DEFECTO = {
+    'MARGEN_SEGUNDOS': 10,
+    'RETENCION_DIAS': 30,
+    'MAX_RESULTADOS': 500,
+}
+
+
+def configuracion():
+    return {**CONFIGURACION_POR_DEFECTO, **getattr(settings, 'SINCRONIZACION', {})}
+
+
+class TokenCaducado(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'El token de sincronización ha caducado; sincroniza de nuevo desde cero'
+    default_code = 'token_caducado'
+
+
+def codificar_token(fecha, incidencia_id, eliminadas):
+    data = {'f': fecha.isoformat(), 'i': incidencia_id, 'e': eliminadas.isoformat()}
+    return b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decodificar_token(token):
+    """Devuelve {'fecha', 'id', 'eliminadas'}; con un token vacío (primera sincronización) todo es None"""
+    if not token:
+        return {'fecha': None, 'id': None, 'eliminadas': None}
+    try:
+        data = json.loads(b64decode(token.encode('ascii')).decode('utf-8'))
+        fecha = parse_datetime(data['f'])
+        eliminadas = parse_datetime(data['e'])
+        if fecha is None or eliminadas is None:
+            raise ValueError
+        return {'fecha': fecha, 'id': int(data['i']), 'eliminadas': eliminadas}
+    except (TypeError, ValueError, KeyError):
+        raise ValidationError({'since': 'Token de sincronización inválido'})
+
+
+def calcular_delta(queryset, usuario, token, limite):
+    """Calcula qué incidencias de `queryset` han cambiado desde `token`.
+
+    Solo lee ids y fechas (el índice sobre fecha_actualizacion basta); el
+    llamante carga y serializa las filas. Devuelve un dict con `ids` en orden de
+    sincronización, `eliminadas`, el nuevo `token` y `mas`, que indica que
+    quedan cambios y hay que repetir la petición con el nuevo token.
+    """
+    opciones = configuracion()
+    estado = decodificar_token(token)
+    ahora = timezone.now()
+    if estado['eliminadas'] is not None and estado['eliminadas'] < ahora - timedelta(days=opciones['RETENCION_DIAS']):
+        raise TokenCaducado()
+
+    seguro = ahora - timedelta(seconds=opciones['MARGEN_SEGUNDOS'])
+    cambios = queryset.order_by('fecha_actualizacion', 'id')
+    if estado['fecha'] is not None:
+        # La cota simple es la que el índice usa como inicio del recorrido
+        cambios = cambios.filter(fecha_actualizacion__gte=estado['fecha']).filter(
+            Q(fecha_actualizacion__gt=estado['fecha']) |
+            Q(fecha_actualizacion=estado['fecha'], id__gt=estado['id'])
+        )
+    # Las páginas solo avanzan dentro de la zona segura: un token posterior a
+    # `seguro` saltaría las filas que aún no han confirmado su transacción
+    claves = list(cambios.filter(fecha_actualizacion__lte=seguro).values_list('id', 'fecha_actualizacion')[:limite + 1])
+    mas = len(claves) > limite
+    claves = claves[:limite]
+    if not mas:
+        # Los cambios del margen se entregan si caben y se repiten en la siguiente sincronización
+        claves += cambios.filter(fecha_actualizacion__gt=seguro).values_list('id', 'fecha_actualizacion')[:limite - len(claves)]
+
+    # En la primera sincronización el cliente no tiene nada que borrar
+    eliminadas = []
+    if estado['eliminadas'] is not None:
+        marcas = IncidenciaEliminada.objects.filter(fecha_eliminacion__gt=estado['eliminadas'])
+        if usuario.tipo_usuario == 'trabajador':
+            marcas = marcas.filter(usuario_creador_id=usuario.id)
+        eliminadas = list(dict.fromkeys(marcas.order_by('fecha_eliminacion').values_list('incidencia_id', flat=True)))
+
+    if mas:
+        ultimo_id, ultima_fecha = claves[-1]
+        nuevo = codificar_token(ultima_fecha, ultimo_id, seguro)
+    else:
+        nuevo = codificar_token(seguro, 0, seguro)
+
+    return {
+        'ids': [incidencia_id for incidencia_id, _ in claves],
+        'eliminadas': eliminadas,
+        'token': nuevo,
+        'mas': mas,
+    }
+
+
+def registrar_eliminacion(incidencia):
+    registrar_eliminaciones([{'id': incidencia.id, 'usuario_creador_id': incidencia.usuario_creador_id}])
+
+
+def registrar_eliminaciones(filas):
+    """Guarda las marcas de eliminación de filas con 'id' y 'usuario_creador_id'"""
+    ahora = timezone.now()
+    IncidenciaEliminada.objects.bulk_create([
+        IncidenciaEliminada(
+            incidencia_id=fila['id'],
+            usuario_creador_id=fila['usuario_creador_id'],
+            fecha_eliminacion=ahora
+        )
+        for fila in filas
+    ], batch_size=1000)
+
+
+def marcar_incidencias_de_usuario(usuario_id):
+    """Actualiza fecha_actualizacion de las incidencias en las que aparece el nombre del usuario"""
+    ids = Incidencia.objects.filter(
+        Q(usuario_creador_id=usuario_id) |
+        Q(id__in=CambioEstado.objects.filter(usuario_id=usuario_id).values('incidencia_id')) |
+        Q(id__in=ComentarioAdmin.objects.filter(usuario_id=usuario_id).values('incidencia_id'))
+    ).values('id')
+    return Incidencia.objects.filter(id__in=ids).update(fecha_actualizacion=timezone.now())
+
+
+def purgar_eliminaciones():
+    """Borra las marcas más antiguas que la retención; devuelve cuántas"""
+    limite = timezone.now() - timedelta(days=configuracion()['RETENCION_DIAS'])
+    borradas, _ = IncidenciaEliminada.objects.filter(fecha_eliminacion__lt=limite).delete()
+    return borradas
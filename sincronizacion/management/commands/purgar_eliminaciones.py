@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from sincronizacion.delta import configuracion, purgar_eliminaciones
+
+
+class Command(BaseCommand):
+    help = 'Borra las marcas de incidencias eliminadas más antiguas que SINCRONIZACION["RETENCION_DIAS"]'
+
+    def handle(self, *args, **options):
+        borradas = purgar_eliminaciones()
+        dias = configuracion()['RETENCION_DIAS']
+        self.stdout.write(self.style.SUCCESS(f'✅ {borradas} marcas de eliminación de más de {dias} días borradas'))
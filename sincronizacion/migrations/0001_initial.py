@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidenciaEliminada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('incidencia_id', models.BigIntegerField()),
+                ('usuario_creador_id', models.BigIntegerField(null=True)),
+                ('fecha_eliminacion', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['fecha_eliminacion'], name='eliminada_fecha_idx'),
+                    models.Index(fields=['usuario_creador_id', 'fecha_eliminacion'], name='eliminada_creador_fecha_idx'),
+                ],
+            },
+        ),
+    ]
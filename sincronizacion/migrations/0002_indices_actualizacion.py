@@ -0,0 +1,48 @@
+"""Índices sobre fecha_actualizacion para la sincronización incremental.
+
+Mismo esquema que busqueda.0001: la tabla es de la app incidencias, así que
+los índices se crean con RunPython y, en PostgreSQL, con CONCURRENTLY.
+"""
+from django.db import migrations, models
+
+
+def _indices(apps):
+    Incidencia = apps.get_model('incidencias', 'Incidencia')
+    return [
+        # Cambios de todas las incidencias (administradores) en orden de sincronización
+        (Incidencia, models.Index(fields=['fecha_actualizacion', 'id'], name='incidencia_actualizacion_idx')),
+        # Cambios de las incidencias de un trabajador
+        (Incidencia, models.Index(
+            fields=['usuario_creador', 'fecha_actualizacion', 'id'], name='incidencia_creador_actual_idx'
+        )),
+    ]
+
+
+def crear_indices(apps, schema_editor):
+    for modelo, indice in _indices(apps):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(indice.create_sql(modelo, schema_editor, concurrently=True))
+        else:
+            schema_editor.add_index(modelo, indice)
+
+
+def eliminar_indices(apps, schema_editor):
+    for modelo, indice in _indices(apps):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(indice.remove_sql(modelo, schema_editor, concurrently=True))
+        else:
+            schema_editor.remove_index(modelo, indice)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('sincronizacion', '0001_initial'),
+        ('incidencias', '__first__'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
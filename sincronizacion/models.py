@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class IncidenciaEliminada(models.Model):
+    """Marca (tombstone) de una incidencia eliminada, para la sincronización incremental.
+
+    Guarda el creador para aplicar la misma visibilidad que el listado: un
+    trabajador solo recibe las eliminaciones de sus incidencias.
+    """
+    incidencia_id = models.BigIntegerField()
+    usuario_creador_id = models.BigIntegerField(null=True)
+    fecha_eliminacion = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_eliminacion'], name='eliminada_fecha_idx'),
+            models.Index(fields=['usuario_creador_id', 'fecha_eliminacion'], name='eliminada_creador_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'Incidencia {self.incidencia_id} eliminada el {self.fecha_eliminacion}'
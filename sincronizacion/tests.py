@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from incidencias.models import Incidencia
+from incidencias.tests.datos import crear_incidencias, crear_usuarios
+
+from .delta import calcular_delta, configuracion, decodificar_token
+
+
+class MargenSincronizacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, cls.trabajadores = crear_usuarios()
+        cls.incidencias = crear_incidencias(cls.admin, cls.trabajadores, total=8, cambios=1, comentarios=0)
+
+    def fechar(self, incidencia, segundos):
+        Incidencia.objects.filter(pk=incidencia.pk).update(
+            fecha_actualizacion=timezone.now() - timedelta(seconds=segundos)
+        )
+
+    def sincronizar(self, token, limite):
+        """Recorre todas las páginas desde `token`; devuelve los ids recibidos y el token final"""
+        margen = timedelta(seconds=configuracion()['MARGEN_SEGUNDOS'])
+        recibidas = []
+        while True:
+            delta = calcular_delta(Incidencia.objects.all(), self.admin, token, limite)
+            recibidas += delta['ids']
+            token = delta['token']
+            # Ningún token puede pasar del margen de seguridad
+            self.assertLessEqual(decodificar_token(token)['fecha'], timezone.now() - margen)
+            if not delta['mas']:
+                return recibidas, token
+
+    def test_paginas_no_saltan_el_margen(self):
+        antiguas, recientes = self.incidencias[:3], self.incidencias[3:6]
+        for numero, incidencia in enumerate(antiguas):
+            self.fechar(incidencia, 60 - numero)
+        for numero, incidencia in enumerate(recientes):
+            self.fechar(incidencia, 3 - numero)
+
+        recibidas, token = self.sincronizar('', limite=2)
+        self.assertTrue({incidencia.id for incidencia in antiguas} <= set(recibidas))
+
+        # Una transacción lenta confirma ahora una fila con una fecha anterior a
+        # las recientes ya entregadas: la siguiente sincronización la recibe y
+        # repite las recientes, que siguen dentro del margen
+        tardia = antiguas[0]
+        self.fechar(tardia, 5)
+        recibidas, _ = self.sincronizar(token, limite=5)
+        self.assertIn(tardia.id, recibidas)
+        self.assertTrue({incidencia.id for incidencia in recientes} <= set(recibidas))